@@ -4,16 +4,18 @@
 __package_name__ = "financial_agents"
 __version__ = "0.1.0"
 
-# Import main components
-from .core.orchestrator import app as orchestrator_app
-from .core.card import card_agent_app
-from .core.knowledge import knowledge_agent_app
+# Import main components. Imported as a plain module (pytest collecting tests/, whose
+# parent directory this is) there is no package to import them relative to.
+if __package__:
+    from .core.orchestrator import app as orchestrator_app
+    from .core.card import card_agent_app
+    from .core.knowledge import knowledge_agent_app
 
-# Make modules accessible
-from . import core
-from . import data
-from . import ui
-from . import vector_db
+    # Make modules accessible
+    from . import core
+    from . import data
+    from . import ui
+    from . import vector_db
 
 __all__ = [
     'orchestrator_app', 
@@ -0,0 +1,124 @@
+"""Growth of session memory and prompt size over a long conversation.
+
+Runs one session of ``--turns`` turns through the checkpointed orchestrator
+(core/memory.py). The LLM is answered by the fake backend and the card service
+call is replaced by a canned response. Every ``--report-every`` turns it records:
+
+- history turns and summary characters kept in the session state
+- conversation_chars: size of the conversation block added to the classify and
+  generate prompts
+- checkpoint_bytes: size of the session's latest stored checkpoint
+- db_bytes: size of the SQLite file (compacted every MEMORY_COMPACT_EVERY turns)
+- turn latency over the last window
+
+With the default bounds every column levels off after a few turns. ``--unbounded``
+keeps every turn verbatim, for comparison:
+
+    python benchmarks/conversation_memory_benchmark.py --turns 500 --output memory.json
+    python benchmarks/conversation_memory_benchmark.py --turns 500 --unbounded
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+from core import card, faq, knowledge, memory
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import get_conversation_app
+from data import load_financial_products
+from vector_db.populate_vector_db import build_product_index
+
+QUERIES = [
+    "What is a health savings account?",
+    "What are its contribution limits?",
+    "Tell me about the general purpose prepaid card",
+    "Is there a monthly fee on it?",
+    "Please deactivate my card ending in 8888 because it was lost",
+    "How does an FSA compare to that?",
+]
+
+
+def _mock_card_api(action: str, card_number: str, parameters: dict, timeout: float | None = None) -> dict:
+    return {"success": True, "message": f"Card {action}d successfully", "cardNumber": card_number}
+
+def checkpoint_bytes(path: str, session_id: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT LENGTH(checkpoint) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+                           "ORDER BY checkpoint_id DESC LIMIT 1", (session_id,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure session memory and prompt growth over a long conversation.")
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--report-every", type=int, default=25)
+    parser.add_argument("--unbounded", action="store_true", help="Keep every turn verbatim (no summary)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="conversation-memory-"), "conversations.sqlite")
+    memory.MEMORY_DB = db_path
+    if args.unbounded:
+        memory.MEMORY_MAX_TURNS = args.turns + 1
+    set_backend(FakeLLMBackend(latency_ms=0.0, jitter_ms=0.0))
+    card.call_card_api = _mock_card_api
+    faq.FAQ_ENABLED = False  # every turn takes the full classify-and-route path
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+        graph = get_conversation_app()
+
+    session = memory.session_config("benchmark")
+    rows, latencies = [], []
+    for turn in range(1, args.turns + 1):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = graph.invoke({"user_query": QUERIES[(turn - 1) % len(QUERIES)]}, session, durability="exit")
+            latencies.append(time.perf_counter() - start)
+        if turn % args.report_every == 0 or turn == args.turns:
+            row = {
+                "turn": turn,
+                "history_turns": len(result.get("history") or []),
+                "summary_chars": len(result.get("summary") or ""),
+                "conversation_chars": len(memory.conversation_context(result.get("history"), result.get("summary"))),
+                "checkpoint_bytes": checkpoint_bytes(db_path, "benchmark"),
+                "db_bytes": os.path.getsize(db_path),
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            }
+            rows.append(row)
+            latencies = []
+            print("  ".join(f"{key}={value}" for key, value in row.items()))
+
+    report = {
+        "python": platform.python_version(),
+        "turns": args.turns,
+        "max_turns": memory.MEMORY_MAX_TURNS,
+        "summary_max_chars": memory.MEMORY_SUMMARY_MAX_CHARS,
+        "compact_every": memory.MEMORY_COMPACT_EVERY,
+        "unbounded": args.unbounded,
+        "rows": rows,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Per-turn LangGraph framework overhead of the orchestrator.
+
+Runs knowledge and card turns with the LLM answered instantly by the fake backend
+and the card service call replaced by a canned response, so what remains is
+retrieval plus the graph machinery. Three ways to run the same nodes are timed:
+
+- direct: the node functions called in sequence with plain dict merges (no framework)
+- native: the orchestrator graph, with the agent graphs mounted as subgraphs
+- nested: the previous layout, where orchestrator nodes call ``.invoke`` on the
+  agent graphs (rebuilt here for comparison)
+
+Framework overhead is the difference to ``direct``, reported in ms and as a share of
+the turn. With the default instant LLM the turn is almost all framework; pass the
+fast tier's typical latency to see the share in a realistic fast-path turn:
+
+    python benchmarks/graph_overhead_benchmark.py --turns 2000 --output overhead.json
+    python benchmarks/graph_overhead_benchmark.py --turns 100 --llm-latency-ms 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+from langgraph.graph import StateGraph, END
+from core import card, faq, knowledge
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import (OrchestratorState, app as orchestrator_app, answer_from_faq, classify_intent,
+                               decide_after_faq, decide_route, format_final_response, remember_turn)
+from data import load_financial_products
+from vector_db.populate_vector_db import build_product_index
+
+TURNS = {
+    "knowledge": "What are the fees for the prepaid card?",
+    "card_action": "Please deactivate my card ending in 8888",
+}
+
+
+def _mock_card_api(action: str, card_number: str, parameters: dict, timeout: float | None = None) -> dict:
+    return {"success": True, "message": f"Card {action}d successfully", "cardNumber": card_number}
+
+
+# --- Ways to run a turn ---
+def direct_turn(query: str) -> dict:
+    state = {"user_query": query}
+    state.update(answer_from_faq(state))
+    state.update(classify_intent(state))
+    if state["intent"] == "knowledge":
+        state.update(knowledge.retrieve_knowledge(state))
+        state.update(knowledge.generate_response(state))
+    elif state["intent"] == "card_action":
+        state.update(card.execute_card_action(state))
+    state.update(format_final_response(state))
+    state.update(remember_turn(state, {}))
+    return state
+
+def native_turn(query: str) -> dict:
+    return orchestrator_app.invoke({"user_query": query})
+
+def _nested_knowledge(state: OrchestratorState) -> dict:
+    result = knowledge.knowledge_agent_app.invoke({"query": state["user_query"]})
+    return {"response": result.get("response"), "error": result.get("error")}
+
+def _nested_card(state: OrchestratorState) -> dict:
+    result = card.card_agent_app.invoke(state["card_action_details"])
+    return {"confirmation_message": result.get("confirmation_message"), "error": result.get("error")}
+
+def build_nested_app():
+    nested = StateGraph(OrchestratorState)
+    nested.add_node("faq_lookup", answer_from_faq)
+    nested.add_node("classify_intent", classify_intent)
+    nested.add_node("knowledge_agent", _nested_knowledge)
+    nested.add_node("card_agent", _nested_card)
+    nested.add_node("format_response", format_final_response)
+    nested.add_node("remember", remember_turn)
+    nested.set_entry_point("faq_lookup")
+    nested.add_conditional_edges("faq_lookup", decide_after_faq,
+                                 {"answered": "format_response", "classify": "classify_intent"})
+    nested.add_conditional_edges("classify_intent", decide_route, {
+        "knowledge": "knowledge_agent", "card_action": "card_agent",
+        "end_error": "format_response", "end_unknown": "format_response"})
+    nested.add_edge("knowledge_agent", "format_response")
+    nested.add_edge("card_agent", "format_response")
+    nested.add_edge("format_response", "remember")
+    nested.add_edge("remember", END)
+    return nested.compile()
+
+
+# --- Measurement ---
+def time_turns(run, query: str, turns: int, warmup: int) -> dict:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(warmup):
+            run(query)
+        latencies = []
+        for _ in range(turns):
+            start = time.perf_counter()
+            result = run(query)
+            latencies.append(time.perf_counter() - start)
+    if not result.get("final_response"):
+        raise RuntimeError(f"{run.__name__} produced no final response")
+    return {"p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+            "mean_ms": round(float(np.mean(latencies)) * 1000, 4),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LangGraph overhead per orchestrator turn.")
+    parser.add_argument("--turns", type=int, default=1000, help="Measured turns per path and mode")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latency of each fake LLM call")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    set_backend(FakeLLMBackend(latency_ms=args.llm_latency_ms, jitter_ms=0.0))
+    card.call_card_api = _mock_card_api
+    faq.FAQ_ENABLED = False  # every turn takes the full classify-and-route path
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+    nested_app = build_nested_app()
+    modes = {"direct": direct_turn, "native": native_turn, "nested": lambda q: nested_app.invoke({"user_query": q})}
+
+    results = {}
+    for path, query in TURNS.items():
+        rows = {mode: time_turns(run, query, args.turns, args.warmup) for mode, run in modes.items()}
+        base = rows["direct"]["p50_ms"]
+        for mode, row in rows.items():
+            row["overhead_ms"] = round(row["p50_ms"] - base, 4)
+            row["overhead_share"] = round(row["overhead_ms"] / row["p50_ms"], 3) if row["p50_ms"] else 0.0
+            print(f"{path:12s} {mode:7s} p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms "
+                  f"framework={row['overhead_ms']:.3f}ms ({row['overhead_share']:.0%} of the turn)")
+        results[path] = rows
+
+    if args.output:
+        report = {
+            "benchmark": "graph_overhead",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "environment": {"python": platform.python_version(), "machine": platform.machine()},
+            "config": {"turns": args.turns, "warmup": args.warmup, "llm_latency_ms": args.llm_latency_ms},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Open-loop load generator for the agents API.
+
+Drives ``/api/chat`` and ``/api/cards/operation`` at a fixed target rate and reports
+throughput, p50/p95/p99 latency and error rate per intent. Latency is measured from
+each request's scheduled send time, so queueing inside the generator is not hidden
+(no coordinated omission).
+
+Fully local run (no card service or OpenAI needed):
+
+    python scripts/mock_card_service.py --profile realistic &
+    CARD_API_BASE_URL=http://localhost:8080/api/cards LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=300 \\
+        uvicorn ui.api:app --port 8000 &
+    python benchmarks/load_test.py --rps 20 --duration 30
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import date
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# --- Request Mix ---
+# Seed card 4444 is PRE_ACTIVATED and expires next year (see V3__Seed_Card_Data.sql)
+_EXPIRY = f"{date.today().month:02d}/{(date.today().year + 1) % 100:02d}"
+
+# (intent label, weight, endpoint, body)
+SCENARIOS = [
+    ("knowledge", 5, "/api/chat", {"query": "What is a Health Savings Account?"}),
+    ("knowledge", 3, "/api/chat", {"query": "What are the fees for prepaid cards?"}),
+    ("knowledge", 2, "/api/chat", {"query": "What is the FSA contribution limit?"}),
+    ("card_action", 2, "/api/chat", {"query": f"Please activate my card ending in 4444 with CVV 123 and expiry date {_EXPIRY}"}),
+    ("unknown", 1, "/api/chat", {"query": "What is the weather today?"}),
+    ("card_operation", 3, "/api/cards/operation",
+     {"operation": "activate", "payload": {"cardLastFour": "4444", "cvv": "123", "expiryDate": _EXPIRY}}),
+    ("card_operation", 1, "/api/cards/operation",
+     {"operation": "deactivate", "payload": {"cardLastFour": "8888", "reason": "Lost card"}}),
+]
+
+_local = threading.local()
+
+def _session() -> requests.Session:
+    """One keep-alive session per generator thread."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def send(base_url: str, scenario: tuple, scheduled_at: float, timeout: float) -> tuple:
+    """Sends one request and returns (intent, latency_s, ok)."""
+    intent, _, endpoint, body = scenario
+    ok = False
+    try:
+        response = _session().post(base_url + endpoint, json=body, timeout=timeout)
+        # The API reports failures in the body with a 200 status, so check both
+        ok = response.ok and response.json().get("success", False)
+    except (requests.RequestException, ValueError):
+        ok = False
+    return intent, time.perf_counter() - scheduled_at, ok
+
+def run(base_url: str, rps: float, duration: float, concurrency: int, timeout: float,
+        scenarios: list = SCENARIOS, seed: int = 0) -> dict:
+    """Runs the load test and returns per-intent statistics."""
+    rng = random.Random(seed)
+    weights = [s[1] for s in scenarios]
+    interval = 1.0 / rps
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        n = 0
+        while True:
+            scheduled_at = start + n * interval
+            if scheduled_at - start >= duration:
+                break
+            now = time.perf_counter()
+            if scheduled_at > now:
+                time.sleep(scheduled_at - now)
+            scenario = rng.choices(scenarios, weights=weights)[0]
+            futures.append(pool.submit(send, base_url, scenario, scheduled_at, timeout))
+            n += 1
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    by_intent = defaultdict(list)
+    for intent, latency, ok in results:
+        by_intent[intent].append((latency, ok))
+    by_intent["all"] = [(latency, ok) for _, latency, ok in results]
+
+    report = {"target_rps": rps, "duration_s": round(elapsed, 2), "intents": {}}
+    for intent, samples in by_intent.items():
+        latencies = sorted(s[0] for s in samples)
+        errors = sum(1 for s in samples if not s[1])
+        report["intents"][intent] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "error_rate": round(errors / len(samples), 4),
+        }
+    return report
+
+def print_report(report: dict):
+    print(f"\nTarget {report['target_rps']} rps for {report['duration_s']} s")
+    print(f"{'intent':<16}{'requests':>9}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for intent, stats in sorted(report["intents"].items(), key=lambda item: item[0] == "all"):
+        print(f"{intent:<16}{stats['requests']:>9}{stats['throughput_rps']:>8}{stats['p50_ms']:>9}"
+              f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['error_rate']:>9.2%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the financial agents API at a target request rate.")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the agents API")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum in-flight requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the request mix")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run(args.url.rstrip("/"), args.rps, args.duration, args.concurrency, args.timeout, seed=args.seed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
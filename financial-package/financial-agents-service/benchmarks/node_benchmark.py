@@ -0,0 +1,234 @@
+"""Per-node microbenchmarks with a JSON baseline and a regression gate.
+
+Each orchestrator and agent node is timed in isolation on a prepared state. Full
+``orchestrator_app.invoke`` turns are timed for every intent as well. All backends
+are local and deterministic:
+
+- LLM: the fake backend with no latency, jitter or errors
+- vector DB: an in-memory index of data/financial_products.json with the hashed embedder
+- card service: ``call_card_api`` replaced by a canned response
+- FAQ store: off, except in the ``turn[faq]`` case
+
+A case runs ``--rounds`` rounds of ``--iterations`` calls after a warm-up. The gated
+figure is ``best_p50_us``, the fastest per-round median. Interference from other
+processes only ever slows a round down, so this figure is the stable one.
+``--save-baseline`` stores the results. ``--check`` fails (exit 1) when a case is more
+than ``--tolerance`` above the baseline and also slower by at least ``--min-delta-us``.
+The absolute margin keeps microsecond-scale cases from failing on timer noise. Each
+round is followed by a round of a fixed pure-Python calibration workload. The baseline
+stores each case relative to that workload, and ``--check`` scales it by the
+calibration measured next to the case. A host that is slower because of CPU steal or
+frequency scaling then does not read as a regression (``--no-calibrate`` compares raw
+timings):
+
+    python benchmarks/node_benchmark.py --save-baseline      # after an intended change
+    python benchmarks/node_benchmark.py --check              # regression gate
+    python benchmarks/node_benchmark.py --check --only 'turn'
+
+Baselines are only comparable on the machine (and Python) that recorded them;
+``--check`` warns when the environment differs.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+from core import card, faq, knowledge
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import app as orchestrator_app, classify_intent, decide_route, format_final_response
+from data import load_financial_products
+from vector_db.populate_vector_db import build_product_index
+
+BASELINE_PATH = os.path.join(current_dir, "baselines", "node_benchmark.json")
+# Calls of the calibration workload after each measured round
+CALIBRATION_ITERATIONS = 50
+
+KNOWLEDGE_QUERY = "What are the fees for the prepaid card?"
+CARD_QUERY = "Please deactivate my card ending in 8888 because it was lost"
+UNKNOWN_QUERY = "What is the weather like today?"
+FAQ_QUERY = "What is an HSA?"
+
+
+def _mock_card_api(action: str, card_number: str, parameters: dict, timeout: float | None = None) -> dict:
+    return {"success": True, "message": f"Card {action}d successfully", "cardNumber": card_number}
+
+
+# --- Cases ---
+def build_cases() -> list[tuple[str, bool, callable]]:
+    """(name, FAQ store enabled, zero-argument call) per benchmark case."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results = knowledge.retrieve_knowledge({"query": KNOWLEDGE_QUERY, "deadline": None})["search_results"]
+        card_state = classify_intent({"user_query": CARD_QUERY})
+    if not results or card_state["intent"] != "card_action":
+        raise RuntimeError("Benchmark fixtures did not resolve (empty retrieval or unexpected classification)")
+
+    knowledge_state = {"query": KNOWLEDGE_QUERY, "search_results": results, "error": None, "deadline": None}
+    card_action = {**card_state["card_action_details"], "deadline": None}
+    knowledge_done = {"intent": "knowledge", "response": "Fees for the card: none.", "error": None}
+    card_done = {"intent": "card_action", "confirmation_message": "Card 8888 deactivated.", "error": None}
+    return [
+        ("classify_intent[knowledge]", False, lambda: classify_intent({"user_query": KNOWLEDGE_QUERY})),
+        ("classify_intent[card_action]", False, lambda: classify_intent({"user_query": CARD_QUERY})),
+        ("decide_route[knowledge]", False, lambda: decide_route({"intent": "knowledge", "error": None})),
+        ("decide_route[card_action]", False, lambda: decide_route(card_state)),
+        ("retrieve_knowledge", False, lambda: knowledge.retrieve_knowledge({"query": KNOWLEDGE_QUERY, "deadline": None})),
+        ("generate_response[llm]", False,
+         lambda: knowledge.generate_response({**knowledge_state, "answer_mode": "llm"})),
+        ("generate_response[extractive]", False,
+         lambda: knowledge.generate_response({**knowledge_state, "answer_mode": "extractive"})),
+        ("execute_card_action", False, lambda: card.execute_card_action(card_action)),
+        ("format_final_response[knowledge]", False, lambda: format_final_response(knowledge_done)),
+        ("format_final_response[card_action]", False, lambda: format_final_response(card_done)),
+        ("turn[knowledge]", False, lambda: orchestrator_app.invoke({"user_query": KNOWLEDGE_QUERY})),
+        ("turn[card_action]", False, lambda: orchestrator_app.invoke({"user_query": CARD_QUERY})),
+        ("turn[unknown]", False, lambda: orchestrator_app.invoke({"user_query": UNKNOWN_QUERY})),
+        ("turn[faq]", True, lambda: orchestrator_app.invoke({"user_query": FAQ_QUERY})),
+    ]
+
+
+# --- Measurement ---
+def _calibration_workload():
+    # Dict/str/list churn comparable to what the nodes do, with no I/O
+    state = {}
+    for i in range(200):
+        state[f"key{i}"] = [str(i), i * 2, {"v": i}]
+    return sorted(state.items(), key=lambda item: item[1][1], reverse=True)[:10]
+
+def _round_median(call, iterations: int) -> tuple[float, list[float]]:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)), latencies
+
+def time_case(call, iterations: int, rounds: int, warmup: int) -> dict:
+    """Times ``call``; each round is followed by a round of the calibration workload, so
+    ``relative`` (case / calibration, median over rounds) tracks the host's current speed."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(warmup):
+            call()
+        medians, calibrations, latencies = [], [], []
+        for _ in range(rounds):
+            median, round_latencies = _round_median(call, iterations)
+            medians.append(median)
+            latencies.extend(round_latencies)
+            calibrations.append(_round_median(_calibration_workload, CALIBRATION_ITERATIONS)[0])
+    return {"best_p50_us": round(min(medians) * 1e6, 2),
+            "p50_us": round(float(np.median(latencies)) * 1e6, 2),
+            "mean_us": round(float(np.mean(latencies)) * 1e6, 2),
+            "p99_us": round(float(np.percentile(latencies, 99)) * 1e6, 2),
+            "calibration_us": round(float(np.median(calibrations)) * 1e6, 2),
+            "relative": round(float(np.median(np.array(medians) / np.array(calibrations))), 5),
+            "calls": len(latencies)}
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+def run(only: str | None, iterations: int, rounds: int, warmup: int) -> dict:
+    set_backend(FakeLLMBackend(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0))
+    card.call_card_api = _mock_card_api
+    faq_enabled = faq.FAQ_ENABLED
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+    results = {}
+    try:
+        for name, use_faq, call in build_cases():
+            if only and not re.search(only, name):
+                continue
+            faq.FAQ_ENABLED = use_faq
+            results[name] = result = time_case(call, iterations, rounds, warmup)
+            print(f"{name:36} best p50={result['best_p50_us']:>10.1f}us  p50={result['p50_us']:>10.1f}us  "
+                  f"p99={result['p99_us']:>10.1f}us  relative={result['relative']:.4f}")
+    finally:
+        faq.FAQ_ENABLED = faq_enabled
+    return {"environment": environment(), "iterations": iterations, "rounds": rounds,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "results": results}
+
+
+# --- Regression gate ---
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_us: float,
+            calibrated: bool = True) -> list[str]:
+    """Prints the change per case; returns the names of the cases that regressed."""
+    if baseline.get("environment") != current["environment"]:
+        print(f"Warning: baseline recorded on {baseline.get('environment')}, running on {current['environment']}; "
+              f"timings may not be comparable")
+    regressed = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:36} (no baseline)")
+            continue
+        # What the baseline predicts at the host speed measured next to this case
+        if calibrated and base.get("relative"):
+            expected_us = base["relative"] * result["calibration_us"]
+        else:
+            expected_us = base["best_p50_us"]
+        delta_us = result["best_p50_us"] - expected_us
+        change = delta_us / expected_us if expected_us else 0.0
+        failed = change > tolerance and delta_us >= min_delta_us
+        if failed:
+            regressed.append(name)
+        print(f"{name:36} {expected_us:>10.1f}us -> {result['best_p50_us']:>10.1f}us  {change:+7.1%}"
+              f"{'  REGRESSED' if failed else ''}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"{len(missing)} baseline case(s) not run")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node microbenchmarks with a baseline regression gate.")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--only", help="Run only the cases whose name matches this regex")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a case regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed best-p50 slowdown (fraction)")
+    parser.add_argument("--min-delta-us", type=float, default=20.0,
+                        help="Slowdowns smaller than this many microseconds never fail the check")
+    parser.add_argument("--no-calibrate", action="store_true",
+                        help="Compare raw timings instead of scaling the baseline by host speed")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    current = run(args.only, args.iterations, args.rounds, args.warmup)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.save_baseline:
+        if args.only:
+            parser.error("--save-baseline records every case; drop --only")
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.check:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressed = compare(current, baseline, args.tolerance, args.min_delta_us, not args.no_calibrate)
+        if regressed:
+            print(f"{len(regressed)} case(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Prompt sizes per LLM node across the benchmark query set.
+
+Runs the warm-up queries, the seeded FAQ questions and a few card and off-topic
+queries through ``classify_intent`` and, for knowledge queries, ``retrieve_knowledge``
+and ``generate_response``. The fake LLM backend records the messages each node
+sends. For every node it reports:
+
+- the template's static system prefix (``prefix_id``, chars, estimated tokens), which
+  is identical for every request and so can be served from a provider's prompt cache
+- the variable part (conversation, passages, query): p50/p95/max estimated tokens
+- the prefix's share of the prompt, and how many prompts reach the provider's
+  minimum cacheable length (``--cache-min-tokens``, 1024 for OpenAI)
+
+``--conversation`` measures turns that carry a full session memory (core/memory.py):
+MEMORY_MAX_TURNS earlier turns and a summary at its size cap.
+
+    python benchmarks/prompt_size_report.py
+    python benchmarks/prompt_size_report.py --conversation --output prompt-sizes.json
+"""
+
+import os
+import sys
+import json
+import argparse
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+from core import knowledge, memory
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import classify_intent
+from core.prompts import CHARS_PER_TOKEN, TEMPLATES
+from data import load_faq_questions, load_financial_products, load_warmup_queries
+from vector_db.populate_vector_db import build_product_index
+
+EXTRA_QUERIES = [
+    "Please activate my card ending in 4444 with CVV 123 and expiry date 05/27",
+    "Deactivate my card ending in 8888, it was stolen",
+    "What is the weather today?",
+]
+
+
+class RecordingBackend(FakeLLMBackend):
+    """Fake backend that keeps the messages of every request."""
+
+    def __init__(self):
+        super().__init__(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0)
+        self.requests = []
+
+    def chat_completion(self, **kwargs):
+        self.requests.append(kwargs["messages"])
+        return super().chat_completion(**kwargs)
+
+
+def query_set() -> list[str]:
+    queries = list(load_warmup_queries())
+    for questions in load_faq_questions().values():
+        queries.extend(questions)
+    queries.extend(EXTRA_QUERIES)
+    return list(dict.fromkeys(queries))
+
+def session_memory(queries: list[str]) -> dict:
+    """History and summary of a session at its bounds, built from the query set itself."""
+    history, summary = [], None
+    for query in queries[:memory.MEMORY_MAX_TURNS * 4]:
+        update = memory.add_turn(history, summary, query, f"Here is what I found about: {query} " * 4, "knowledge")
+        history, summary = update["history"], update.get("summary", summary)
+    return {"history": history, "summary": summary}
+
+def measure(queries: list[str], conversation: dict) -> dict[str, list[list[dict]]]:
+    """Messages sent per node, one entry per query that reached the node."""
+    backend = RecordingBackend()
+    set_backend(backend)
+    sent = {name: [] for name in TEMPLATES}
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for query in queries:
+            state = {"user_query": query, **conversation}
+            backend.requests.clear()
+            update = classify_intent(state)
+            if backend.requests:
+                sent["classify_intent"].append(backend.requests[0])  # an escalation resends the same prompt
+            if update["intent"] != "knowledge":
+                continue
+            state = {**state, **update, "deadline": None, "answer_mode": "llm"}
+            state.update(knowledge.retrieve_knowledge(state))
+            backend.requests.clear()
+            knowledge.generate_response(state)
+            if backend.requests:
+                sent["generate_response"].append(backend.requests[0])
+    return sent
+
+def summarize(name: str, requests: list[list[dict]], cache_min_tokens: int) -> dict:
+    template = TEMPLATES[name]
+    if not requests:
+        return {"prompts": 0, "prefix_id": template.prefix_id}
+    sizes = [template.sizes(messages) for messages in requests]
+    if any(messages[0]["content"] != template.system for messages in requests):
+        raise RuntimeError(f"{name} sent a system message that differs from its template prefix")
+    variable = np.array([s["variable_tokens"] for s in sizes])
+    total = variable + sizes[0]["prefix_tokens"]
+    return {
+        "prompts": len(requests),
+        "prefix_id": template.prefix_id,
+        "prefix_chars": sizes[0]["prefix_chars"],
+        "prefix_tokens": sizes[0]["prefix_tokens"],
+        "variable_tokens": {"p50": int(np.percentile(variable, 50)), "p95": int(np.percentile(variable, 95)),
+                            "max": int(variable.max())},
+        "total_tokens": {"p50": int(np.percentile(total, 50)), "p95": int(np.percentile(total, 95)),
+                         "max": int(total.max())},
+        "prefix_share": round(float(np.mean(sizes[0]["prefix_tokens"] / total)), 3),
+        "cacheable_prompts": int((total >= cache_min_tokens).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report prompt sizes per LLM node over the benchmark queries.")
+    parser.add_argument("--conversation", action="store_true", help="Add a session memory at its size bounds")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024,
+                        help="Shortest prompt the provider caches a prefix for")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+    queries = query_set()
+    conversation = session_memory(queries) if args.conversation else {}
+    sent = measure(queries, conversation)
+
+    report = {"queries": len(queries), "conversation": args.conversation, "chars_per_token": CHARS_PER_TOKEN,
+              "cache_min_tokens": args.cache_min_tokens,
+              "nodes": {name: summarize(name, requests, args.cache_min_tokens) for name, requests in sent.items()}}
+    print(f"{len(queries)} queries{' with a full session memory' if args.conversation else ''} "
+          f"(~{CHARS_PER_TOKEN} chars/token)")
+    for name, node in report["nodes"].items():
+        if not node["prompts"]:
+            print(f"{name:18} no prompts")
+            continue
+        print(f"{name:18} prompts={node['prompts']:<4} prefix={node['prefix_tokens']} tok ({node['prefix_id']})  "
+              f"variable p50/p95/max={node['variable_tokens']['p50']}/{node['variable_tokens']['p95']}/"
+              f"{node['variable_tokens']['max']}  total p50={node['total_tokens']['p50']}  "
+              f"prefix share={node['prefix_share']:.0%}  >= {args.cache_min_tokens} tok: {node['cacheable_prompts']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
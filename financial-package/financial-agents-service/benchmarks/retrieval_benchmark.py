@@ -0,0 +1,377 @@
+"""Retrieval latency vs. recall benchmark.
+
+Builds exact, HNSW and hybrid (BM25 + dense) indexes over synthetic catalogs of
+increasing size, replays the catalog's labeled queries through
+``core.knowledge.retrieve_knowledge`` and reports, per configuration:
+
+- recall@k and MRR against the labeled relevant passages (and product hit rate)
+- p50/p99 query latency and throughput for the whole node (embedding + search)
+- index build time, estimated resident index size and process RSS
+- for non-exact methods, recall and memory relative to exact search at the same top_k
+- for sharded search, the share of queries answered with partial results
+
+Before the synthetic runs, a quality gate replays the seeded FAQ questions
+(data/faq_questions.json, labeled by product) against an index of the real catalog
+built with the configured embedder. The run exits 1 when the share answered by the
+right product first is below ``--min-catalog-top1``, so a default embedder or
+retrieval change that sends "What is an FSA?" to another product cannot land
+(``--catalog-only`` runs just this check).
+
+Results are written as JSON for regression tracking:
+
+    python benchmarks/retrieval_benchmark.py --sizes 10000,100000 --output retrieval.json
+    python benchmarks/retrieval_benchmark.py --methods hnsw --m 8,16,32 --ef-search 16,64,256 --top-k 3,10
+    python benchmarks/retrieval_benchmark.py --methods exact,int8,pq --rerank 0,100 --pq-m 48,96
+    python benchmarks/retrieval_benchmark.py --methods exact,sharded --shards 1,2,4 --concurrency 8
+    python benchmarks/retrieval_benchmark.py --catalog data/catalog --sizes 500000
+    python benchmarks/retrieval_benchmark.py --catalog-only
+
+Without ``--catalog`` the catalog is generated in-process with the same generator as
+``scripts/generate_synthetic_data.py``. HNSW configurations are skipped when hnswlib
+is not installed. Quantized methods (int8, pq) re-rank against full vectors that are
+published as a temporary snapshot and memory-mapped, as in production; sharded
+search splits the same snapshot across worker processes.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import shutil
+import tempfile
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+from core import knowledge
+from data import iter_catalog, load_faq_questions, load_financial_products
+from scripts.generate_synthetic_data import generate_product, product_passages, product_queries
+from vector_db.embeddings import embed_texts, get_embedder
+from vector_db.index import VectorIndex
+from vector_db.hnsw import HNSWIndex, hnswlib
+from vector_db.hybrid import BM25Index, HybridIndex
+from vector_db.populate_vector_db import build_product_index
+from vector_db.quantization import QuantizedIndex
+from vector_db.sharded import ShardedIndex
+from vector_db.snapshot import load_snapshot, publish_snapshot
+
+METHODS = ("exact", "hnsw", "hybrid", "int8", "pq", "sharded")
+
+
+# --- Catalog ---
+def generated_catalog(size: int, num_queries: int, seed: int) -> tuple[list[dict], list[dict]]:
+    """Generates products until ``size`` passages exist, plus queries for a random sample of them."""
+    passages, products = [], []
+    index = 0
+    while len(passages) < size:
+        product = generate_product(index, seed)
+        products.append(product)
+        passages.extend(product_passages(product))
+        index += 1
+    rng = random.Random(f"{seed}:benchmark-queries")
+    queries = []
+    for product in rng.sample(products, min(num_queries, len(products))):
+        queries.extend(product_queries(product, rng))
+    return passages, queries
+
+def file_catalog(catalog_dir: str, size: int, num_queries: int) -> tuple[list[dict], list[dict]]:
+    """Takes the first ``size`` passages of a generated catalog and the queries they can answer."""
+    passages = list(itertools.islice(iter_catalog("passages", catalog_dir), size))
+    known = {p["id"] for p in passages}
+    queries = [q for q in iter_catalog("queries", catalog_dir)
+               if all(pid in known for pid in q["relevant_passage_ids"])][:num_queries]
+    if len(queries) < num_queries:
+        print(f"Only {len(queries)} labeled queries fall within the first {size} passages")
+    return passages, queries
+
+
+# --- Measurement ---
+def rss_mb() -> float:
+    """Current resident set size (Linux), falling back to the peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def _timed_retrieve(query: dict) -> tuple[float, dict]:
+    state = {"query": query["query"], "search_results": [], "response": "", "error": None}
+    start = time.perf_counter()
+    result = knowledge.retrieve_knowledge(state)
+    return time.perf_counter() - start, result
+
+def replay(queries: list[dict], top_k: int, warmup: int, concurrency: int = 1) -> dict:
+    """Runs every query through the knowledge agent's retrieve node and scores the results.
+
+    With ``concurrency`` > 1 the queries are issued from that many threads, as
+    concurrent API requests would be; throughput is measured over wall-clock time.
+    """
+    knowledge.KNOWLEDGE_TOP_K = top_k
+    latencies, reciprocal_ranks, recalls, product_hits = [], [], [], []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(_timed_retrieve, queries[:warmup]))
+        start = time.perf_counter()
+        timed = list(pool.map(_timed_retrieve, queries))
+        wall_s = time.perf_counter() - start
+        for query, (latency, result) in zip(queries, timed):
+            latencies.append(latency)
+            if result["error"]:
+                raise RuntimeError(result["error"])
+
+            ids = [r["id"] for r in result["search_results"]]
+            relevant = set(query["relevant_passage_ids"])
+            recalls.append(len(relevant.intersection(ids)) / len(relevant))
+            first = next((rank for rank, pid in enumerate(ids, 1) if pid in relevant), None)
+            reciprocal_ranks.append(1.0 / first if first else 0.0)
+            products = {r["metadata"].get("id") for r in result["search_results"]}
+            product_hits.append(bool(products.intersection(query["relevant_product_ids"])))
+
+    latencies.sort()
+    return {
+        "queries": len(queries),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "product_hit_rate": round(float(np.mean(product_hits)), 4),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "qps": round(len(latencies) / wall_s, 1) if latencies else 0.0,
+    }
+
+
+# --- Catalog quality gate ---
+def catalog_top1(top_k: int = 3) -> dict:
+    """Share of the seeded FAQ questions whose first retrieved passage is the question's product."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+    knowledge.KNOWLEDGE_TOP_K = top_k
+    questions = [(product_id, q) for product_id, qs in load_faq_questions().items() for q in qs]
+    misses = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for product_id, question in questions:
+            _, result = _timed_retrieve({"query": question})
+            first = (result["search_results"] or [{}])[0].get("id")
+            if first != product_id:
+                misses.append({"query": question, "expected": product_id, "got": first})
+    return {"embedding": get_embedder().embedding_id, "queries": len(questions),
+            "top1": round(1 - len(misses) / len(questions), 4) if questions else 1.0, "misses": misses}
+
+# --- Benchmark ---
+def index_configs(method: str, args) -> list[dict]:
+    if method == "exact":
+        return [{}]
+    if method == "hnsw":
+        return [{"m": m, "ef_construction": args.ef_construction, "ef_search": ef}
+                for m in args.m for ef in args.ef_search]
+    if method == "hybrid":
+        return [{"alpha": alpha, "candidates": args.candidates} for alpha in args.alpha]
+    if method == "int8":
+        return [{"rerank": rerank} for rerank in args.rerank]
+    if method == "sharded":
+        return [{"shards": n, "shard_by": args.shard_by, "timeout_ms": args.shard_timeout_ms} for n in args.shards]
+    return [{"pq_m": m, "rerank": rerank} for m in args.pq_m for rerank in args.rerank]
+
+def add_deltas(results: list[dict]):
+    """Adds recall and resident-memory deltas against exact search with the same size and top_k."""
+    exact = {(r["size"], r["params"]["top_k"]): r for r in results if r["method"] == "exact"}
+    for row in results:
+        baseline = exact.get((row["size"], row["params"]["top_k"]))
+        if baseline is None or row is baseline:
+            continue
+        row["recall_delta_vs_exact"] = round(row["recall_at_k"] - baseline["recall_at_k"], 4)
+        row["mrr_delta_vs_exact"] = round(row["mrr"] - baseline["mrr"], 4)
+        if row["index_mb"]:
+            row["memory_reduction_vs_exact"] = round(baseline["index_mb"] / row["index_mb"], 2)
+
+def run(args) -> dict:
+    results = []
+    methods = [m for m in args.methods if m != "hnsw" or hnswlib is not None]
+    if len(methods) < len(args.methods):
+        print("hnswlib is not installed; skipping HNSW configurations")
+
+    for size in args.sizes:
+        if args.catalog:
+            passages, queries = file_catalog(args.catalog, size, args.queries)
+        else:
+            passages, queries = generated_catalog(size, args.queries, args.seed)
+        records = [{"id": p["id"], "text": p["text"], "metadata": p["metadata"]} for p in passages]
+        del passages
+
+        start = time.perf_counter()
+        exact = VectorIndex.build(records, embed_texts)
+        embed_s = time.perf_counter() - start
+        print(f"\n== {len(exact):,} passages, {len(queries)} queries (embedded in {embed_s:.1f}s) ==")
+
+        bm25 = bm25_build_s = None
+        graphs = {}  # (m, ef_construction) -> (HNSWIndex, build seconds)
+        quantized = {}  # (method, pq_m) -> (QuantizedIndex, build seconds)
+        snapshot_root = mapped = None
+        for method in methods:
+            for config in index_configs(method, args):
+                rss_before = rss_mb()
+                start = time.perf_counter()
+                if method == "exact":
+                    index, build_s = exact, 0.0
+                elif method == "hnsw":
+                    key = (config["m"], config["ef_construction"])
+                    if key not in graphs:
+                        graph = HNSWIndex(exact, m=config["m"], ef_construction=config["ef_construction"])
+                        graphs[key] = (graph, time.perf_counter() - start)
+                    index, build_s = graphs[key]
+                    index.ef_search = config["ef_search"]
+                elif method == "hybrid":
+                    if bm25 is None:
+                        bm25 = BM25Index([r["text"] for r in records])
+                        bm25_build_s = time.perf_counter() - start
+                    index = HybridIndex(exact, bm25, alpha=config["alpha"], candidates=config["candidates"])
+                    build_s = bm25_build_s
+                else:
+                    if mapped is None:
+                        snapshot_root = tempfile.mkdtemp(prefix="retrieval-benchmark-")
+                        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                            publish_snapshot(exact, snapshot_root)
+                        mapped = load_snapshot(snapshot_root)
+                        start = time.perf_counter()
+                    key = (method, config.get("pq_m"))
+                    if method == "sharded":
+                        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                            index = ShardedIndex.from_snapshot(mapped, snapshot_root, config["shards"], config["shard_by"],
+                                                               timeout_s=config["timeout_ms"] / 1000.0)
+                            index.start()
+                        build_s = time.perf_counter() - start
+                    else:
+                        if key not in quantized:
+                            train = {"m": config["pq_m"]} if method == "pq" else {}
+                            quantized[key] = (QuantizedIndex.build(mapped, method, **train),
+                                              time.perf_counter() - start)
+                        index, build_s = quantized[key]
+                        index.rerank = config["rerank"]
+
+                knowledge.set_knowledge_index(index)
+                for top_k in args.top_k:
+                    metrics = replay(queries, top_k, args.warmup, args.concurrency)
+                    row = {
+                        "size": len(exact),
+                        "method": method,
+                        "params": {**config, "top_k": top_k},
+                        "build_s": round(embed_s + build_s, 3),
+                        "index_build_s": round(build_s, 3),
+                        "index_mb": round(index.nbytes / 1024 / 1024, 2),
+                        "rss_mb": round(rss_mb(), 1),
+                        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+                        **metrics,
+                    }
+                    if method == "sharded":
+                        counters = index.metrics()
+                        row["partial_rate"] = round(counters["partial"] / max(1, counters["queries"]), 4)
+                    results.append(row)
+                    params = " ".join(f"{k}={v}" for k, v in row["params"].items())
+                    print(f"{method:6s} {params:48s} recall@k={row['recall_at_k']:.3f} mrr={row['mrr']:.3f} "
+                          f"p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms build={row['index_build_s']:.1f}s "
+                          f"index={row['index_mb']:.1f}MB")
+                if method == "sharded":
+                    index.close()
+        del exact, bm25, graphs, quantized, mapped, records
+        if snapshot_root:
+            shutil.rmtree(snapshot_root, ignore_errors=True)
+
+    add_deltas(results)
+
+    return {
+        "benchmark": "retrieval",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "hnswlib": hnswlib is not None, "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {"sizes": args.sizes, "queries": args.queries, "seed": args.seed, "catalog": args.catalog,
+                   "methods": args.methods, "m": args.m, "ef_search": args.ef_search,
+                   "ef_construction": args.ef_construction, "alpha": args.alpha, "rerank": args.rerank,
+                   "pq_m": args.pq_m, "shards": args.shards, "shard_by": args.shard_by,
+                   "shard_timeout_ms": args.shard_timeout_ms, "concurrency": args.concurrency, "top_k": args.top_k},
+        "results": results,
+    }
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+def _floats(value: str) -> list[float]:
+    return [float(v) for v in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval recall and latency across index types.")
+    parser.add_argument("--sizes", type=_ints, default=[10000, 50000], help="Comma-separated passage counts")
+    parser.add_argument("--queries", type=int, default=500, help="Labeled queries per size")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the generated catalog")
+    parser.add_argument("--catalog", help="Read passages/queries from a generated catalog directory instead")
+    parser.add_argument("--methods", type=lambda v: v.split(","), default=list(METHODS),
+                        help=f"Comma-separated subset of {','.join(METHODS)}")
+    parser.add_argument("--top-k", type=_ints, default=[3, 10])
+    parser.add_argument("--m", type=_ints, default=[16], help="HNSW graph degree values")
+    parser.add_argument("--ef-search", type=_ints, default=[16, 64, 256], help="HNSW ef_search values")
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--alpha", type=_floats, default=[0.5], help="Hybrid dense weight values")
+    parser.add_argument("--candidates", type=int, default=50, help="Hybrid candidates per ranking")
+    parser.add_argument("--rerank", type=_ints, default=[0, 100],
+                        help="Quantized candidates re-ranked against full vectors (0 = codes only)")
+    parser.add_argument("--pq-m", type=_ints, default=[48], help="PQ sub-space counts (must divide 384)")
+    parser.add_argument("--shards", type=_ints, default=[2, 4], help="Shard worker process counts")
+    parser.add_argument("--shard-by", default="hash", choices=["hash", "category"], help="Partition strategy")
+    parser.add_argument("--shard-timeout-ms", type=float, default=200.0, help="Per-shard deadline")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads issuing queries concurrently")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed queries before each measurement")
+    parser.add_argument("--min-catalog-top1", type=float, default=1.0,
+                        help="Fail when fewer FAQ questions than this retrieve their own product first")
+    parser.add_argument("--catalog-only", action="store_true", help="Run only the catalog quality gate")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.methods) - set(METHODS)
+    if unknown:
+        parser.error(f"unknown methods: {', '.join(sorted(unknown))}")
+
+    quality = catalog_top1()
+    print(f"Catalog top-1 with {quality['embedding']}: {quality['top1']:.1%} of {quality['queries']} FAQ questions")
+    for miss in quality["misses"]:
+        print(f"  {miss['query']!r}: expected {miss['expected']}, got {miss['got']}")
+    if quality["top1"] < args.min_catalog_top1:
+        print(f"Catalog top-1 is below --min-catalog-top1 {args.min_catalog_top1:.1%}")
+        return 1
+    if args.catalog_only:
+        return 0
+
+    report = run(args)
+    report["catalog_quality"] = quality
+    for row in report["results"]:
+        if "recall_delta_vs_exact" in row:
+            params = " ".join(f"{k}={v}" for k, v in row["params"].items())
+            print(f"{row['size']:>8,} {row['method']:6s} {params:40s} recall delta {row['recall_delta_vs_exact']:+.3f}, "
+                  f"{row['index_mb']:.1f} MB resident ({row.get('memory_reduction_vs_exact', 0):.2f}x reduction)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(report['results'])} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Per-request memory and allocation benchmark for the agent graphs.
+
+Invokes the orchestrator (knowledge and card paths) and the knowledge and card
+agents directly, with the LLM answered by the fake backend, a synthetic catalog
+large enough for ``search_results`` to carry real passages, and the card agent
+talking to ``scripts/mock_card_service.py`` in a subprocess (so its allocations
+are not traced). For every request tracemalloc records:
+
+- peak: the high-water mark of traced memory above the pre-request level, i.e.
+  how much the request had allocated and live at once (state copies included)
+- retained: traced memory still held after the request (should be ~0). In the
+  ``*_checkpointed`` scenarios the graph is compiled with an in-memory checkpointer
+  and a fresh thread per request, so retained is the size of the stored checkpoints:
+  every key a node returns is written to a new channel version and persisted again
+
+Latency is measured in a separate, untraced pass. Results are written as JSON;
+``--compare`` prints the change against an earlier run:
+
+    python benchmarks/state_memory_benchmark.py --output state-before.json
+    python benchmarks/state_memory_benchmark.py --compare state-before.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import numpy as np
+import requests
+from langgraph.checkpoint.memory import MemorySaver
+from core import card, knowledge
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import app as orchestrator_app, workflow as orchestrator_workflow
+from retrieval_benchmark import generated_catalog, percentile
+from vector_db.embeddings import embed_texts
+from vector_db.index import VectorIndex
+
+KNOWLEDGE_QUERY = "What are the monthly fees and ATM limits on the prepaid card?"
+CARD_QUERY = "Please deactivate my card ending in 8888"
+
+_checkpointed = {}
+_thread_ids = iter(range(10**9))
+
+def _invoke_checkpointed(workflow, inputs: dict):
+    if workflow not in _checkpointed:
+        _checkpointed[workflow] = workflow.compile(checkpointer=MemorySaver())
+    return _checkpointed[workflow].invoke(inputs, {"configurable": {"thread_id": str(next(_thread_ids))}})
+
+SCENARIOS = {
+    "orchestrator_knowledge": lambda: orchestrator_app.invoke({"user_query": KNOWLEDGE_QUERY}),
+    "orchestrator_card": lambda: orchestrator_app.invoke({"user_query": CARD_QUERY}),
+    "knowledge_agent": lambda: knowledge.knowledge_agent_app.invoke({"query": KNOWLEDGE_QUERY}),
+    "card_agent": lambda: card.card_agent_app.invoke({
+        "action": "deactivate", "card_number": "8888", "parameters": {"reason": "benchmark"},
+        "api_response": None, "confirmation_message": "", "error": None}),
+    "orchestrator_checkpointed": lambda: _invoke_checkpointed(orchestrator_workflow, {"user_query": KNOWLEDGE_QUERY}),
+    "knowledge_agent_checkpointed": lambda: _invoke_checkpointed(knowledge.knowledge_workflow, {"query": KNOWLEDGE_QUERY}),
+}
+
+
+# --- Setup ---
+def start_mock_card_service() -> tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(parent_dir, "scripts", "mock_card_service.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--latency-ms", "0", "--jitter-ms", "0"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base_url}/actuator/health", timeout=0.5)
+            return process, f"{base_url}/api/cards"
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock card service did not start")
+
+def setup(args):
+    set_backend(FakeLLMBackend())
+    passages, _ = generated_catalog(args.passages, 0, args.seed)
+    records = [{"id": p["id"], "text": p["text"], "metadata": p["metadata"]} for p in passages]
+    knowledge.set_knowledge_index(VectorIndex.build(records, embed_texts))
+    knowledge.KNOWLEDGE_TOP_K = args.top_k
+
+
+# --- Measurement ---
+def measure(invoke, requests_count: int, warmup: int) -> dict:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(warmup):
+            invoke()
+
+        latencies = []
+        for _ in range(requests_count):
+            start = time.perf_counter()
+            invoke()
+            latencies.append(time.perf_counter() - start)
+
+        peaks, retained = [], []
+        tracemalloc.start()
+        try:
+            for _ in range(requests_count):
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                invoke()
+                current, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                retained.append(current - before)
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    peaks.sort()
+    return {
+        "requests": requests_count,
+        "peak_kb_mean": round(float(np.mean(peaks)) / 1024, 2),
+        "peak_kb_p50": round(percentile(peaks, 50) / 1024, 2),
+        "peak_kb_p99": round(percentile(peaks, 99) / 1024, 2),
+        "retained_bytes_mean": round(float(np.mean(retained)), 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nChange against {baseline_path}:")
+    for name, row in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = (row["peak_kb_mean"] - before["peak_kb_mean"]) / before["peak_kb_mean"] * 100
+        print(f"  {name:28s} peak {before['peak_kb_mean']:7.1f} -> {row['peak_kb_mean']:7.1f} KiB ({change:+.1f}%), "
+              f"retained {before['retained_bytes_mean']:8.0f} -> {row['retained_bytes_mean']:8.0f} B, "
+              f"p50 {before['p50_ms']:.2f} -> {row['p50_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-request memory allocated by the agent graphs.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--passages", type=int, default=5000, help="Synthetic catalog size")
+    parser.add_argument("--top-k", type=int, default=10, help="Passages carried in search_results")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS),
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    setup(args)
+    mock = None
+    if any("card" in name for name in args.scenarios):
+        mock, card.CARD_API_BASE_URL = start_mock_card_service()
+    try:
+        results = {}
+        for name in args.scenarios:
+            results[name] = measure(SCENARIOS[name], args.requests, args.warmup)
+            row = results[name]
+            print(f"{name:28s} peak={row['peak_kb_mean']:8.1f} KiB (p99 {row['peak_kb_p99']:.1f}) "
+                  f"retained={row['retained_bytes_mean']:8.0f} B p50={row['p50_ms']:.2f}ms")
+    finally:
+        if mock is not None:
+            mock.terminate()
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        report = {
+            "benchmark": "state_memory",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "environment": {"python": platform.python_version(), "machine": platform.machine()},
+            "config": {"requests": args.requests, "passages": args.passages, "top_k": args.top_k, "seed": args.seed},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,47 @@
 import os
 import requests
+from urllib.parse import urljoin
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
 from dotenv import load_dotenv
+from core.deadline import DEADLINE_MIN_CARD_MS, has_budget, timeout_for
 
 # Environment variable loading
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 # --- Configuration ---
-# Base URL for the Card Service API (adjust as needed)
-CARD_API_BASE_URL = "http://card-api:8080/api/cards" # Updated to use the Docker service name
+# Base URL for the Card Service API (defaults to the Docker service name;
+# point it at scripts/mock_card_service.py for local load tests)
+CARD_API_BASE_URL = os.getenv("CARD_API_BASE_URL", "http://card-api:8080/api/cards")
+# Keep-alive connections per worker process to the card service
+CARD_API_POOL_SIZE = int(os.getenv("CARD_API_POOL_SIZE", "32"))
+# Card service timeout (seconds); capped at the time left in the request's deadline
+CARD_API_TIMEOUT_S = float(os.getenv("CARD_API_TIMEOUT_S", "10"))
+# Read-only endpoint used to open the pooled connection at warm-up (Spring Boot actuator)
+CARD_API_HEALTH_URL = os.getenv("CARD_API_HEALTH_URL", urljoin(CARD_API_BASE_URL, "/actuator/health"))
+
+_session = None
+_session_pid = None
+
+def get_card_session() -> requests.Session:
+    """Returns this process's pooled session for the card service.
+
+    Created lazily per process: connections opened before ``fork`` (ui/serve.py)
+    would be shared between workers.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=CARD_API_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({'Content-Type': 'application/json'})
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+def check_card_service(timeout: float = CARD_API_TIMEOUT_S) -> int:
+    """GETs the card service's health endpoint over the pooled session; returns the status code."""
+    return get_card_session().get(CARD_API_HEALTH_URL, timeout=timeout).status_code
 
 # --- Agent State ---
 class CardAgentState(TypedDict):
@@ -22,15 +51,16 @@ class CardAgentState(TypedDict):
     api_response: dict | None # Response from the card API
     confirmation_message: str # User-facing message
     error: str | None
+    deadline: float | None # Absolute request deadline (see core/deadline.py)
 
 # --- Tool (API Call Function) ---
-def call_card_api(action: str, card_number: str, parameters: dict) -> dict:
+def call_card_api(action: str, card_number: str, parameters: dict, timeout: float = CARD_API_TIMEOUT_S) -> dict:
     """Calls the Card Service API."""
     url = f"{CARD_API_BASE_URL}/{action}"
     payload = {"cardLastFour": card_number, **parameters}
     
     try:
-        response = requests.post(url, json=payload, headers={'Content-Type': 'application/json'}, timeout=10)
+        response = get_card_session().post(url, json=payload, timeout=timeout)
         api_data = response.json() if response.content else {"message": "No content"}
         
         if response.ok:
@@ -42,21 +72,37 @@ def call_card_api(action: str, card_number: str, parameters: dict) -> dict:
             "status_code": response.status_code,
             "api_response": api_data
         }
+    except requests.Timeout:
+        # The service may still apply the action; the caller is told the outcome is unknown
+        return {"success": False, "message": f"The card service did not answer within {timeout:.1f}s; "
+                                             "the action may still be applied, please check the card status",
+                "timed_out": True}
     except Exception as e:
         return {"success": False, "message": f"API error: {str(e)}"}
 
 # --- Nodes ---
-def execute_card_action(state: CardAgentState) -> CardAgentState:
+def execute_card_action(state: CardAgentState) -> dict:
     """Executes the requested card action by calling the API."""
-    api_result = call_card_api(state['action'], state['card_number'], state['parameters'])
+    deadline = state.get('deadline')
+    if not has_budget(deadline, DEADLINE_MIN_CARD_MS):
+        # Not enough time left to get a confirmation: do not start a state-changing call
+        message = "Request deadline exceeded before the card service was called"
+        return {
+            "api_response": None,
+            "confirmation_message": f"The {state['action']} request was not sent because it ran out of time. "
+                                    "Please try again.",
+            "error": message
+        }
+    api_result = call_card_api(state['action'], state['card_number'], state['parameters'],
+                               timeout=timeout_for(deadline, CARD_API_TIMEOUT_S))
     
     if api_result.get("success"):
         confirmation_message = api_result.get("message", f"Card {state['action']} processed successfully.")
     else:
         confirmation_message = f"Failed to {state['action']} card. Error: {api_result.get('message')}"
     
+    # Partial update: only the keys this node sets
     return {
-        **state, 
         "api_response": api_result, 
         "confirmation_message": confirmation_message, 
         "error": None if api_result.get("success") else api_result.get("message")
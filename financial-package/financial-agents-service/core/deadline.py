@@ -0,0 +1,51 @@
+"""Per-request deadlines carried in graph state.
+
+The API sets ``deadline`` (an absolute ``time.time()`` value, so it survives
+checkpointing) when a request arrives. Every node and external call derives its
+timeout from the time left instead of using a fixed one, so a slow classification
+shortens the card call rather than adding to it. When too little time is left for
+a step, the node takes its cheaper path or reports a timeout.
+"""
+
+import os
+import time
+
+# --- Configuration ---
+# Overall budget of a /api/chat or card-operation request
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "15000"))
+# Below this much time left, nodes skip the LLM call (or the strong-tier escalation)
+DEADLINE_MIN_LLM_MS = float(os.getenv("DEADLINE_MIN_LLM_MS", "1500"))
+# Below this much time left, the card service is not called
+DEADLINE_MIN_CARD_MS = float(os.getenv("DEADLINE_MIN_CARD_MS", "500"))
+# How long past the deadline the API still waits for a graph before answering with a timeout
+DEADLINE_GRACE_MS = float(os.getenv("DEADLINE_GRACE_MS", "1000"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a step is started with no time left in the request budget."""
+
+
+def deadline_after(ms: float = REQUEST_DEADLINE_MS) -> float:
+    return time.time() + ms / 1000.0
+
+def remaining_s(deadline: float | None) -> float | None:
+    """Seconds left before ``deadline``; None when the request has no deadline."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+def has_budget(deadline: float | None, min_ms: float) -> bool:
+    remaining = remaining_s(deadline)
+    return remaining is None or remaining * 1000.0 >= min_ms
+
+def timeout_for(deadline: float | None, default: float) -> float:
+    """Timeout in seconds for a call: ``default``, capped at the time left.
+
+    Raises DeadlineExceeded when the deadline has already passed.
+    """
+    remaining = remaining_s(deadline)
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded by {-remaining * 1000:.0f} ms")
+    return min(default, remaining)
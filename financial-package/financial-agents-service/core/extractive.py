@@ -0,0 +1,138 @@
+"""LLM-free answers extracted from the retrieved passages.
+
+Passages are either product records flattened to ``Label: value`` lines
+(vector_db/populate_vector_db.py) or one-section passages of the synthetic catalog
+(``metadata["section"]``). Each passage is split into candidate sentences: one per
+field, with long descriptions split further. A sentence is scored by:
+
+- the overlap between the query's terms and the sentence's (product name included)
+- a bonus when its field matches the kind of question (fees, limits, eligibility...)
+- its passage's retrieval rank
+
+The best few sentences are rendered with per-field templates. No model is called,
+so an answer takes well under a millisecond.
+"""
+
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or tell the to what with you your "
+    "there this that any about".split()
+)
+
+# Query words (prefixes) that ask for a particular field
+FIELD_CUES = {
+    "fees": ("fee", "cost", "charge", "price", "pay", "monthly", "atm", "reload", "expensive"),
+    "limits": ("limit", "contribut", "maximum", "max", "much", "deposit"),
+    "eligibility": ("eligib", "qualif", "who", "requirement", "open", "allowed"),
+    "features": ("feature", "benefit", "offer", "include", "perk", "advantage"),
+    "notes": ("restrict", "note", "know", "before", "catch"),
+}
+
+TEMPLATES = {
+    "fees": "Fees for the {name}: {value}",
+    "limits": "{label} for the {name}: {value}",
+    "eligibility": "Eligibility for the {name}: {value}",
+    "features": "Features of the {name}: {value}",
+    "notes": "Note on the {name}: {value}",
+    "overview": "{value}",
+}
+
+# Weights of the three scoring terms
+FIELD_MATCH_WEIGHT = 1.0
+RANK_WEIGHT = 0.3
+# Sentences scoring below this fraction of the best one are left out
+MIN_RELATIVE_SCORE = 0.75
+
+
+def _terms(text: str) -> set[str]:
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w
+            for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS}
+
+def query_fields(query: str) -> set[str]:
+    """Fields the question asks about, from its cue words; the overview when it names no field."""
+    words = _TOKEN_RE.findall(query.lower())
+    fields = {field for field, cues in FIELD_CUES.items() if any(w.startswith(cue) for w in words for cue in cues)}
+    return fields - {"overview"} or {"overview"}
+
+def _field_for_label(label: str) -> tuple[str | None, str]:
+    label = label.strip().lower()
+    if label.startswith("contribution limit"):
+        kind = label[len("contribution limit"):].strip(" s")
+        return "limits", f"{kind.capitalize()} contribution limit" if kind else "Contribution limit"
+    if label == "description":
+        return "overview", ""
+    if label.rstrip("s") in ("fee", "feature", "note"):
+        return label.rstrip("s") + "s", ""
+    if label == "eligibility":
+        return label, ""
+    return None, ""
+
+def _sentences(result: dict) -> list[dict]:
+    """Candidate sentences of one passage: ``{"field", "label", "name", "value"}``."""
+    metadata = result.get("metadata") or {}
+    text = result.get("text") or ""
+    name = metadata.get("name") or ""
+    fields = []
+    if metadata.get("section"):
+        # Synthetic catalog passage, already phrased: "<Section> for the <name>: <value>"
+        # or "<name>. <description>"
+        section = metadata["section"]
+        if section == "overview" and name and text.startswith(name):
+            fields.append((section, "", text[len(name):].lstrip(". ")))
+        else:
+            return [{"field": section, "name": name, "value": text, "rendered": text}]
+    else:
+        for line in text.splitlines():
+            label, _, value = line.partition(": ")
+            if label.strip().lower() == "name":
+                name = name or value.strip()
+                continue
+            field, nice_label = _field_for_label(label)
+            if field and value.strip():
+                fields.append((field, nice_label, value.strip()))
+
+    sentences = []
+    for field, label, value in fields:
+        parts = _SENTENCE_RE.split(value) if field == "overview" else [value]
+        for part in parts:
+            if part.strip():
+                sentences.append({"field": field, "label": label, "name": name or "product", "value": part.strip()})
+    return sentences
+
+def _render(sentence: dict) -> str:
+    text = sentence.get("rendered") or TEMPLATES.get(sentence["field"], "{value}").format(**sentence)
+    if sentence["field"] == "overview" and sentence["name"] not in text:
+        text = f"{sentence['name']}: {text}"
+    return text if text.endswith((".", "!", "?")) else text + "."
+
+def extractive_answer(query: str, search_results: list[dict], max_sentences: int = 3) -> str:
+    """Answers ``query`` with the best scoring sentences of the retrieved passages."""
+    if not search_results:
+        return "I couldn't find specific information for your query."
+    query_terms = _terms(query)
+    wanted = query_fields(query)
+    scored = []
+    for rank, result in enumerate(search_results):
+        rank_score = RANK_WEIGHT / (rank + 1)
+        for sentence in _sentences(result):
+            terms = _terms(f"{sentence['name']} {sentence['value']}")
+            overlap = len(query_terms & terms) / (len(query_terms) or 1)
+            field_score = FIELD_MATCH_WEIGHT if sentence["field"] in wanted else 0.0
+            scored.append((overlap + field_score + rank_score, rank, sentence))
+    if not scored:
+        return f"Here is the most relevant information I found:\n{search_results[0].get('text', '')}"
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    best = scored[0][0]
+    chosen, seen = [], set()
+    for score, _, sentence in scored:
+        if len(chosen) == max_sentences or score < best * MIN_RELATIVE_SCORE:
+            break
+        rendered = _render(sentence)
+        if rendered not in seen:
+            seen.add(rendered)
+            chosen.append(rendered)
+    return " ".join(chosen)
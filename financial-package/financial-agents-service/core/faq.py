@@ -0,0 +1,125 @@
+"""Precomputed answers to frequent questions, served before the LLM.
+
+scripts/build_faq_store.py answers the seeded FAQ (data/faq_questions.json)
+offline. It writes data/faq_store.json with one entry per question, holding:
+
+- the normalized question and its embedding (base64 float32)
+- the vetted answer
+- the hash of the product record the answer came from
+
+A lookup takes the entry whose normalized question matches exactly. Failing
+that, it takes the closest stored question by cosine similarity, if it reaches
+FAQ_MIN_SIMILARITY.
+
+Stale answers are never served. An entry is skipped once its product record has
+changed (``product_version``). A store embedded with another backend than the
+current one only answers exact matches. The store and the catalog are reloaded
+when either file changes.
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import threading
+import numpy as np
+
+from data import FAQ_STORE_PATH, FINANCIAL_PRODUCTS_PATH, load_financial_products, product_version
+from vector_db.embeddings import embed_texts, get_embedder
+
+# --- Configuration ---
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "1") != "0"
+FAQ_STORE = os.getenv("FAQ_STORE", FAQ_STORE_PATH)
+# Cosine similarity a paraphrase needs to reach to be answered from the store
+FAQ_MIN_SIMILARITY = float(os.getenv("FAQ_MIN_SIMILARITY", "0.9"))
+# Seconds between checks for a rebuilt store or a changed catalog
+FAQ_RELOAD_CHECK_S = float(os.getenv("FAQ_RELOAD_CHECK_S", "5"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def normalize_question(question: str) -> str:
+    """Lower-cases and strips punctuation and extra whitespace."""
+    return " ".join(_TOKEN_RE.findall(question.lower()))
+
+
+class FAQStore:
+    """In-memory view of the servable entries of a FAQ store file."""
+
+    def __init__(self, entries: list[dict], vectors: np.ndarray | None, stale: int = 0):
+        self.entries = entries
+        self.vectors = vectors  # None when the store was embedded with another backend
+        self.stale = stale
+        self._by_question = {entry["question_normalized"]: entry for entry in entries}
+
+    @classmethod
+    def load(cls, path: str = FAQ_STORE, products: list[dict] | None = None) -> "FAQStore":
+        with open(path, "r") as f:
+            store = json.load(f)
+        if products is None:
+            products = load_financial_products()["products"]
+        versions = {p.get("id"): product_version(p) for p in products}
+        entries = [e for e in store["entries"]
+                   if e.get("vetted") and versions.get(e["product_id"]) == e["product_version"]]
+        vectors = None
+        if entries and store.get("embedding") == get_embedder().embedding_id:
+            vectors = np.stack([np.frombuffer(base64.b64decode(e["embedding"]), dtype="<f4") for e in entries])
+        elif entries:
+            print(f"FAQ store {path} was embedded with {store.get('embedding')}; serving exact matches only")
+        faq = cls(entries, vectors, stale=len(store["entries"]) - len(entries))
+        print(f"Loaded FAQ store with {len(entries)} answers ({faq.stale} stale or unvetted skipped)")
+        return faq
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, question: str) -> dict | None:
+        """Returns the matching entry plus ``match`` ("exact"/"similar") and ``similarity``, or None."""
+        entry = self._by_question.get(normalize_question(question))
+        if entry is not None:
+            return {**entry, "match": "exact", "similarity": 1.0}
+        if self.vectors is None or not len(self.entries):
+            return None
+        scores = self.vectors @ embed_texts([question])[0]
+        best = int(np.argmax(scores))
+        if scores[best] < FAQ_MIN_SIMILARITY:
+            return None
+        return {**self.entries[best], "match": "similar", "similarity": round(float(scores[best]), 4)}
+
+
+_store = None
+_store_key = None
+_checked_at = 0.0
+_store_lock = threading.Lock()
+
+def _file_key(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+def get_faq_store(path: str = FAQ_STORE) -> FAQStore | None:
+    """Returns the process-wide store, reloading it when the store or catalog file changed."""
+    global _store, _store_key, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < FAQ_RELOAD_CHECK_S and _store_key is not None:
+        return _store
+    with _store_lock:
+        _checked_at = now
+        key = (path, _file_key(path), _file_key(FINANCIAL_PRODUCTS_PATH))
+        if key != _store_key:
+            _store_key = key
+            try:
+                _store = FAQStore.load(path) if key[1] is not None else None
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load FAQ store {path}: {e}")
+                _store = None
+        return _store
+
+def lookup_faq(question: str) -> dict | None:
+    """Stored answer for ``question``, or None (disabled, no store, or no close match)."""
+    if not FAQ_ENABLED:
+        return None
+    store = get_faq_store()
+    return store.lookup(question) if store is not None else None
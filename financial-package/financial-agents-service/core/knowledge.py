@@ -1,44 +1,223 @@
 import os
+import re
+import threading
+from functools import lru_cache
 from typing import TypedDict, Annotated, Sequence
 import operator
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
 # from opensearchpy import OpenSearch # Placeholder for actual vector DB client
 # Assume vector DB client setup happens elsewhere and is passed or accessed globally/via context
 
-# Environment variable loading
-from dotenv import load_dotenv
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+# LLM access goes through the model router and pluggable backend (see core/model_router.py, core/llm.py)
+from core.model_router import router
+from core.deadline import DEADLINE_MIN_LLM_MS, has_budget
+from core.extractive import extractive_answer
+from core.llm import is_saturated as llm_saturated
+from core.memory import conversation_context, followup_query
+from core.prompts import GENERATE_RESPONSE, conversation_block
+from data import FINANCIAL_PRODUCTS_PATH, load_financial_products
+from vector_db.embeddings import embed_texts, get_embedder
+from vector_db.index import VectorIndex
+from vector_db.populate_vector_db import build_product_index
+from vector_db.quantization import open_quantized
+from vector_db.sharded import ShardedIndex
+from vector_db.snapshot import SnapshotError, SnapshotWatcher, has_snapshot, load_snapshot, publish_snapshot, snapshot_path
+
+# --- Configuration ---
+# Snapshot root for the local index built from data/financial_products.json (see
+# vector_db/snapshot.py); `python -m vector_db.populate_vector_db --local-index DIR`
+# publishes a new version that running workers swap in without a restart
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", os.path.join(os.path.dirname(FINANCIAL_PRODUCTS_PATH), "knowledge_index"))
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+# Candidates searched for products the query names (full name or abbreviation); those
+# are ranked first, ahead of the similarity order (0 disables)
+KNOWLEDGE_NAME_CANDIDATES = int(os.getenv("KNOWLEDGE_NAME_CANDIDATES", "10"))
+# Seconds between checks for a newly published snapshot (0 disables hot swap)
+KNOWLEDGE_SNAPSHOT_POLL_S = float(os.getenv("KNOWLEDGE_SNAPSHOT_POLL_S", "5"))
+# Keep only compressed codes in memory: none, int8 or pq (see vector_db/quantization.py);
+# the top KNOWLEDGE_RERANK candidates are re-scored against the memory-mapped vectors
+KNOWLEDGE_QUANTIZATION = os.getenv("KNOWLEDGE_QUANTIZATION", "none")
+KNOWLEDGE_RERANK = int(os.getenv("KNOWLEDGE_RERANK", "100"))
+# Search backend: local (in-process) or sharded, which splits the snapshot into
+# KNOWLEDGE_SHARDS partitions (by hash of the id or by product category) served by
+# worker processes; shards slower than KNOWLEDGE_SHARD_TIMEOUT_MS are left out of the
+# merged results (see vector_db/sharded.py)
+KNOWLEDGE_BACKEND = os.getenv("KNOWLEDGE_BACKEND", "local")
+KNOWLEDGE_SHARDS = int(os.getenv("KNOWLEDGE_SHARDS", str(os.cpu_count() or 1)))
+KNOWLEDGE_SHARD_BY = os.getenv("KNOWLEDGE_SHARD_BY", "hash")
+KNOWLEDGE_SHARD_TIMEOUT_MS = float(os.getenv("KNOWLEDGE_SHARD_TIMEOUT_MS", "200"))
+# Seconds a replaced sharded index keeps its workers for requests still using it
+KNOWLEDGE_RETIRE_GRACE_S = 30.0
+# How generate_response answers (overridable per request with the "answer_mode" state key):
+#   llm         always the chat completion
+#   extractive  sentences extracted from the top passages, no LLM call (core/extractive.py)
+#   auto        the LLM, or extractive when the deadline is short, the LLM limiter is
+#               saturated, or the completion fails
+KNOWLEDGE_ANSWER_MODE = os.getenv("KNOWLEDGE_ANSWER_MODE", "auto")
+KNOWLEDGE_EXTRACTIVE_SENTENCES = int(os.getenv("KNOWLEDGE_EXTRACTIVE_SENTENCES", "3"))
+ANSWER_MODES = ("auto", "llm", "extractive")
+
+_knowledge_index = None
+_knowledge_index_lock = threading.Lock()
+_snapshot_watcher = None
+_snapshot_watcher_pid = None
+
+def load_knowledge_index(path: str = KNOWLEDGE_INDEX_DIR) -> VectorIndex:
+    """Returns the process-wide knowledge index, loading it on first use.
+
+    The live snapshot under ``path`` is memory-mapped. If none has been published yet,
+    or it was embedded with a different backend than EMBEDDING_BACKEND, the index is
+    built from the product catalog and published there first, so later processes can
+    share it. Call this before forking workers (see ui/serve.py) to load it exactly once.
+    """
+    global _knowledge_index
+    with _knowledge_index_lock:
+        if _knowledge_index is None:
+            snapshot = load_snapshot(path) if has_snapshot(path) else None
+            embedding_id = get_embedder().embedding_id
+            if snapshot is None or snapshot.embedding != embedding_id:
+                if snapshot is not None:
+                    print(f"Knowledge index {snapshot.version} was embedded with {snapshot.embedding}, "
+                          f"not {embedding_id}; rebuilding it")
+                index = build_product_index(load_financial_products()["products"])
+                try:
+                    publish_snapshot(index, path)
+                except OSError as e:
+                    print(f"Could not save knowledge index to {path} ({e}); keeping it in memory.")
+                    _knowledge_index = index
+                    return _knowledge_index
+                snapshot = load_snapshot(path)
+            _knowledge_index = _prepare_snapshot(snapshot, path)
+            print(f"Loaded knowledge index {_knowledge_index.version} with {len(_knowledge_index)} documents from {path}")
+    return _knowledge_index
+
+def _prepare_snapshot(index: VectorIndex, root: str):
+    """Checks a snapshot's embedding backend and wraps it in a ShardedIndex when
+    KNOWLEDGE_BACKEND is sharded, or a QuantizedIndex when KNOWLEDGE_QUANTIZATION is set."""
+    if index.embedding != get_embedder().embedding_id:
+        raise SnapshotError(f"Snapshot {index.version} was embedded with {index.embedding}, "
+                            f"but queries use {get_embedder().embedding_id}")
+    if KNOWLEDGE_BACKEND == "sharded":
+        return ShardedIndex.from_snapshot(index, root, max(1, KNOWLEDGE_SHARDS), KNOWLEDGE_SHARD_BY,
+                                          timeout_s=KNOWLEDGE_SHARD_TIMEOUT_MS / 1000.0,
+                                          quantization=KNOWLEDGE_QUANTIZATION, rerank=KNOWLEDGE_RERANK)
+    if KNOWLEDGE_BACKEND != "local":
+        raise ValueError(f"Unknown KNOWLEDGE_BACKEND {KNOWLEDGE_BACKEND!r} (expected local or sharded)")
+    if KNOWLEDGE_QUANTIZATION == "none":
+        return index
+    return open_quantized(index, snapshot_path(root, index.version), KNOWLEDGE_QUANTIZATION, rerank=KNOWLEDGE_RERANK)
+
+def set_knowledge_index(index) -> None:
+    """Replaces the process-wide index with any object exposing ``search(vector, k, query_text)``
+    (VectorIndex, HNSWIndex, HybridIndex, QuantizedIndex); used by benchmarks to replay queries.
+
+    Swapping the reference is atomic: a request that already fetched the old index
+    finishes on it, later requests see the new one. A replaced index with worker
+    processes (ShardedIndex) is closed after KNOWLEDGE_RETIRE_GRACE_S.
+    """
+    global _knowledge_index
+    with _knowledge_index_lock:
+        previous, _knowledge_index = _knowledge_index, index
+    if previous is not None and previous is not index and hasattr(previous, "close"):
+        timer = threading.Timer(KNOWLEDGE_RETIRE_GRACE_S, previous.close)
+        timer.daemon = True
+        timer.start()
+
+def start_snapshot_watcher(path: str = KNOWLEDGE_INDEX_DIR, interval: float = KNOWLEDGE_SNAPSHOT_POLL_S):
+    """Starts this process's watcher that hot-swaps newly published snapshots (once per worker)."""
+    global _snapshot_watcher, _snapshot_watcher_pid
+    if interval <= 0:
+        return None
+    if _snapshot_watcher is None or _snapshot_watcher_pid != os.getpid():
+        current = load_knowledge_index(path)
+        _snapshot_watcher = SnapshotWatcher(path, lambda index: set_knowledge_index(_prepare_snapshot(index, path)),
+                                            interval, version=getattr(current, "version", None))
+        _snapshot_watcher_pid = os.getpid()
+    return _snapshot_watcher.start()
+
+# --- Product names ---
+@lru_cache(maxsize=4096)
+def name_patterns(name: str) -> tuple[re.Pattern, ...]:
+    """Whole-word patterns (singular or plural) for a product name without its parenthesised
+    abbreviation, and the abbreviation; a name without one also matches its last two words
+    ("prepaid card" for General Purpose Prepaid Card)."""
+    full = re.sub(r"\s*\(.*?\)", "", name).strip()
+    abbreviations = re.findall(r"\(([^)]+)\)", name)
+    patterns = [re.escape(full)] + [re.escape(abbreviation) for abbreviation in abbreviations]
+    if not abbreviations and len(full.split()) > 2:
+        patterns.append(re.escape(" ".join(full.split()[-2:])))
+    return tuple(re.compile(rf"\b{p}s?\b", re.IGNORECASE) for p in patterns if p)
+
+def names_product(text: str, name: str | None) -> bool:
+    return bool(name) and any(pattern.search(text) for pattern in name_patterns(name))
+
+@lru_cache(maxsize=1)
+def catalog_product_names() -> tuple[str, ...]:
+    return tuple(p["name"] for p in load_financial_products()["products"] if p.get("name"))
+
+def names_catalog_product(text: str) -> bool:
+    """True when ``text`` names a product of data/financial_products.json."""
+    return any(names_product(text, name) for name in catalog_product_names())
+
+def prefer_named_products(query: str, results: list[dict], k: int) -> list[dict]:
+    """Moves passages of products named in ``query`` ahead of the rest (stable), then keeps ``k``.
+
+    Passages that mention another product's abbreviation ("often used interchangeably
+    with Health FSA") otherwise outrank that product's own passage for "What is an FSA?".
+    """
+    named = [r for r in results if names_product(query, (r.get("metadata") or {}).get("name"))]
+    if not named:
+        return results[:k]
+    return (named + [r for r in results if r not in named])[:k]
 
 # --- Agent State ---
+def merge_search_results(existing: list[dict] | None, new: list[dict] | None) -> list[dict]:
+    """Reducer for ``search_results``: merges passages from successive retrievals, best
+    score first, keeping one entry per id. A single retrieval passes through uncopied;
+    writing None clears the results (a new orchestrator turn)."""
+    if new is None:
+        return []
+    if not existing:
+        return new
+    if not new:
+        return existing
+    best = {}
+    for result in existing + new:
+        if result.get("id") not in best or result.get("score", 0) > best[result.get("id")].get("score", 0):
+            best[result.get("id")] = result
+    return sorted(best.values(), key=lambda r: r.get("score", 0), reverse=True)
+
+# Nodes return only the keys they change; LangGraph applies them to the state
 class KnowledgeAgentState(TypedDict):
     query: str
-    search_results: list[dict] # Results from vector DB
+    search_results: Annotated[list[dict], merge_search_results] # Results from vector DB
     response: str
     error: str | None
+    deadline: float | None # Absolute request deadline (see core/deadline.py)
+    answer_mode: str | None # Overrides KNOWLEDGE_ANSWER_MODE for this request
+    history: list[dict] # Recent turns of the session, read-only here (see core/memory.py)
+    summary: str | None # Rolled-up older turns of the session
 
 # --- Nodes ---
-def retrieve_knowledge(state: KnowledgeAgentState) -> KnowledgeAgentState:
+def retrieve_knowledge(state: KnowledgeAgentState) -> dict:
     """Retrieves relevant knowledge from the vector database based on the query."""
     print(f"--- Knowledge Agent: Retrieving knowledge for query: {state['query']} ---")
-    query = state['query']
+    # A follow-up that names no product ("what are its fees?", "Who is eligible?") is
+    # searched together with the previous questions
+    query = followup_query(state['query'], state.get('history'), names_subject=names_catalog_product)
     search_results = []
     error = None
+    if not has_budget(state.get('deadline'), 0):
+        print("Request deadline exceeded before knowledge retrieval")
+        return {"search_results": [], "error": "Request deadline exceeded before the knowledge search"}
     try:
-        # Placeholder: Implement actual vector search logic
-        # response = vector_db_client.search(...)
-        print("Placeholder: Performing vector search in OpenSearch/Vector DB...")
-        # Simulate finding relevant product info from our synthetic data
-        if "hsa" in query.lower() or "health savings" in query.lower():
-             search_results.append({"id": "HSA001", "text": "Details about Health Savings Account...", "score": 0.9})
-        elif "fsa" in query.lower() or "flexible spending" in query.lower():
-             search_results.append({"id": "FSA001", "text": "Details about Flexible Spending Account...", "score": 0.88})
-        elif "prepaid" in query.lower():
-             search_results.append({"id": "PREPAID001", "text": "Details about General Purpose Prepaid Card...", "score": 0.85})
+        index = load_knowledge_index()
+        if KNOWLEDGE_NAME_CANDIDATES > 0:
+            candidates = max(KNOWLEDGE_TOP_K, KNOWLEDGE_NAME_CANDIDATES)
+            search_results = index.search(embed_texts([query])[0], k=candidates, query_text=query)
+            search_results = prefer_named_products(query, search_results, KNOWLEDGE_TOP_K)
         else:
-             search_results.append({"id": "GENERAL", "text": "General financial product information...", "score": 0.7})
+            search_results = index.search(embed_texts([query])[0], k=KNOWLEDGE_TOP_K, query_text=query)
         print(f"Found {len(search_results)} potential results.")
 
     except Exception as e:
@@ -46,37 +225,60 @@ def retrieve_knowledge(state: KnowledgeAgentState) -> KnowledgeAgentState:
         error = f"Failed to retrieve knowledge: {e}"
         search_results = []
 
-    return {**state, "search_results": search_results, "error": error}
+    return {"search_results": search_results, "error": error}
 
-def generate_response(state: KnowledgeAgentState) -> KnowledgeAgentState:
+def _extractive_response(state: KnowledgeAgentState, reason: str) -> dict:
+    query = followup_query(state['query'], state.get('history'), names_subject=names_catalog_product)
+    answer = extractive_answer(query, state['search_results'], KNOWLEDGE_EXTRACTIVE_SENTENCES)
+    print(f"Extractive answer ({reason}): {answer[:100]}...")
+    return {"response": answer}
+
+def generate_response(state: KnowledgeAgentState) -> dict:
     """Generates a response based on the retrieved knowledge using OpenAI."""
     print("--- Knowledge Agent: Generating response ---")
     if state['error']:
-        return {**state, "response": f"Sorry, I encountered an error: {state['error']}"}
+        return {"response": f"Sorry, I encountered an error: {state['error']}"}
     if not state['search_results']:
-         return {**state, "response": "I couldn't find specific information for your query."}
+         return {"response": "I couldn't find specific information for your query."}
+
+    mode = state.get('answer_mode') or KNOWLEDGE_ANSWER_MODE
+    if mode not in ANSWER_MODES:
+        return {"response": f"Sorry, I encountered an error: unknown answer mode '{mode}'",
+                "error": f"Unknown answer mode '{mode}' (expected one of {', '.join(ANSWER_MODES)})"}
+    if mode == "extractive":
+        return _extractive_response(state, "requested")
+    if mode == "auto":
+        if not has_budget(state.get('deadline'), DEADLINE_MIN_LLM_MS):
+            return _extractive_response(state, "deadline nearly spent")
+        if llm_saturated():
+            return _extractive_response(state, "LLM saturated")
 
     query = state['query']
     context = "\n".join([f"Result {i+1}: {res.get('text', '')} (ID: {res.get('id', 'N/A')})" for i, res in enumerate(state['search_results'])])
 
-    prompt = f"You are a helpful financial knowledge assistant. Answer the user's query based *only* on the provided context.\n\nContext:\n{context}\n\nUser Query: {query}\n\nAnswer:"
+    # Instructions are the template's static system prefix; retrieved passages and the query come last
+    messages = GENERATE_RESPONSE.render(
+        conversation=conversation_block(conversation_context(state.get('history'), state.get('summary'))),
+        context=context, query=query)
 
     try:
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo", # Or specify another model like gpt-4
-            messages=[
-                {"role": "system", "content": "You are a helpful financial knowledge assistant."},
-                {"role": "user", "content": prompt}
-            ]
+        # Fast tier for short contexts; long contexts or empty answers use the strong tier
+        completion, _ = router.complete(
+            "generate_response",
+            messages=messages,
+            validate=lambda c: (bool((c.choices[0].message.content or "").strip()), None, "empty_answer"),
+            deadline=state.get('deadline'),
         )
         response = completion.choices[0].message.content
         print(f"Generated response: {response[:100]}...") # Log snippet
     except Exception as e:
         print(f"Error during OpenAI completion: {e}")
+        if mode == "auto":
+            return _extractive_response(state, f"LLM failed: {type(e).__name__}")
         response = f"Sorry, I encountered an error while generating the response: {e}"
-        state['error'] = response # Store the error
+        return {"response": response, "error": response} # Store the error
 
-    return {**state, "response": response}
+    return {"response": response}
 
 
 # --- Graph Definition ---
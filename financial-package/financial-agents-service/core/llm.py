@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import time
+import zlib
+import random
+import sqlite3
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from types import SimpleNamespace
+from openai import OpenAI
+from dotenv import load_dotenv
+from core.rate_limit import LLMRateLimiter, call_with_limits, estimate_tokens
+
+# Environment variable loading
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# --- Configuration ---
+# "openai" calls the real API, "fake" answers locally (for load tests and CI),
+# "record" calls OpenAI and stores every exchange, "replay" serves stored exchanges offline
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "llm_cassette.sqlite"))
+# "none" replays instantly, "recorded" sleeps for the recorded latency, a number scales it (e.g. "0.5")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "none")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+# "auto" rate-limits only backends that reach the network; "on"/"off" force it
+LLM_RATE_LIMIT = os.getenv("LLM_RATE_LIMIT", "auto")
+
+# --- Backends ---
+class OpenAIBackend:
+    """Sends chat completions to the OpenAI API."""
+
+    name = "openai"
+    rate_limited = True
+
+    def __init__(self, api_key: str | None = OPENAI_API_KEY):
+        # Retries are owned by core/rate_limit.py; SDK retries would bypass the shared limiter
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+
+    def chat_completion(self, **kwargs):
+        return self.client.chat.completions.create(**kwargs)
+
+
+class FakeLLMBackend:
+    """Answers chat completions locally with canned, OpenAI-shaped responses.
+
+    Classification requests (``response_format`` of ``json_object``) are answered
+    with keyword rules; everything else echoes the first line of the prompt context.
+    Latency and error rate are configurable so the API can be load-tested offline.
+    """
+
+    name = "fake"
+    rate_limited = False
+
+    def __init__(self, latency_ms: float = FAKE_LLM_LATENCY_MS, jitter_ms: float = FAKE_LLM_JITTER_MS,
+                 error_rate: float = FAKE_LLM_ERROR_RATE, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def chat_completion(self, **kwargs):
+        delay_ms = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        _sleep_within_timeout(delay_ms / 1000.0, kwargs.get("timeout"))
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise RuntimeError("Fake LLM backend: simulated upstream error")
+
+        messages = kwargs.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        if (kwargs.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps(self._classify(prompt))
+        else:
+            content = self._answer(prompt)
+        # Usage counts every message, system prefix included, like a real provider
+        return _completion(kwargs.get("model", "fake"), content, "".join(m.get("content") or "" for m in messages))
+
+    @staticmethod
+    def _classify(prompt: str) -> dict:
+        match = re.search(r'User Query: "(.*)"', prompt, re.DOTALL)
+        query = (match.group(1) if match else prompt).lower()
+        if any(word in query for word in ("activate", "deactivate", "block", "lost", "stolen")):
+            action = "deactivate" if any(w in query for w in ("deactivate", "block", "lost", "stolen")) else "activate"
+            digits = re.findall(r"\b(\d{4})\b", query)
+            parameters = {}
+            cvv = re.search(r"cvv\s*(?:is\s*)?(\d{3,4})", query)
+            expiry = re.search(r"(\d{2}/\d{2})", query)
+            if cvv:
+                parameters["cvv"] = cvv.group(1)
+            if expiry:
+                parameters["expiryDate"] = expiry.group(1)
+            return {"intent": "card_action", "action": action, "confidence": 0.95 if digits else 0.6,
+                    "card_identifier": digits[0] if digits else None, "parameters": parameters}
+        if any(word in query for word in ("hsa", "fsa", "hcsa", "prepaid", "account", "fee", "card", "contribution",
+                                          "health", "savings", "spending", "flexible", "eligib", "limit")):
+            return {"intent": "knowledge", "confidence": 0.9}
+        return {"intent": "unknown", "confidence": 0.5}
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        match = re.search(r"Context:\n(.*?)\n", prompt)
+        context = match.group(1) if match else "No context available."
+        return f"Based on our product information: {context}"
+
+
+def _sleep_within_timeout(seconds: float, timeout: float | None):
+    """Simulated latency that, like the real client, gives up once ``timeout`` passes."""
+    if timeout is not None and seconds > timeout:
+        time.sleep(max(0.0, timeout))
+        raise TimeoutError(f"LLM request timed out after {timeout:.2f}s")
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _completion(model: str, content: str, prompt: str = "", usage: dict | None = None):
+    """Builds an object shaped like an OpenAI ``ChatCompletion``."""
+    if usage:
+        prompt_tokens, completion_tokens = usage["prompt_tokens"], usage["completion_tokens"]
+    else:
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                 message=SimpleNamespace(role="assistant", content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+# --- Record / Replay ---
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def request_key(kwargs: dict) -> str:
+    """Stable hash of a chat completion request.
+
+    Transport-only arguments (``timeout``) are ignored so a recording made with one
+    timeout replays under another.
+    """
+    payload = {k: v for k, v in kwargs.items() if k != "timeout"}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """SQLite store of request hash -> zlib-compressed response and measured latency."""
+
+    def __init__(self, path: str = LLM_CASSETTE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exchanges ("
+            "key TEXT PRIMARY KEY, response BLOB NOT NULL, latency_ms REAL NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def put(self, key: str, response: dict, latency_ms: float):
+        blob = zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO exchanges VALUES (?, ?, ?, ?)",
+                               (key, blob, latency_ms, time.time()))
+            self._conn.commit()
+
+    def get(self, key: str) -> tuple[dict, float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT response, latency_ms FROM exchanges WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+
+class RecordingBackend:
+    """Wraps another backend and stores each exchange with its latency."""
+
+    name = "record"
+    rate_limited = True
+
+    def __init__(self, inner=None, store: CassetteStore | None = None):
+        self.inner = inner if inner is not None else OpenAIBackend()
+        self.store = store if store is not None else CassetteStore()
+
+    def chat_completion(self, **kwargs):
+        start = time.perf_counter()
+        completion = self.inner.chat_completion(**kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        usage = getattr(completion, "usage", None)
+        response = {
+            "model": completion.model,
+            "content": completion.choices[0].message.content,
+            "usage": {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens} if usage else None,
+        }
+        self.store.put(request_key(kwargs), response, latency_ms)
+        return completion
+
+
+class ReplayBackend:
+    """Serves recorded exchanges without network access.
+
+    ``latency`` is ``"none"``, ``"recorded"`` or a multiplier applied to the recorded
+    latency, so benchmarks can either remove LLM time entirely or keep a fixed,
+    jitter-free version of it.
+    """
+
+    name = "replay"
+    rate_limited = False
+
+    def __init__(self, store: CassetteStore | None = None, latency: str = LLM_REPLAY_LATENCY):
+        self.store = store if store is not None else CassetteStore()
+        if latency == "none":
+            self.latency_scale = 0.0
+        elif latency == "recorded":
+            self.latency_scale = 1.0
+        else:
+            self.latency_scale = float(latency)
+
+    def chat_completion(self, **kwargs):
+        key = request_key(kwargs)
+        entry = self.store.get(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded LLM response for request {key[:12]} in {self.store.path}")
+        response, latency_ms = entry
+        _sleep_within_timeout(latency_ms * self.latency_scale / 1000.0, kwargs.get("timeout"))
+        return _completion(response["model"], response["content"], usage=response["usage"])
+
+# --- Backend Registry ---
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "fake": FakeLLMBackend,
+    "record": RecordingBackend,
+    "replay": ReplayBackend,
+}
+
+_backend = None
+# Created at import so that workers forked by ui/serve.py share one budget
+limiter = LLMRateLimiter()
+
+def get_backend():
+    """Returns the process-wide LLM backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        if LLM_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'. Choose one of: {', '.join(BACKENDS)}")
+        _backend = BACKENDS[LLM_BACKEND]()
+        print(f"LLM backend: {_backend.name}")
+    return _backend
+
+def set_backend(backend):
+    """Replaces the process-wide LLM backend (used by scripts and benchmarks)."""
+    global _backend
+    _backend = backend
+
+# Per-context override (see use_backend); LangGraph runs nodes with the caller's context
+_backend_override = contextvars.ContextVar("llm_backend_override", default=None)
+_record_stats = contextvars.ContextVar("llm_record_stats", default=True)
+
+@contextmanager
+def use_backend(backend, record_stats: bool = True):
+    """Sends LLM calls made in this context, including graph nodes it invokes, to ``backend``.
+
+    Unlike ``set_backend`` this does not affect requests served concurrently; used by the
+    startup warm-up (ui/warmup.py) to run the graphs without calling the real LLM. With
+    ``record_stats=False`` the calls are also left out of the model router's metrics.
+    """
+    token = _backend_override.set(backend)
+    stats_token = _record_stats.set(record_stats)
+    try:
+        yield backend
+    finally:
+        _record_stats.reset(stats_token)
+        _backend_override.reset(token)
+
+def recording_stats() -> bool:
+    """False inside ``use_backend(..., record_stats=False)``."""
+    return _record_stats.get()
+
+def _rate_limited(backend) -> bool:
+    if LLM_RATE_LIMIT == "auto":
+        return getattr(backend, "rate_limited", True)
+    return LLM_RATE_LIMIT == "on"
+
+def chat_completion(**kwargs):
+    """Creates a chat completion with the configured backend.
+
+    Accepts the same keyword arguments as ``client.chat.completions.create``. Every
+    LLM call site goes through here, so all of them share the process-wide (and,
+    under ui/serve.py, node-wide) rate limiter. A ``timeout`` bounds the whole call,
+    including the wait for capacity and any retries.
+    """
+    backend = _backend_override.get() or get_backend()
+    if not _rate_limited(backend):
+        return backend.chat_completion(**kwargs)
+    timeout = kwargs.pop("timeout", None)
+    if timeout is None:
+        return call_with_limits(limiter, lambda: backend.chat_completion(**kwargs), estimate_tokens(kwargs))
+    expires = time.monotonic() + timeout
+    return call_with_limits(
+        limiter, lambda: backend.chat_completion(**kwargs, timeout=max(0.001, expires - time.monotonic())),
+        estimate_tokens(kwargs), timeout=timeout)
+
+def is_saturated() -> bool:
+    """True when an LLM call made now would have to wait for the shared limiter."""
+    backend = _backend_override.get() or get_backend()
+    return _rate_limited(backend) and limiter.saturated
+
+def get_metrics() -> dict:
+    """LLM limiter metrics for this process (wait times, throttling, 429s)."""
+    return {"backend": LLM_BACKEND, "rate_limited": LLM_RATE_LIMIT, "limiter": limiter.metrics()}
@@ -0,0 +1,202 @@
+"""Bounded per-session conversation memory, checkpointed to SQLite.
+
+A chat request that carries a session id runs the orchestrator with a
+``SqliteSaver`` checkpointer (thread id = session id). Between turns the graph
+state keeps:
+
+- ``history``: the last MEMORY_MAX_TURNS turns verbatim (each message clipped to
+  MEMORY_TURN_MAX_CHARS)
+- ``summary``: one line per older turn, oldest lines dropped beyond
+  MEMORY_SUMMARY_MAX_CHARS
+
+So what a session stores, and the conversation block added to the prompts, stay
+the same size however long the conversation runs. The summary is built without an
+LLM call. Every MEMORY_COMPACT_EVERY turns, a process compacts the database. It
+keeps only the latest checkpoint of each session and drops sessions idle for
+longer than MEMORY_SESSION_TTL_S.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+
+# --- Configuration ---
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "1") != "0"
+MEMORY_DB = os.getenv("MEMORY_DB", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "conversations.sqlite"))
+# Turns kept verbatim; older ones are rolled into the summary
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "4"))
+MEMORY_TURN_MAX_CHARS = int(os.getenv("MEMORY_TURN_MAX_CHARS", "600"))
+MEMORY_SUMMARY_MAX_CHARS = int(os.getenv("MEMORY_SUMMARY_MAX_CHARS", "800"))
+# Turns (per process) between compactions of the checkpoint database
+MEMORY_COMPACT_EVERY = int(os.getenv("MEMORY_COMPACT_EVERY", "50"))
+# Sessions idle for longer than this are deleted at compaction
+MEMORY_SESSION_TTL_S = float(os.getenv("MEMORY_SESSION_TTL_S", str(7 * 24 * 3600)))
+
+# Follow-ups of at most this many words are searched together with the earlier
+# questions even when they refer to nothing ("Who is eligible?")
+MEMORY_FOLLOWUP_MAX_WORDS = int(os.getenv("MEMORY_FOLLOWUP_MAX_WORDS", "5"))
+
+# Words that make a question lean on the previous turn ("what are its fees?")
+_REFERRING = frozenset("it its it's that this these those they them their one ones same".split())
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+# --- Turn history and summary ---
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+def _first_sentence(text: str) -> str:
+    return re.split(r"(?<=[.!?])\s", " ".join((text or "").split()), maxsplit=1)[0]
+
+def summarize_turn(turn: dict) -> str:
+    """One summary line for a turn that drops out of the verbatim window."""
+    return (f"User asked ({turn.get('intent') or 'unknown'}): {_clip(turn['user'], 120)} | "
+            f"Answer: {_clip(_first_sentence(turn['assistant']), 160)}")
+
+def roll_summary(summary: str | None, turns: list[dict], max_chars: int = MEMORY_SUMMARY_MAX_CHARS) -> str:
+    """Appends a line per turn to ``summary``, dropping its oldest lines beyond ``max_chars``."""
+    lines = [line for line in (summary or "").splitlines() if line] + [summarize_turn(t) for t in turns]
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)[-max_chars:]
+
+def add_turn(history: list[dict] | None, summary: str | None, user: str, assistant: str,
+             intent: str | None = None, max_turns: int | None = None) -> dict:
+    """State update for a finished turn: the verbatim window and, if it overflowed, the new summary."""
+    max_turns = MEMORY_MAX_TURNS if max_turns is None else max_turns
+    turn = {"user": _clip(user, MEMORY_TURN_MAX_CHARS), "assistant": _clip(assistant, MEMORY_TURN_MAX_CHARS),
+            "intent": intent}
+    turns = list(history or []) + [turn]
+    overflow = turns[:-max_turns] if max_turns > 0 else turns
+    update = {"history": turns[len(overflow):]}
+    if overflow:
+        update["summary"] = roll_summary(summary, overflow)
+    return update
+
+def conversation_context(history: list[dict] | None, summary: str | None) -> str:
+    """Conversation block for the prompts; empty on the first turn of a session."""
+    parts = []
+    if summary:
+        parts.append(f"Summary of earlier turns:\n{summary}")
+    if history:
+        parts.append("Recent turns:\n" + "\n".join(f"User: {t['user']}\nAssistant: {t['assistant']}" for t in history))
+    return "\n\n".join(parts)
+
+def stands_alone(text: str, names_subject=None) -> bool:
+    """True when a question needs no earlier turn to be understood.
+
+    With ``names_subject`` (a predicate such as core.knowledge.names_catalog_product),
+    that is exactly when it names what it is about. Without one, a question stands
+    alone unless it refers back ("its fees") or has at most MEMORY_FOLLOWUP_MAX_WORDS words.
+    """
+    if names_subject is not None and names_subject(text):
+        return True
+    words = _WORD_RE.findall(text.lower())
+    if _REFERRING.intersection(words) or len(words) <= MEMORY_FOLLOWUP_MAX_WORDS:
+        return False
+    return names_subject is None
+
+def followup_query(query: str, history: list[dict] | None, max_turns: int = 3, names_subject=None) -> str:
+    """Search text for a follow-up: unless ``query`` stands alone, prefixes the previous
+    questions up to the last one that does (at most ``max_turns``)."""
+    if not history or stands_alone(query, names_subject):
+        return query
+    questions = []
+    for turn in reversed(history[-max_turns:]):
+        questions.insert(0, turn['user'])
+        if stands_alone(turn['user'], names_subject):
+            break
+    return " ".join(questions + [query])
+
+
+# --- Checkpointer ---
+_saver = None
+_saver_pid = None
+_saver_lock = threading.Lock()
+_turns_since_compact = 0
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    # Must precede the first table; lets compaction hand freed pages back to the file system
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+        thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, turns INTEGER NOT NULL DEFAULT 0)""")
+    conn.commit()
+    return conn
+
+def get_checkpointer(path: str | None = None):
+    """Returns this process's SQLite checkpointer (one connection per worker, opened after fork).
+
+    ``SqliteSaver`` (langgraph-checkpoint-sqlite) is imported here, so stateless chat
+    never depends on it.
+    """
+    global _saver, _saver_pid
+    with _saver_lock:
+        if _saver is None or _saver_pid != os.getpid():
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            _saver = SqliteSaver(_connect(path or MEMORY_DB))
+            _saver.setup()
+            _saver_pid = os.getpid()
+    return _saver
+
+def session_config(session_id: str) -> dict:
+    return {"configurable": {"thread_id": session_id}}
+
+def touch_session(session_id: str) -> None:
+    """Records a finished turn of ``session_id``; compacts the database every MEMORY_COMPACT_EVERY turns."""
+    global _turns_since_compact
+    saver = get_checkpointer()
+    with saver.lock:
+        saver.conn.execute(
+            "INSERT INTO sessions (thread_id, updated_at, turns) VALUES (?, ?, 1) "
+            "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at, turns = turns + 1",
+            (session_id, time.time()))
+        saver.conn.commit()
+    _turns_since_compact += 1
+    if MEMORY_COMPACT_EVERY > 0 and _turns_since_compact >= MEMORY_COMPACT_EVERY:
+        _turns_since_compact = 0
+        compact()
+
+def compact(ttl_s: float = MEMORY_SESSION_TTL_S) -> dict:
+    """Drops superseded checkpoints (and subgraph ones), their writes, and expired sessions."""
+    saver = get_checkpointer()
+    start = time.perf_counter()
+    with saver.lock:
+        conn = saver.conn
+        expired = [row[0] for row in conn.execute("SELECT thread_id FROM sessions WHERE updated_at < ?",
+                                                  (time.time() - ttl_s,))]
+        for thread_id in expired:
+            conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM sessions WHERE thread_id = ?", (thread_id,))
+        checkpoints = conn.execute("""
+            DELETE FROM checkpoints WHERE checkpoint_ns != '' OR checkpoint_id != (
+                SELECT MAX(latest.checkpoint_id) FROM checkpoints AS latest
+                WHERE latest.thread_id = checkpoints.thread_id AND latest.checkpoint_ns = '')""").rowcount
+        writes = conn.execute("""
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints AS c WHERE c.thread_id = writes.thread_id
+                AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)""").rowcount
+        conn.commit()
+        conn.executescript("PRAGMA incremental_vacuum;")  # run to completion; execute() frees one page
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    stats = {"expired_sessions": len(expired), "checkpoints_deleted": checkpoints, "writes_deleted": writes,
+             "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+    print(f"Compacted conversation memory: {stats}")
+    return stats
+
+def memory_stats() -> dict:
+    """Sessions, stored checkpoints and database size, for /metrics/memory."""
+    saver = get_checkpointer()
+    with saver.lock:
+        sessions = saver.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        checkpoints = saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        page_count = saver.conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = saver.conn.execute("PRAGMA page_size").fetchone()[0]
+    return {"enabled": MEMORY_ENABLED, "path": MEMORY_DB, "sessions": sessions, "checkpoints": checkpoints,
+            "db_bytes": page_count * page_size, "max_turns": MEMORY_MAX_TURNS,
+            "summary_max_chars": MEMORY_SUMMARY_MAX_CHARS}
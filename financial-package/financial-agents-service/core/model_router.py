@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+from collections import deque, defaultdict
+from core.deadline import DEADLINE_MIN_LLM_MS, has_budget, timeout_for
+from core.llm import chat_completion, recording_stats
+
+# --- Configuration ---
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-3.5-turbo")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "gpt-4o")
+# Per-call timeout when the request has no deadline (seconds)
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+
+# Per-node policy. Keys:
+#   fast / strong           model for each tier
+#   max_fast_prompt_chars   longer prompts go straight to the strong tier
+#   min_confidence          escalate when the validator reports lower confidence
+#   escalate                False pins the node to the fast tier
+DEFAULT_POLICIES = {
+    "classify_intent": {"max_fast_prompt_chars": 8000, "min_confidence": 0.7},
+    "generate_response": {"max_fast_prompt_chars": 6000, "min_confidence": None},
+}
+# JSON overrides merged over the defaults, e.g. '{"generate_response": {"fast": "gpt-4o-mini"}}'
+LLM_MODEL_POLICY = os.getenv("LLM_MODEL_POLICY", "")
+
+
+def _usage(completion) -> tuple[int, int, int]:
+    """(prompt, completion, cached prompt) tokens reported with a completion; zeros when absent."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0,
+            getattr(details, "cached_tokens", 0) or 0)
+
+def _with_defaults(policy: dict) -> dict:
+    return {"fast": LLM_FAST_MODEL, "strong": LLM_STRONG_MODEL, "max_fast_prompt_chars": None,
+            "min_confidence": None, "escalate": True, **policy}
+
+def load_policies(overrides: str = LLM_MODEL_POLICY) -> dict:
+    policies = {node: dict(policy) for node, policy in DEFAULT_POLICIES.items()}
+    if overrides:
+        for node, policy in json.loads(overrides).items():
+            policies.setdefault(node, {}).update(policy)
+    return {node: _with_defaults(policy) for node, policy in policies.items()}
+
+
+class ModelRouter:
+    """Serves each node from the fast tier and escalates to the strong tier when needed.
+
+    A call starts on the strong tier only for long prompts. Otherwise the node's
+    ``validate`` callback inspects the fast answer and returns ``(ok, confidence,
+    reason)``; an answer that fails to parse or falls below ``min_confidence`` is
+    retried once on the strong tier. Every decision is recorded with its tier and
+    latency. With a request ``deadline`` each call's timeout is capped at the time
+    left, and the escalation is skipped (the fast answer kept) when less than
+    DEADLINE_MIN_LLM_MS remains. Token usage (prompt, completion and provider-cached
+    prompt tokens) is added up per node and tier, and reported with each decision.
+    Calls made with stats recording off (the startup warm-up) are not counted.
+    """
+
+    def __init__(self, policies: dict | None = None, history: int = 512):
+        self.policies = policies if policies is not None else load_policies()
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._stats = defaultdict(lambda: {"calls": 0, "latency_ms_total": 0.0, "prompt_tokens": 0,
+                                           "completion_tokens": 0, "cached_prompt_tokens": 0})
+        self._escalations = defaultdict(int)
+
+    def policy(self, node: str) -> dict:
+        if node not in self.policies:
+            self.policies[node] = _with_defaults({})
+        return self.policies[node]
+
+    def complete(self, node: str, messages: list[dict], validate=None, deadline: float | None = None, **kwargs):
+        """Returns ``(completion, decision)``; ``decision`` records tier, model, latency and reason."""
+        policy = self.policy(node)
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        long_context = policy["max_fast_prompt_chars"] is not None and prompt_chars > policy["max_fast_prompt_chars"]
+        tier = "strong" if long_context and policy["escalate"] else "fast"
+        reason = "long_context" if tier == "strong" else None
+
+        start = time.perf_counter()
+        completion = self._call(node, tier, policy[tier], messages, kwargs, deadline)
+        tokens = _usage(completion)
+        confidence = None
+        skipped = None
+        if tier == "fast" and validate is not None and policy["escalate"]:
+            ok, confidence, why = validate(completion)
+            min_confidence = policy["min_confidence"]
+            if not ok:
+                reason = why or "invalid_output"
+            elif min_confidence is not None and confidence is not None and confidence < min_confidence:
+                reason = "low_confidence"
+            if reason and not has_budget(deadline, DEADLINE_MIN_LLM_MS):
+                skipped, reason = reason, None
+            elif reason:
+                tier = "strong"
+                completion = self._call(node, tier, policy[tier], messages, kwargs, deadline)
+                tokens = tuple(a + b for a, b in zip(tokens, _usage(completion)))
+
+        decision = {
+            "node": node,
+            "tier": tier,
+            "model": policy[tier],
+            "escalated": reason is not None,
+            "reason": reason,
+            "confidence": confidence,
+            "escalation_skipped": skipped,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            # Summed over both calls when escalated
+            "prompt_tokens": tokens[0],
+            "completion_tokens": tokens[1],
+            "cached_prompt_tokens": tokens[2],
+        }
+        if not recording_stats():
+            return completion, decision
+        with self._lock:
+            self._recent.append(decision)
+            if reason:
+                self._escalations[(node, reason)] += 1
+            if skipped:
+                self._escalations[(node, "skipped_deadline")] += 1
+        print(f"Model router: {node} served by {tier} tier ({policy[tier]}) in {decision['latency_ms']} ms, "
+              f"{tokens[0]} prompt ({tokens[2]} cached) + {tokens[1]} completion tokens"
+              + (f", escalated: {reason}" if reason else "")
+              + (f", escalation ({skipped}) skipped: deadline" if skipped else ""))
+        return completion, decision
+
+    def _call(self, node: str, tier: str, model: str, messages: list[dict], kwargs: dict,
+              deadline: float | None = None):
+        timeout = timeout_for(deadline, LLM_TIMEOUT_S)
+        start = time.perf_counter()
+        completion = None
+        try:
+            completion = chat_completion(model=model, messages=messages, timeout=timeout, **kwargs)
+            return completion
+        finally:
+            if recording_stats():
+                prompt_tokens, completion_tokens, cached = _usage(completion)
+                with self._lock:
+                    stats = self._stats[(node, tier)]
+                    stats["calls"] += 1
+                    stats["latency_ms_total"] += (time.perf_counter() - start) * 1000
+                    stats["prompt_tokens"] += prompt_tokens
+                    stats["completion_tokens"] += completion_tokens
+                    stats["cached_prompt_tokens"] += cached
+
+    def metrics(self) -> dict:
+        with self._lock:
+            tiers = {
+                f"{node}.{tier}": {"calls": s["calls"], "latency_ms_avg": round(s["latency_ms_total"] / s["calls"], 2),
+                                   "prompt_tokens": s["prompt_tokens"], "completion_tokens": s["completion_tokens"],
+                                   "cached_prompt_tokens": s["cached_prompt_tokens"],
+                                   "prompt_tokens_avg": round(s["prompt_tokens"] / s["calls"], 1)}
+                for (node, tier), s in self._stats.items() if s["calls"]
+            }
+            tokens = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                          "cached_prompt_tokens": 0})
+            for (node, _), s in self._stats.items():
+                for key in tokens[node]:
+                    tokens[node][key] += s[key]
+            escalations = {f"{node}.{reason}": count for (node, reason), count in self._escalations.items()}
+            recent = list(self._recent)[-20:]
+        return {"tiers": tiers, "tokens": dict(tokens), "escalations": escalations, "recent": recent}
+
+
+router = ModelRouter()
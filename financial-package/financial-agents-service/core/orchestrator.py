@@ -2,73 +2,110 @@ import os
 from typing import TypedDict, Annotated, Sequence, Literal
 import operator
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
+from langchain_core.runnables import RunnableConfig
 
-# Import agent apps (assuming they are runnable)
-from core.knowledge import knowledge_agent_app, KnowledgeAgentState # Use relative import
-from core.card import card_agent_app, CardAgentState # Use relative import
+# Agent graphs, mounted below as subgraphs that share state keys with the orchestrator
+from core.knowledge import knowledge_agent_app, merge_search_results
+from core.card import card_agent_app, CardAgentState
+from core.faq import lookup_faq
+from core.prompts import CLASSIFY_INTENT, conversation_block
+from core.memory import add_turn, conversation_context, get_checkpointer, touch_session
 
-# Environment variable loading
-from dotenv import load_dotenv
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+# LLM access goes through the model router and pluggable backend (see core/model_router.py, core/llm.py)
+from core.model_router import router
+from core.deadline import DEADLINE_MIN_LLM_MS, has_budget
 
 # --- Orchestrator State ---
 class OrchestratorState(TypedDict):
     user_query: str
     intent: Literal["knowledge", "card_action", "unknown", "error"]
     card_action_details: CardAgentState | None # Details needed for card agent
-    knowledge_agent_response: str | None
-    card_agent_response: str | None
+    # Shared with the knowledge subgraph (KnowledgeAgentState)
+    query: str
+    search_results: Annotated[list[dict], merge_search_results]
+    response: str | None
+    # Shared with the card subgraph (CardAgentState)
+    action: str
+    card_number: str
+    parameters: dict
+    api_response: dict | None
+    confirmation_message: str | None
     final_response: str
     error: str | None
+    deadline: float | None # Absolute request deadline, shared with both subgraphs (see core/deadline.py)
+    answer_mode: str | None # Knowledge answer mode for this request (see KNOWLEDGE_ANSWER_MODE)
+    faq_id: str | None # Stored FAQ entry that answered this turn (see core/faq.py)
+    # Bounded session memory, kept between turns by the checkpointer (see core/memory.py)
+    history: list[dict]
+    summary: str | None
 
 # --- Nodes ---
-def classify_intent(state: OrchestratorState) -> OrchestratorState:
+def _validate_classification(completion) -> tuple[bool, float | None, str | None]:
+    """Router validator: the classifier must return parseable JSON with a known intent."""
+    try:
+        result_json = json.loads(completion.choices[0].message.content)
+    except (TypeError, ValueError):
+        return False, None, "json_parse_failure"
+    if result_json.get("intent") not in ("knowledge", "card_action", "unknown"):
+        return False, None, "invalid_intent"
+    try:
+        confidence = float(result_json.get("confidence"))
+    except (TypeError, ValueError):
+        confidence = None
+    return True, confidence, None
+
+def answer_from_faq(state: OrchestratorState) -> dict:
+    """Answers the query from the precomputed FAQ store, skipping classification and the LLM.
+
+    Not consulted once a session has history: an elliptical follow-up ("Who is eligible?")
+    can match a stored question about another product than the one being discussed.
+    """
+    if state.get('history'):
+        return {"faq_id": None}
+    try:
+        hit = lookup_faq(state['user_query'])
+    except Exception as e:
+        print(f"FAQ lookup failed: {e}")
+        hit = None
+    if hit is None:
+        return {"faq_id": None}
+    print(f"--- Orchestrator: Answered from FAQ {hit['id']} ({hit['match']}, similarity {hit['similarity']}) ---")
+    # Same per-turn reset as classify_intent, with the stored answer as the knowledge response
+    return {
+        "faq_id": hit["id"],
+        "intent": "knowledge",
+        "card_action_details": None,
+        "query": state['user_query'],
+        "search_results": None,
+        "response": hit["answer"],
+        "api_response": None,
+        "confirmation_message": None,
+        "error": None
+    }
+
+def classify_intent(state: OrchestratorState) -> dict:
     """Classifies the user's intent using OpenAI."""
     print(f"--- Orchestrator: Classifying intent for query: {state['user_query']} ---")
     query = state['user_query']
     intent = "unknown"
     error = None
     card_action_details = None
-    
-    # Initialize response fields to None
-    knowledge_agent_response = None
-    card_agent_response = None
-
-    prompt = f"""Classify the user's intent based on their query. Choose one: 'knowledge', 'card_action', or 'unknown'.
-    - 'knowledge': User is asking for information (e.g., 'What is an HSA?', 'Tell me about prepaid cards').
-    - 'card_action': User wants to perform an action on a card (e.g., 'Activate my card', 'Deactivate card ending in 1234').
-    - 'unknown': The intent is unclear or not related to finance/cards.
-
-    If the intent is 'card_action', extract the following information in JSON format:
-    - "intent": "card_action"
-    - "action": The action to perform (e.g., "activate", "deactivate")
-    - "card_identifier": Card number or last 4 digits
-    - "parameters": A dictionary of additional parameters like:
-        - "cvv": Card CVV (if provided)
-        - "expiryDate": Card expiry date in format MM/YY (if provided)
-        - "reason": Reason for deactivation (if provided)
-    
-    For example, if the user says "I want to activate my card ending in 4444 with CVV 123 and expiry date 05/26",
-    you should return:
-    {{"intent": "card_action", "action": "activate", "card_identifier": "4444", "parameters": {{"cvv": "123", "expiryDate": "05/26"}}}}
-    
-    If the intent is 'knowledge' or 'unknown', format as JSON: {{"intent": "..."}}
-
-    User Query: "{query}"
-
-    JSON Output:"""
+    # Static instructions are the template's system prefix; the conversation (which lets a
+    # follow-up such as "deactivate it" resolve its card) and the query come last
+    messages = CLASSIFY_INTENT.render(
+        conversation=conversation_block(conversation_context(state.get('history'), state.get('summary'))),
+        query=query)
 
     try:
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo", # Use a model suitable for classification
-            messages=[
-                {"role": "system", "content": "You are an intent classification expert for financial services."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"} # Request JSON output if model supports
+        if not has_budget(state.get('deadline'), DEADLINE_MIN_LLM_MS):
+            raise TimeoutError("request deadline nearly spent before classification")
+        # Fast tier by default; escalates on unparseable JSON, low confidence or a long prompt
+        completion, _ = router.complete(
+            "classify_intent",
+            messages=messages,
+            validate=_validate_classification,
+            response_format={"type": "json_object"}, # Request JSON output if model supports
+            deadline=state.get('deadline'),
         )
         result_json = json.loads(completion.choices[0].message.content)
         intent = result_json.get("intent", "unknown")
@@ -99,73 +136,75 @@ def classify_intent(state: OrchestratorState) -> OrchestratorState:
                 intent = "unknown" # Fallback if details can't be extracted
                 error = "Could not extract necessary details for the card action."
 
+    except TimeoutError as e:
+        print(f"Intent classification ran out of time: {e}")
+        intent = "error"
+        error = f"The request timed out while classifying your query ({e})"
     except Exception as e:
         print(f"Error during intent classification: {e}")
         intent = "error"
         error = f"Failed to classify intent: {e}"
 
-    # Return a properly initialized state with all fields
-    return {
-        **state,
+    # Partial update: the classification, the subgraph inputs, and cleared outputs of any previous turn
+    update = {
         "intent": intent,
         "card_action_details": card_action_details,
-        "knowledge_agent_response": knowledge_agent_response,
-        "card_agent_response": card_agent_response,
+        "query": query,
+        "search_results": None,
+        "response": None,
+        "api_response": None,
+        "confirmation_message": None,
         "error": error
     }
+    if card_action_details:
+        update.update(action=card_action_details["action"], card_number=card_action_details["card_number"],
+                      parameters=card_action_details["parameters"])
+    else:
+        # A session's checkpoint would otherwise keep the last card action (number, CVV) across turns
+        update.update(action="", card_number="", parameters={})
+    return update
 
-def route_to_knowledge_agent(state: OrchestratorState) -> OrchestratorState:
-    """Invokes the Knowledge Agent."""
-    print("--- Orchestrator: Routing to Knowledge Agent ---")
-    knowledge_input = {"query": state['user_query']}
-    knowledge_result = knowledge_agent_app.invoke(knowledge_input)
-    response = knowledge_result.get("response", "Knowledge agent did not provide a response.")
-    error = knowledge_result.get("error")
-    print(f"Knowledge Agent Result: {response[:100]}... Error: {error}")
-    return {**state, "knowledge_agent_response": response, "error": error}
-
-def route_to_card_agent(state: OrchestratorState) -> OrchestratorState:
-    """Invokes the Card Agent."""
-    print("--- Orchestrator: Routing to Card Agent ---")
-    if not state['card_action_details']:
-        error = "Cannot route to card agent: missing action details."
-        print(error)
-        return {**state, "card_agent_response": "Internal error: Missing card action details.", "error": error}
-
-    card_input = state['card_action_details']
-    card_result = card_agent_app.invoke(card_input) # Invoke with the prepared CardAgentState
-    response = card_result.get("confirmation_message", "Card agent did not provide a response.")
-    error = card_result.get("error")
-    print(f"Card Agent Result: {response[:100]}... Error: {error}")
-    return {**state, "card_agent_response": response, "error": error}
-
-def format_final_response(state: OrchestratorState) -> OrchestratorState:
+def format_final_response(state: OrchestratorState) -> dict:
     """Formats the final response based on which agent was called."""
     print("--- Orchestrator: Formatting final response ---")
     
     # Handle error condition
     if state.get('error'):
-        if state['intent'] == 'card_action' and state.get('card_agent_response'):
+        if state['intent'] == 'card_action' and state.get('confirmation_message'):
             # Use the card agent response directly if it exists
-            final_response = state['card_agent_response']
-        elif state['intent'] == 'knowledge' and state.get('knowledge_agent_response'):
+            final_response = state['confirmation_message']
+        elif state['intent'] == 'knowledge' and state.get('response'):
             # Use the knowledge agent response directly if it exists
-            final_response = state['knowledge_agent_response']
+            final_response = state['response']
         else:
             # Generic error response if no agent-specific response is available
             final_response = f"Sorry, I encountered an error processing your request: {state['error']}"
     # Handle successful responses
     elif state['intent'] == 'knowledge':
-        final_response = state.get('knowledge_agent_response', "I couldn't retrieve the information.")
+        final_response = state.get('response') or "I couldn't retrieve the information."
     elif state['intent'] == 'card_action':
-        final_response = state.get('card_agent_response', "The card action request could not be completed.")
+        final_response = state.get('confirmation_message') or "The card action request could not be completed."
     else:
         final_response = "I'm not sure how to handle that request. Can you please rephrase?"
 
     print(f"Final Response: {final_response[:100]}...")
-    return {**state, "final_response": final_response}
+    return {"final_response": final_response}
+
+def remember_turn(state: OrchestratorState, config: RunnableConfig) -> dict:
+    """Adds the finished turn to the bounded session memory (history window plus rolling summary)."""
+    session_id = (config.get("configurable") or {}).get("thread_id")
+    if session_id is not None:
+        try:
+            touch_session(session_id)
+        except Exception as e:
+            print(f"Could not record turn of session {session_id}: {e}")
+    return add_turn(state.get('history'), state.get('summary'), state['user_query'], state['final_response'],
+                    state.get('intent'))
 
 # --- Conditional Edges ---
+def decide_after_faq(state: OrchestratorState) -> Literal["answered", "classify"]:
+    return "answered" if state.get('faq_id') else "classify"
+
 def decide_route(state: OrchestratorState) -> Literal["knowledge", "card_action", "end_error", "end_unknown"]:
     """Determines the next step based on the classified intent."""
     print(f"--- Orchestrator: Deciding route based on intent: {state['intent']} ---")
@@ -187,13 +226,21 @@ import json # Need json for the classifier node
 workflow = StateGraph(OrchestratorState)
 
 # Add nodes
+workflow.add_node("faq_lookup", answer_from_faq)
 workflow.add_node("classify_intent", classify_intent)
-workflow.add_node("knowledge_agent", route_to_knowledge_agent)
-workflow.add_node("card_agent", route_to_card_agent)
+# Compiled agent graphs run as native subgraphs: they read and write the shared keys
+# directly, inside this graph's execution, instead of a nested .invoke per turn
+workflow.add_node("knowledge_agent", knowledge_agent_app)
+workflow.add_node("card_agent", card_agent_app)
 workflow.add_node("format_response", format_final_response)
+workflow.add_node("remember", remember_turn)
 
 # Define edges
-workflow.set_entry_point("classify_intent")
+workflow.set_entry_point("faq_lookup")
+
+# Frequent questions are answered from the store; everything else is classified
+workflow.add_conditional_edges("faq_lookup", decide_after_faq,
+                               {"answered": "format_response", "classify": "classify_intent"})
 
 # Conditional routing after classification
 workflow.add_conditional_edges(
@@ -211,12 +258,25 @@ workflow.add_conditional_edges(
 workflow.add_edge("knowledge_agent", "format_response")
 workflow.add_edge("card_agent", "format_response")
 
-# End after formatting
-workflow.add_edge("format_response", END)
+# Record the turn, then end
+workflow.add_edge("format_response", "remember")
+workflow.add_edge("remember", END)
 
-# Compile graph
+# Compile graph: stateless, every invoke is a new conversation
 app = workflow.compile()
 
+_conversation_app = None
+_conversation_app_pid = None
+
+def get_conversation_app():
+    """The orchestrator with this process's SQLite checkpointer; invoke it with
+    ``session_config(session_id)`` and ``durability="exit"`` (one checkpoint per turn)."""
+    global _conversation_app, _conversation_app_pid
+    if _conversation_app is None or _conversation_app_pid != os.getpid():
+        _conversation_app = workflow.compile(checkpointer=get_checkpointer())
+        _conversation_app_pid = os.getpid()
+    return _conversation_app
+
 # --- Example Usage (for testing) ---
 if __name__ == "__main__":
     print("\n--- Testing Orchestrator (Knowledge Intent) ---")
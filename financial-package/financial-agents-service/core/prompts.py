@@ -0,0 +1,112 @@
+"""Prompt templates with a static, cacheable prefix.
+
+Each template is a fixed system message (every instruction and example) followed
+by a user message holding only what changes per request. Providers that cache
+prompt prefixes (OpenAI does so automatically from 1024 tokens) can then reuse
+the whole system message across requests, and a changing query never moves the
+static text. Templates are parsed once at import. ``render`` only joins literal
+parts with the request's values, which keeps it cheap to call.
+
+    messages = CLASSIFY_INTENT.render(conversation="", query="What is an HSA?")
+
+``prefix_id`` hashes the system message, so a template edit that invalidates
+provider caches shows up in the logs and in benchmarks/prompt_size_report.py.
+"""
+
+import hashlib
+from string import Formatter
+
+# Characters per token for size estimates (same heuristic as core/rate_limit.py)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+class PromptTemplate:
+    """A static system prefix plus a user template compiled to literal parts and field names."""
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system
+        self.prefix_id = hashlib.sha256(system.encode("utf-8")).hexdigest()[:12]
+        self._parts = []
+        self.fields = []
+        for literal, field, spec, conversion in Formatter().parse(user):
+            if spec or conversion:
+                raise ValueError(f"Template {name}: format specs and conversions are not supported ({field})")
+            if literal:
+                self._parts.append((True, literal))
+            if field is not None:
+                if not field.isidentifier():
+                    raise ValueError(f"Template {name}: field {field!r} must be a plain name")
+                self._parts.append((False, field))
+                self.fields.append(field)
+        self._system_message = {"role": "system", "content": system}
+
+    def render_user(self, **values) -> str:
+        missing = set(self.fields) - values.keys()
+        if missing:
+            raise KeyError(f"Template {self.name} is missing {', '.join(sorted(missing))}")
+        return "".join(part if is_literal else str(values[part]) for is_literal, part in self._parts)
+
+    def render(self, **values) -> list[dict]:
+        """Chat messages: the shared system message, then the rendered user message."""
+        return [self._system_message, {"role": "user", "content": self.render_user(**values)}]
+
+    def sizes(self, messages: list[dict]) -> dict:
+        """Characters and estimated tokens of the static prefix and the variable part of ``messages``."""
+        variable = sum(len(m.get("content") or "") for m in messages[1:])
+        return {"prefix_chars": len(self.system), "variable_chars": variable,
+                "prefix_tokens": estimate_text_tokens(self.system),
+                "variable_tokens": variable // CHARS_PER_TOKEN}
+
+
+# --- Templates ---
+CLASSIFY_INTENT = PromptTemplate(
+    "classify_intent",
+    system="""You are an intent classification expert for financial services.
+
+Classify the user's intent based on their query. Choose one: 'knowledge', 'card_action', or 'unknown'.
+- 'knowledge': User is asking for information (e.g., 'What is an HSA?', 'Tell me about prepaid cards').
+- 'card_action': User wants to perform an action on a card (e.g., 'Activate my card', 'Deactivate card ending in 1234').
+- 'unknown': The intent is unclear or not related to finance/cards.
+
+If the intent is 'card_action', extract the following information in JSON format:
+- "intent": "card_action"
+- "action": The action to perform (e.g., "activate", "deactivate")
+- "card_identifier": Card number or last 4 digits
+- "parameters": A dictionary of additional parameters like:
+    - "cvv": Card CVV (if provided)
+    - "expiryDate": Card expiry date in format MM/YY (if provided)
+    - "reason": Reason for deactivation (if provided)
+
+For example, if the user says "I want to activate my card ending in 4444 with CVV 123 and expiry date 05/26",
+you should return:
+{"intent": "card_action", "action": "activate", "card_identifier": "4444", "parameters": {"cvv": "123", "expiryDate": "05/26"}}
+
+If the intent is 'knowledge' or 'unknown', format as JSON: {"intent": "..."}
+
+Always include a "confidence" field between 0 and 1 stating how sure you are of the intent.
+
+The user message may start with the conversation so far; use it only to resolve what the query
+refers to (e.g. which card "it" is). Classify the User Query itself.""",
+    user='{conversation}User Query: "{query}"\n\nJSON Output:',
+)
+
+GENERATE_RESPONSE = PromptTemplate(
+    "generate_response",
+    system="""You are a helpful financial knowledge assistant. Answer the user's query based *only* on the provided context.
+
+The user message may start with the conversation so far; use it only to resolve what the query refers to.
+The context lists the retrieved product passages as "Result N: <text> (ID: <product id>)".""",
+    user="{conversation}Context:\n{context}\n\nUser Query: {query}\n\nAnswer:",
+)
+
+TEMPLATES = {template.name: template for template in (CLASSIFY_INTENT, GENERATE_RESPONSE)}
+
+
+def conversation_block(conversation: str) -> str:
+    """The conversation so far as the opening of a user message; empty when there is none."""
+    return f"Conversation so far:\n{conversation}\n\n" if conversation else ""
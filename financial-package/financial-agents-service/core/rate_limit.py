@@ -0,0 +1,194 @@
+import os
+import time
+import random
+import threading
+import multiprocessing
+from collections import deque
+
+# --- Configuration ---
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_ACQUIRE_TIMEOUT_S = float(os.getenv("LLM_ACQUIRE_TIMEOUT_S", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))
+
+# Indexes into the shared state array
+_REQUEST_TOKENS, _TOKEN_TOKENS, _LAST_REFILL, _IN_FLIGHT, _PAUSED_UNTIL = range(5)
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a call could not get LLM capacity within the acquire timeout."""
+
+
+class LLMRateLimiter:
+    """Token-bucket limiter for requests/min and tokens/min plus an in-flight cap.
+
+    Bucket state lives in shared memory guarded by a process-shared lock. When the
+    limiter is created before ``fork`` (as ui/serve.py does by preloading the app),
+    all workers draw from one budget instead of each assuming the full quota.
+    Waiters poll with jittered sleeps so they do not wake in lockstep. A rate of 0
+    leaves that bucket unlimited; negative rates and an in-flight cap below 1 are
+    rejected when the limiter is built (at import of core/llm.py, i.e. at startup).
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE, max_in_flight: int = LLM_MAX_IN_FLIGHT):
+        if requests_per_minute < 0 or tokens_per_minute < 0:
+            raise ValueError(f"LLM rate limits must be >= 0 (0 = unlimited), got "
+                             f"{requests_per_minute} requests/min and {tokens_per_minute} tokens/min")
+        if max_in_flight < 1:
+            raise ValueError(f"LLM_MAX_IN_FLIGHT must be >= 1, got {max_in_flight}")
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        # Allow ~10 s bursts; an unlimited bucket (rate 0) has no capacity and is never checked
+        self.request_capacity = max(1.0, self.request_rate * 10) if self.request_rate else 0.0
+        self.token_capacity = max(1.0, self.token_rate * 10) if self.token_rate else 0.0
+        self.max_in_flight = max_in_flight
+        self._state = multiprocessing.RawArray("d", 5)
+        self._lock = multiprocessing.Lock()
+        self._state[_REQUEST_TOKENS] = self.request_capacity
+        self._state[_TOKEN_TOKENS] = self.token_capacity
+        self._state[_LAST_REFILL] = time.monotonic()
+        # Per-process statistics
+        self._stats_lock = threading.Lock()
+        self._wait_times = deque(maxlen=1024)
+        self._counters = {"calls": 0, "throttled": 0, "rate_limited_429": 0, "retries": 0, "timeouts": 0}
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._state[_LAST_REFILL])
+        self._state[_REQUEST_TOKENS] = min(self.request_capacity, self._state[_REQUEST_TOKENS] + elapsed * self.request_rate)
+        self._state[_TOKEN_TOKENS] = min(self.token_capacity, self._state[_TOKEN_TOKENS] + elapsed * self.token_rate)
+        self._state[_LAST_REFILL] = now
+
+    def acquire(self, tokens: float, timeout: float = LLM_ACQUIRE_TIMEOUT_S) -> float:
+        """Blocks until a request slot and ``tokens`` are available; returns the wait in seconds."""
+        tokens = min(tokens, self.token_capacity) if self.token_rate else 0.0
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                state = self._state
+                requests_needed = 1.0 if self.request_rate else 0.0
+                if (now >= state[_PAUSED_UNTIL] and state[_IN_FLIGHT] < self.max_in_flight
+                        and state[_REQUEST_TOKENS] >= requests_needed and state[_TOKEN_TOKENS] >= tokens):
+                    state[_REQUEST_TOKENS] -= requests_needed
+                    state[_TOKEN_TOKENS] -= tokens
+                    state[_IN_FLIGHT] += 1
+                    waited = now - start
+                    self._record_wait(waited)
+                    return waited
+                wait = max(
+                    state[_PAUSED_UNTIL] - now,
+                    (requests_needed - state[_REQUEST_TOKENS]) / self.request_rate if self.request_rate else 0.0,
+                    (tokens - state[_TOKEN_TOKENS]) / self.token_rate if self.token_rate else 0.0,
+                    0.01,  # in-flight cap: poll until a call finishes
+                )
+            if now - start + wait > timeout:
+                with self._stats_lock:
+                    self._counters["timeouts"] += 1
+                raise RateLimitTimeout(f"No LLM capacity within {timeout:.1f}s")
+            time.sleep(min(wait, 0.25) * random.uniform(0.5, 1.0) + 0.001)
+
+    def release(self, estimated_tokens: float, actual_tokens: float | None = None):
+        """Frees the in-flight slot and corrects the token bucket with the real usage."""
+        with self._lock:
+            self._state[_IN_FLIGHT] -= 1
+            if actual_tokens is not None and self.token_rate:
+                self._state[_TOKEN_TOKENS] -= actual_tokens - min(estimated_tokens, self.token_capacity)
+
+    def pause(self, seconds: float):
+        """Stops all callers (in every process) from starting calls for ``seconds``."""
+        with self._lock:
+            self._state[_PAUSED_UNTIL] = max(self._state[_PAUSED_UNTIL], time.monotonic() + seconds)
+
+    def _record_wait(self, waited: float):
+        with self._stats_lock:
+            self._counters["calls"] += 1
+            if waited > 0.001:
+                self._counters["throttled"] += 1
+            self._wait_times.append(waited)
+
+    def count(self, counter: str):
+        with self._stats_lock:
+            self._counters[counter] += 1
+
+    @property
+    def in_flight(self) -> int:
+        return int(self._state[_IN_FLIGHT])
+
+    @property
+    def saturated(self) -> bool:
+        """True when a new call would queue: every in-flight slot is taken or a 429 pause is active."""
+        return self.in_flight >= self.max_in_flight or self._state[_PAUSED_UNTIL] > time.monotonic()
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            waits = sorted(self._wait_times)
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "request_tokens_available": round(self._state[_REQUEST_TOKENS], 2) if self.request_rate else None,
+            "token_tokens_available": round(self._state[_TOKEN_TOKENS], 1) if self.token_rate else None,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+            "wait_ms_max": round(1000 * waits[-1], 2) if waits else 0.0,
+        }
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough token estimate for a chat request: ~4 characters per token plus the completion budget."""
+    prompt_chars = sum(len(m.get("content") or "") for m in kwargs.get("messages", []))
+    return prompt_chars // 4 + int(kwargs.get("max_tokens") or 256)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_limits(limiter: LLMRateLimiter, fn, estimated_tokens: int, max_retries: int = LLM_MAX_RETRIES,
+                     timeout: float | None = None):
+    """Runs ``fn`` inside the limiter, retrying provider 429s with full-jitter backoff.
+
+    A 429 also pauses every caller for the provider's Retry-After (or the backoff),
+    so a burst is smoothed locally instead of turning into a retry storm. With a
+    ``timeout`` (seconds), waiting for capacity and backing off stop when it runs out.
+    """
+    expires = time.monotonic() + timeout if timeout is not None else None
+    for attempt in range(max_retries + 1):
+        acquire_timeout = LLM_ACQUIRE_TIMEOUT_S
+        if expires is not None:
+            acquire_timeout = min(acquire_timeout, max(0.0, expires - time.monotonic()))
+        limiter.acquire(estimated_tokens, acquire_timeout)
+        actual_tokens = None
+        try:
+            result = fn()
+            usage = getattr(result, "usage", None)
+            actual_tokens = getattr(usage, "total_tokens", None)
+            return result
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+            limiter.count("rate_limited_429")
+            backoff = random.uniform(0, min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * 2 ** attempt))
+            if expires is not None and time.monotonic() + backoff >= expires:
+                raise
+            limiter.count("retries")
+            limiter.pause(_retry_after_seconds(e) or backoff)
+            print(f"LLM rate limited (attempt {attempt + 1}/{max_retries + 1}); backing off {backoff:.2f}s")
+            time.sleep(backoff)
+        finally:
+            limiter.release(estimated_tokens, actual_tokens)
@@ -2,6 +2,7 @@
 
 import os
 import json
+import hashlib
 
 # Path to financial products data
 FINANCIAL_PRODUCTS_PATH = os.path.join(os.path.dirname(__file__), 'financial_products.json')
@@ -9,4 +10,43 @@ FINANCIAL_PRODUCTS_PATH = os.path.join(os.path.dirname(__file__), 'financial_pro
 def load_financial_products():
     """Load financial products data from JSON file."""
     with open(FINANCIAL_PRODUCTS_PATH, 'r') as f:
-        return json.load(f) 
\ No newline at end of file
+        return json.load(f) 
+
+# Generated catalogs (scripts/generate_synthetic_data.py --count N)
+CATALOG_DIR = os.path.join(os.path.dirname(__file__), 'catalog')
+
+def load_catalog_manifest(catalog_dir=CATALOG_DIR):
+    """Load the manifest.json written alongside a generated catalog."""
+    with open(os.path.join(catalog_dir, 'manifest.json'), 'r') as f:
+        return json.load(f)
+
+def iter_catalog(kind, catalog_dir=CATALOG_DIR):
+    """Stream "products", "passages" or "queries" records from a generated catalog, across shards."""
+    for filename in load_catalog_manifest(catalog_dir)[kind]['files']:
+        with open(os.path.join(catalog_dir, filename), 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+# Canned questions replayed by the startup warm-up (ui/warmup.py), most frequent first
+WARMUP_QUERIES_PATH = os.path.join(os.path.dirname(__file__), 'warmup_queries.json')
+
+def load_warmup_queries(limit=None, path=WARMUP_QUERIES_PATH):
+    """Load the canned warm-up questions, optionally only the first ``limit``."""
+    with open(path, 'r') as f:
+        queries = json.load(f)['queries']
+    return queries[:limit] if limit is not None else queries
+
+# Seeded FAQ per product, and the answer store built from it (scripts/build_faq_store.py)
+FAQ_QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), 'faq_questions.json')
+FAQ_STORE_PATH = os.path.join(os.path.dirname(__file__), 'faq_store.json')
+
+def load_faq_questions(path=FAQ_QUESTIONS_PATH):
+    """Load the seeded FAQ as a mapping of product id to questions."""
+    with open(path, 'r') as f:
+        return json.load(f)['products']
+
+def product_version(product):
+    """Content hash of a product record; changes whenever any of its fields does."""
+    canonical = json.dumps(product, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,217 @@
+"""Offline job that answers the seeded FAQ and writes the store served by core/faq.py.
+
+Every question in data/faq_questions.json goes through the knowledge agent (with the
+configured LLM backend, or ``--answer-mode extractive``). An extractive answer is
+built from the question's own product passage only, so other products' sentences
+never mix in. An answer is vetted when:
+
+- the agent reported no error and the answer is not an apology
+- the question's own product was among the retrieved passages
+- it names no other product, unless the product's own record does ("Health FSA")
+- every number in it appears in the product's record
+- it holds the field the question asks about (fees, limits, eligibility, features,
+  notes; see core/extractive.py), taken from the product's record
+- it contains the question's remaining content words (rollover, funding, Medicare...)
+
+Unvetted answers are still written, for review, but are never served. Entries whose
+product record and embedding backend are unchanged are reused, so re-running after a
+catalog release only regenerates the products that changed:
+
+    LLM_BACKEND=openai python scripts/build_faq_store.py
+    python scripts/build_faq_store.py --rebuild --answer-mode extractive
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+import numpy as np
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from data import FAQ_QUESTIONS_PATH, FAQ_STORE_PATH, load_faq_questions, load_financial_products, product_version
+from core.extractive import FIELD_CUES, extractive_answer, query_fields
+from core.faq import normalize_question
+from core.knowledge import KNOWLEDGE_EXTRACTIVE_SENTENCES, knowledge_agent_app, names_product
+from vector_db.populate_vector_db import product_text
+from vector_db.embeddings import embed_texts, get_embedder
+
+APOLOGIES = ("sorry", "i couldn't", "i could not", "i don't know")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+# Question words that carry no content of their own ("How does an HSA work?" asks for the overview)
+GENERIC_WORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it me my of on or tell the to what with you "
+    "your there this that any about am get have need should when where which who why will work works "
+    "account accounts card cards".split()
+)
+# Product record keys holding each field's values
+FIELD_KEYS = {"fees": ("fees",), "eligibility": ("eligibility",), "features": ("features",), "notes": ("notes",)}
+
+
+def entry_id(product_id: str, question: str) -> str:
+    return f"{product_id}-{hashlib.sha1(normalize_question(question).encode('utf-8')).hexdigest()[:8]}"
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+def _has_word(answer_words: set[str], word: str) -> bool:
+    """Whether the answer holds ``word`` or a form of it (shared first five letters: "funds"/"funded")."""
+    stem = word[:5]
+    return any(w == word or (len(stem) >= 4 and w.startswith(stem)) for w in answer_words)
+
+def field_values(product: dict, field: str) -> list[str]:
+    if field == "limits":
+        return [str(value) for key, value in product.items() if key.startswith("contribution_limit")]
+    values = []
+    for key in FIELD_KEYS.get(field, ()):
+        value = product.get(key)
+        values.extend(value if isinstance(value, list) else [value] if value else [])
+    return values
+
+def _numbers(text: str) -> set[str]:
+    return {n.replace(",", "").rstrip(".") for n in _NUMBER_RE.findall(text)}
+
+def vet(product_id: str, question: str, result: dict, products: dict) -> tuple[bool, str | None]:
+    response = (result.get("response") or "").strip()
+    if result.get("error"):
+        return False, f"agent error: {result['error']}"
+    if not response or response.lower().startswith(APOLOGIES):
+        return False, "no answer"
+    sources = [(r.get("metadata") or {}).get("id") or r.get("id") for r in result.get("search_results") or []]
+    if product_id not in sources:
+        return False, f"product not retrieved (sources: {', '.join(map(str, sources))})"
+
+    product = products[product_id]
+    record = product_text(product)
+    others = [pid for pid, other in products.items()
+              if pid != product_id and names_product(response, other.get("name"))
+              and not names_product(record, other.get("name"))]
+    if others:
+        return False, f"answer names {', '.join(others)}"
+    unknown_numbers = _numbers(response) - _numbers(record)
+    if unknown_numbers:
+        return False, f"numbers not in the product record: {', '.join(sorted(unknown_numbers))}"
+
+    answer_words = set(_words(response))
+    fields = query_fields(question) - {"overview"}
+    for field in sorted(fields):
+        values = field_values(product, field)
+        if not values:
+            return False, f"product has no {field}"
+        if not any(_numbers(value) & _numbers(response) if field == "limits"
+                   else all(_has_word(answer_words, w) for w in set(_words(value)) - GENERIC_WORDS)
+                   for value in values):
+            return False, f"answer does not state the {field}"
+
+    cues = tuple(cue for field in fields for cue in FIELD_CUES[field])
+    name_words = set(_words(product.get("name") or ""))
+    missing = [w for w in dict.fromkeys(_words(question))
+               if w not in GENERIC_WORDS and w not in name_words and not w.startswith(cues)
+               and not _has_word(answer_words, w)]
+    if missing:
+        return False, f"answer does not mention {', '.join(missing)}"
+    return True, None
+
+def own_passages(product_id: str, result: dict) -> list[dict]:
+    return [r for r in result.get("search_results") or []
+            if ((r.get("metadata") or {}).get("id") or r.get("id")) == product_id]
+
+def load_existing(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        store = json.load(f)
+    if store.get("embedding") != get_embedder().embedding_id:
+        print(f"Existing store was embedded with {store.get('embedding')}; regenerating every entry")
+        return {}
+    return {entry["id"]: entry for entry in store["entries"]}
+
+def build(questions_path: str, output: str, answer_mode: str, rebuild: bool) -> dict:
+    products = {p["id"]: p for p in load_financial_products()["products"]}
+    faq = load_faq_questions(questions_path)
+    existing = {} if rebuild else load_existing(output)
+
+    entries, generated, reused = [], 0, 0
+    for product_id, questions in faq.items():
+        if product_id not in products:
+            print(f"Skipping {len(questions)} questions for unknown product {product_id}")
+            continue
+        version = product_version(products[product_id])
+        for question in questions:
+            eid = entry_id(product_id, question)
+            previous = existing.get(eid)
+            if previous is not None and previous["product_version"] == version and previous.get("vetted"):
+                entries.append(previous)
+                reused += 1
+                continue
+            start = time.perf_counter()
+            result = knowledge_agent_app.invoke({"query": question, "answer_mode": answer_mode})
+            passages = own_passages(product_id, result)
+            if answer_mode == "extractive" and passages and not result.get("error"):
+                # Sentences from the question's own product only
+                result = {**result, "response": extractive_answer(question, passages, KNOWLEDGE_EXTRACTIVE_SENTENCES)}
+            vetted, reason = vet(product_id, question, result, products)
+            entries.append({
+                "id": eid,
+                "product_id": product_id,
+                "product_version": version,
+                "question": question,
+                "question_normalized": normalize_question(question),
+                "answer": (result.get("response") or "").strip(),
+                "sources": [r.get("id") for r in result.get("search_results") or []],
+                "vetted": vetted,
+                "rejected_reason": reason,
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+            generated += 1
+            if not vetted:
+                print(f"Not vetted: {question!r}: {reason}")
+
+    vectors = embed_texts([entry["question"] for entry in entries]) if entries else []
+    for entry, vector in zip(entries, vectors):
+        # Little-endian float32, base64: one line per vector instead of one per number
+        entry["embedding"] = base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+    store = {
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embedding": get_embedder().embedding_id,
+        "catalog_version": hashlib.sha256("".join(sorted(product_version(p) for p in products.values()))
+                                          .encode("utf-8")).hexdigest()[:16],
+        "answer_mode": answer_mode,
+        "entries": entries,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(store, f, indent=1)
+    os.replace(tmp_path, output)  # readers never see a partial file
+    vetted_count = sum(1 for entry in entries if entry["vetted"])
+    print(f"Wrote {len(entries)} FAQ entries ({vetted_count} vetted; {generated} generated, {reused} reused) "
+          f"to {output}")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer the seeded FAQ offline and write the FAQ answer store.")
+    parser.add_argument("--questions", default=FAQ_QUESTIONS_PATH, help="Seeded FAQ (product id -> questions)")
+    parser.add_argument("--output", default=FAQ_STORE_PATH)
+    parser.add_argument("--answer-mode", choices=("llm", "extractive"), default="llm",
+                        help="How the knowledge agent answers (llm uses LLM_BACKEND)")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate every entry instead of reusing "
+                                                              "answers for unchanged products")
+    args = parser.parse_args()
+    build(args.questions, args.output, args.answer_mode, args.rebuild)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
-import json
 import os
+import json
+import time
+import random
+import hashlib
+import argparse
 
 def generate_data():
     """Generates synthetic financial product data."""
@@ -54,6 +58,294 @@ def save_data(data, output_dir="src/data", filename="financial_products.json"):
         json.dump(data, f, indent=4)
     print(f"Synthetic data saved to {filepath}")
 
+# --- Scalable catalog generation ---
+# Every record is generated from its own RNG seeded with (seed, index), so output is
+# identical regardless of shard size and any record can be regenerated on its own.
+
+ISSUERS = ["Cedar Bank", "Northwind Financial", "Harbor Credit Union", "Summit Trust", "Bluewater Bank",
+           "Pioneer Savings", "Granite Federal", "Lakeside Financial", "Meridian Bank", "Redwood Credit Union",
+           "Atlas Benefits", "Evergreen Health Bank", "Keystone Payments", "Orchard Trust", "Silverline Card Services"]
+TIERS = ["Basic", "Standard", "Plus", "Gold", "Premier", "Select"]
+
+# code, display name, base description, contribution limit ranges (None for card products)
+PRODUCT_TYPES = [
+    ("HSA", "Health Savings Account",
+     "A tax-advantaged savings account for individuals with high-deductible health plans.",
+     {"contribution_limit_individual": (3650, 4300), "contribution_limit_family": (7300, 8550)}),
+    ("FSA", "Flexible Spending Account",
+     "An employer-sponsored account for setting aside pre-tax dollars for eligible healthcare expenses.",
+     {"contribution_limit": (2850, 3300)}),
+    ("LPFSA", "Limited Purpose FSA",
+     "A flexible spending account restricted to dental and vision expenses that can be paired with an HSA.",
+     {"contribution_limit": (2850, 3300)}),
+    ("DCFSA", "Dependent Care FSA",
+     "A pre-tax account for daycare, preschool and elder care expenses for qualifying dependents.",
+     {"contribution_limit": (5000, 5000)}),
+    ("HRA", "Health Reimbursement Arrangement",
+     "An employer-funded arrangement that reimburses employees for qualified medical expenses.",
+     {"contribution_limit": (5850, 6350)}),
+    ("HCSA", "Health Care Spending Account",
+     "An account used to reimburse eligible medical expenses under an employer plan.",
+     {"contribution_limit": (2500, 3300)}),
+    ("COMMUTER", "Commuter Benefits Account",
+     "A pre-tax account for transit passes, vanpooling and qualified parking costs.",
+     {"contribution_limit": (300, 325)}),
+    ("PREPAID", "General Purpose Prepaid Card",
+     "A reloadable card not linked to a bank account, usable wherever the card network is accepted.", None),
+    ("PAYROLL", "Payroll Card",
+     "A card onto which an employer deposits wages for employees without a bank account.", None),
+    ("GIFT", "Gift Card",
+     "A non-reloadable card loaded with a fixed value that can be spent at participating merchants.", None),
+    ("DEBIT", "Debit Card",
+     "A card that draws purchases directly from a linked checking account.", None),
+    ("CREDIT", "Credit Card",
+     "A revolving line of credit with a monthly statement and a minimum payment.", None),
+]
+PRODUCT_TYPE_NAMES = {code: name for code, name, _, _ in PRODUCT_TYPES}
+
+# Text pools per product family: "benefit" accounts (types with contribution limits) and "card" products
+_EXTRA_SENTENCES = {
+    "common": [
+        "Balances can be viewed in the mobile app and online banking at any time.",
+        "Statements are delivered electronically each month unless paper statements are requested.",
+        "Customer support is available by phone around the clock for lost or stolen cards.",
+        "Funds are held at an FDIC-insured partner bank up to applicable limits.",
+        "A replacement card is mailed within seven to ten business days.",
+    ],
+    "benefit": [
+        "Receipts for qualified purchases should be kept in case of an IRS audit.",
+        "Contributions can be changed during open enrollment or after a qualifying life event.",
+        "Unused balances are handled according to the plan's carryover or grace period rules.",
+        "Investment options become available once the cash balance exceeds the plan threshold.",
+        "Employers may contribute on behalf of employees as part of the benefits package.",
+        "Purchases at pharmacies and doctor's offices are approved automatically at the point of sale.",
+    ],
+    "card": [
+        "Account holders can set spending alerts and lock the card instantly from the app.",
+        "Direct deposit is supported and may make funds available up to two days early.",
+        "The card can be added to Apple Pay, Google Pay and Samsung Pay.",
+        "Purchases are accepted at millions of merchants worldwide.",
+    ],
+}
+_ELIGIBILITY_CLAUSES = {
+    "common": ["Must be at least 18 years old", "Must have a valid Social Security number or ITIN",
+               "Must reside in the United States", "Subject to identity verification"],
+    "benefit": ["Must be covered under a high-deductible health plan", "Cannot be enrolled in Medicare",
+                "Cannot be claimed as a dependent on someone else's tax return",
+                "Must be employed by a participating employer",
+                "Must not have any other disqualifying health coverage",
+                "Available to full-time employees after a 30-day waiting period",
+                "Dependents must be under age 13 or incapable of self-care"],
+    "card": ["Requires an active checking account with the issuer", "Subject to credit approval",
+             "No minimum balance required to open"],
+}
+_FEATURES = {
+    "common": ["Zero liability for unauthorized transactions", "Card lock and unlock in the app",
+               "Real-time transaction alerts", "Contactless payments", "Family member cards"],
+    "benefit": ["Tax-deductible contributions", "Tax-free growth", "Tax-free withdrawals for qualified medical expenses",
+                "Funds roll over year to year", "Pre-tax contributions reduce taxable income",
+                "Funds available at the start of the plan year", "Investment options for long-term savings",
+                "Employer contributions", "Substantiation-free purchases at eligible merchants"],
+    "card": ["Budgeting tools", "Online bill pay", "Mobile check deposit", "Cash back rewards on everyday purchases",
+             "No credit check required", "Free ATM withdrawals at in-network ATMs", "Purchase protection",
+             "Travel insurance", "No foreign transaction fees"],
+}
+# name, low, high
+_FEES = {
+    "common": [("Replacement card fee", 0.0, 15.0), ("Paper statement fee", 0.0, 3.0),
+               ("Account closure fee", 0.0, 25.0)],
+    "benefit": [("Monthly maintenance fee", 0.0, 4.50), ("Investment account fee", 0.0, 3.0),
+                ("Outgoing transfer fee", 0.0, 25.0)],
+    "card": [("Activation fee", 0.0, 9.95), ("Monthly maintenance fee", 0.0, 9.95), ("Reload fee", 0.0, 5.95),
+             ("ATM withdrawal fee", 0.0, 3.50), ("Inactivity fee", 0.0, 5.0), ("Foreign transaction fee", 0.0, 3.0),
+             ("Annual fee", 0.0, 250.0), ("Late payment fee", 0.0, 41.0)],
+}
+_NOTES = {
+    "common": ["Fees may be waived when a minimum monthly direct deposit is received."],
+    "benefit": ["Generally subject to the 'use-it-or-lose-it' rule, though some plans offer carryover or grace periods.",
+                "Contribution limits are set annually by the IRS and may change.",
+                "Rules vary significantly depending on the employer's plan document.",
+                "Non-qualified withdrawals may be subject to income tax and a 20% penalty."],
+    "card": ["Interest rates are variable and based on the prime rate.",
+             "Funds on the card are not a deposit account until registered."],
+}
+_POOLS = {
+    family: {name: pool["common"] + pool[family]
+             for name, pool in (("sentences", _EXTRA_SENTENCES), ("eligibility", _ELIGIBILITY_CLAUSES),
+                                ("features", _FEATURES), ("fees", _FEES), ("notes", _NOTES))}
+    for family in ("benefit", "card")
+}
+
+
+def _record_rng(seed: int, index: int) -> random.Random:
+    return random.Random(f"{seed}:{index}")
+
+def _pick(rng: random.Random, pool: list, mean: float, minimum: int = 0) -> list:
+    """Samples a variable-length subset; lengths are roughly exponential around ``mean``."""
+    count = min(len(pool), max(minimum, int(rng.expovariate(1.0 / mean))))
+    return rng.sample(pool, count)
+
+def generate_product(index: int, seed: int = 0) -> dict:
+    """Generates catalog product ``index``; the same (index, seed) always yields the same record."""
+    rng = _record_rng(seed, index)
+    code, type_name, base_description, limits = rng.choice(PRODUCT_TYPES)
+    issuer, tier = rng.choice(ISSUERS), rng.choice(TIERS)
+    pools = _POOLS["benefit" if limits else "card"]
+    plan = f"{code}-{index:07d}"
+    product = {
+        "id": f"{code}{index:07d}",
+        "name": f"{issuer} {tier} {type_name} (plan {plan})",
+        "plan": plan,
+        "category": code,
+        "issuer": issuer,
+        "tier": tier,
+        "description": " ".join([base_description] + _pick(rng, pools["sentences"], 2.0)),
+        "eligibility": "; ".join(_pick(rng, pools["eligibility"], 2.5, minimum=1)) + ".",
+    }
+    for key, (low, high) in (limits or {}).items():
+        product[key] = rng.randrange(low, high + 1, 50) if high > low else low
+    product["features"] = _pick(rng, pools["features"], 3.5, minimum=1)
+    fees = _pick(rng, pools["fees"], 2.5)
+    if fees:
+        product["fees"] = [f"{name}: ${rng.uniform(low, high):.2f}" if rng.random() < 0.8 else f"{name} (may vary)"
+                           for name, low, high in fees]
+    if rng.random() < 0.4:
+        product["notes"] = rng.choice(pools["notes"])
+    return product
+
+def product_passages(product: dict) -> list[dict]:
+    """Splits a product into section passages (overview, eligibility, limits, features, fees, notes)."""
+    pid, name = product["id"], product["name"]
+    sections = [("overview", f"{name}. {product['description']}"),
+                ("eligibility", f"Eligibility for the {name}: {product['eligibility']}")]
+    limits = [f"{key.replace('_', ' ')}: ${value:,}" for key, value in product.items()
+              if key.startswith("contribution_limit")]
+    if limits:
+        sections.append(("limits", f"Contribution limits for the {name}: {'; '.join(limits)}."))
+    sections.append(("features", f"Features of the {name}: {', '.join(product['features'])}."))
+    if product.get("fees"):
+        sections.append(("fees", f"Fees for the {name}: {', '.join(product['fees'])}."))
+    if product.get("notes"):
+        sections.append(("notes", f"Notes on the {name}: {product['notes']}"))
+    return [{"id": f"{pid}#{section}", "product_id": pid, "section": section, "text": text,
+             "metadata": {"id": pid, "name": name, "category": product["category"], "section": section}}
+            for section, text in sections]
+
+_QUERY_TEMPLATES = {
+    "overview": ["What is the {plan} {type}?", "Tell me about plan {plan}.", "How does the {issuer} {type} {plan} work?"],
+    "eligibility": ["Who is eligible for plan {plan}?", "What are the eligibility requirements for the {type} {plan}?",
+                    "Can I open the {issuer} {tier} {type} {plan}?"],
+    "limits": ["What is the contribution limit for plan {plan}?", "How much can I contribute to {type} {plan}?"],
+    "features": ["What features does plan {plan} include?", "What are the benefits of the {tier} {type} {plan}?"],
+    "fees": ["What fees does plan {plan} charge?", "Is there a monthly fee on the {type} {plan}?",
+             "How much does the {issuer} card {plan} cost?"],
+    "notes": ["Are there any restrictions on plan {plan}?", "What should I know before opening {plan}?"],
+}
+
+def product_queries(product: dict, rng: random.Random, per_product: int = 1) -> list[dict]:
+    """Labeled queries for a product; each names the plan, so its relevant ids are known exactly."""
+    passages = product_passages(product)
+    queries = []
+    for passage in rng.sample(passages, min(per_product, len(passages))):
+        template = rng.choice(_QUERY_TEMPLATES[passage["section"]])
+        text = template.format(plan=product["plan"], type=PRODUCT_TYPE_NAMES[product["category"]], issuer=product["issuer"], tier=product["tier"])
+        queries.append({"id": f"Q-{passage['id']}", "query": text, "section": passage["section"],
+                        "relevant_product_ids": [product["id"]], "relevant_passage_ids": [passage["id"]]})
+    return queries
+
+
+class ShardedJsonlWriter:
+    """Streams records to ``<stem>.jsonl`` or ``<stem>-00000.jsonl`` shards of ``shard_size`` lines."""
+
+    def __init__(self, output_dir: str, stem: str, shard_size: int | None = None):
+        self.output_dir, self.stem, self.shard_size = output_dir, stem, shard_size
+        self.files, self.count = [], 0
+        self._handle = None
+
+    def _open_next(self):
+        if self._handle:
+            self._handle.close()
+        suffix = f"-{len(self.files):05d}" if self.shard_size else ""
+        path = os.path.join(self.output_dir, f"{self.stem}{suffix}.jsonl")
+        self.files.append(os.path.basename(path))
+        self._handle = open(path, "w")
+
+    def write(self, record: dict):
+        if self._handle is None or (self.shard_size and self.count % self.shard_size == 0):
+            self._open_next()
+        self._handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._handle:
+            self._handle.close()
+            self._handle = None
+
+
+def generate_catalog(output_dir: str, count: int, seed: int = 0, num_queries: int = 1000,
+                     shard_size: int | None = None, passages: bool = True) -> dict:
+    """Streams ``count`` products (plus passages and labeled queries) to JSONL with constant memory.
+
+    Writes products, passages and queries files and a manifest.json describing them;
+    ``catalog_version`` changes whenever the seed, count or generator output changes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {"products": ShardedJsonlWriter(output_dir, "products", shard_size)}
+    if passages:
+        writers["passages"] = ShardedJsonlWriter(output_dir, "passages", shard_size)
+    writers["queries"] = ShardedJsonlWriter(output_dir, "queries")
+    query_every = max(1, count // num_queries) if num_queries else 0
+    query_rng = random.Random(f"{seed}:queries")
+    digest = hashlib.sha256(f"{seed}:{count}".encode())
+
+    start = time.perf_counter()
+    try:
+        for index in range(count):
+            product = generate_product(index, seed)
+            if index < 64:
+                digest.update(json.dumps(product, sort_keys=True).encode())
+            writers["products"].write(product)
+            if passages:
+                for passage in product_passages(product):
+                    writers["passages"].write(passage)
+            if query_every and index % query_every == 0 and writers["queries"].count < num_queries:
+                for query in product_queries(product, query_rng):
+                    writers["queries"].write(query)
+            if index and index % 100000 == 0:
+                rate = index / (time.perf_counter() - start)
+                print(f"Generated {index:,}/{count:,} products ({rate:,.0f}/s)")
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    manifest = {
+        "catalog_version": digest.hexdigest()[:16],
+        "seed": seed,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        **{name: {"count": w.count, "files": w.files} for name, w in writers.items()},
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count:,} products, {manifest.get('passages', {}).get('count', 0):,} passages and "
+          f"{manifest['queries']['count']:,} queries to {output_dir} in {elapsed:.1f}s")
+    return manifest
+
 if __name__ == "__main__":
-    synthetic_data = generate_data()
-    save_data(synthetic_data) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic financial product data.")
+    parser.add_argument("--count", type=int, help="Generate a catalog of COUNT products as JSONL instead of "
+                                                   "the four curated products")
+    parser.add_argument("--seed", type=int, default=0, help="Catalog seed (same seed, same records)")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: src/data, or "
+                                                           "data/catalog with --count)")
+    parser.add_argument("--shard-size", type=int, default=None, help="Split products/passages into files of N lines")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of labeled queries to generate")
+    parser.add_argument("--no-passages", action="store_true", help="Skip the per-section passage records")
+    args = parser.parse_args()
+
+    if args.count:
+        generate_catalog(args.output_dir or "data/catalog", args.count, seed=args.seed, num_queries=args.queries,
+                         shard_size=args.shard_size, passages=not args.no_passages)
+    else:
+        synthetic_data = generate_data()
+        save_data(synthetic_data, output_dir=args.output_dir or "src/data")
@@ -0,0 +1,139 @@
+"""Lightweight stand-in for the Spring Boot card service.
+
+Serves the same ``/api/cards/activate`` and ``/api/cards/deactivate`` endpoints with
+the seed cards from ``V3__Seed_Card_Data.sql`` and a configurable latency/error
+profile, so the agents API can be load-tested on a laptop or in CI:
+
+    python scripts/mock_card_service.py --profile slow --port 8080
+    CARD_API_BASE_URL=http://localhost:8080/api/cards LLM_BACKEND=fake uvicorn ui.api:app
+"""
+
+import time
+import random
+import argparse
+from datetime import date
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+import uvicorn
+
+# --- Latency / Error Profiles ---
+# latency_ms: mean added latency, jitter_ms: uniform +/- jitter,
+# error_rate: fraction of 500 responses, timeout_rate: fraction of requests that hang for hang_ms
+PROFILES = {
+    "fast": {"latency_ms": 5, "jitter_ms": 2, "error_rate": 0.0, "timeout_rate": 0.0, "hang_ms": 0},
+    "realistic": {"latency_ms": 60, "jitter_ms": 40, "error_rate": 0.01, "timeout_rate": 0.0, "hang_ms": 0},
+    "slow": {"latency_ms": 400, "jitter_ms": 200, "error_rate": 0.02, "timeout_rate": 0.0, "hang_ms": 0},
+    "flaky": {"latency_ms": 80, "jitter_ms": 60, "error_rate": 0.15, "timeout_rate": 0.05, "hang_ms": 12000},
+}
+
+# --- Seed Data (mirrors the card service migrations) ---
+def _seed_cards():
+    today = date.today()
+    return {
+        "4444": {"status": "PRE_ACTIVATED", "customer_id": "CUST123", "expiry": (today.year + 1, today.month)},
+        "8888": {"status": "ACTIVE", "customer_id": "CUST456", "expiry": (today.year + 2, today.month)},
+        "2222": {"status": "EXPIRED", "customer_id": "CUST123", "expiry": (today.year - 1, today.month)},
+    }
+
+
+def create_app(profile: dict, stateful: bool = False, seed: int | None = None) -> FastAPI:
+    """Builds the mock card API.
+
+    By default every request is evaluated against the seed data, so repeated load-test
+    requests get the same answer. With ``stateful=True`` activations and deactivations
+    persist for the lifetime of the process, like the real service.
+    """
+    app = FastAPI(title="Mock Card API")
+    rng = random.Random(seed)
+    cards = _seed_cards()
+
+    def simulate_latency():
+        if profile["timeout_rate"] and rng.random() < profile["timeout_rate"]:
+            time.sleep(profile["hang_ms"] / 1000.0)
+        delay_ms = profile["latency_ms"] + rng.uniform(-profile["jitter_ms"], profile["jitter_ms"])
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        return bool(profile["error_rate"]) and rng.random() < profile["error_rate"]
+
+    def respond(status_code: int, success: bool, message: str, card_last_four):
+        return JSONResponse(status_code=status_code,
+                            content={"success": success, "message": message, "cardNumber": card_last_four})
+
+    def lookup(card_last_four):
+        if not card_last_four or len(card_last_four) != 4 or not card_last_four.isdigit():
+            return None, respond(400, False, "Invalid card last four format. Must be exactly 4 digits.", card_last_four)
+        card = cards.get(card_last_four)
+        if card is None:
+            return None, respond(404, False, "Card not found with provided details.", card_last_four)
+        return (card if stateful else dict(card)), None
+
+    # Handlers are sync so FastAPI runs them in its thread pool and time.sleep models a blocking backend
+    @app.get("/actuator/health")
+    def health():
+        return {"status": "UP"}
+
+    @app.post("/api/cards/activate")
+    def activate(request: dict):
+        card_last_four = request.get("cardLastFour")
+        if simulate_latency():
+            return respond(500, False, "An unexpected error occurred during activation.", card_last_four)
+        if card_last_four is None or request.get("cvv") is None or request.get("expiryDate") is None:
+            return respond(400, False, "Missing required fields for activation (cardLastFour, cvv, expiryDate).", card_last_four)
+        card, error = lookup(card_last_four)
+        if error:
+            return error
+        try:
+            month, year = request["expiryDate"].split("/")
+            expiry = (2000 + int(year), int(month))
+        except ValueError:
+            return respond(400, False, "Invalid expiry date format. Use MM/YY.", card_last_four)
+        if expiry != card["expiry"]:
+            return respond(400, False, "Invalid CVV or Expiry Date provided.", card_last_four)
+        if card["status"] == "EXPIRED":
+            return respond(409, False, "Cannot activate an expired card.", card_last_four)
+        if card["status"] not in ("PRE_ACTIVATED", "ACTIVE"):
+            return respond(409, False, f"Card is not in a state eligible for activation. Current status: {card['status']}", card_last_four)
+        card["status"] = "ACTIVE"
+        return respond(200, True, "Card activated successfully", card_last_four)
+
+    @app.post("/api/cards/deactivate")
+    def deactivate(request: dict):
+        card_last_four = request.get("cardLastFour")
+        if simulate_latency():
+            return respond(500, False, "An unexpected error occurred during deactivation.", card_last_four)
+        card, error = lookup(card_last_four)
+        if error:
+            return error
+        if card["status"] in ("DEACTIVATED", "EXPIRED"):
+            return respond(409, False, f"Card is already {card['status'].lower()}.", card_last_four)
+        if card["status"] != "ACTIVE":
+            return respond(409, False, f"Card cannot be deactivated from its current state: {card['status']}", card_last_four)
+        card["status"] = "DEACTIVATED"
+        return respond(200, True, "Card deactivated successfully", card_last_four)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the card service API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="Latency/error profile")
+    parser.add_argument("--latency-ms", type=float, help="Override the profile's mean latency")
+    parser.add_argument("--jitter-ms", type=float, help="Override the profile's latency jitter")
+    parser.add_argument("--error-rate", type=float, help="Override the profile's 500 error rate (0-1)")
+    parser.add_argument("--timeout-rate", type=float, help="Override the profile's hang rate (0-1)")
+    parser.add_argument("--stateful", action="store_true", help="Persist card state changes between requests")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible latency/error sequences")
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    for key in ("latency_ms", "jitter_ms", "error_rate", "timeout_rate"):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    print(f"Mock card service profile '{args.profile}': {profile}")
+    uvicorn.run(create_app(profile, stateful=args.stateful, seed=args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
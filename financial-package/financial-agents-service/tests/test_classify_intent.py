@@ -0,0 +1,24 @@
+"""State written by the orchestrator's classifier (core/orchestrator.py)."""
+
+import pytest
+
+from core.llm import FakeLLMBackend, set_backend
+from core.orchestrator import classify_intent
+
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    set_backend(FakeLLMBackend(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0))
+
+
+def test_card_turn_sets_the_card_agent_inputs():
+    update = classify_intent({"user_query": "Please activate my card ending in 4444 with CVV 123 and expiry date 05/27"})
+    assert (update["action"], update["card_number"]) == ("activate", "4444")
+    assert update["parameters"]["cvv"] == "123"
+
+
+@pytest.mark.parametrize("query", ["What is an HSA?", "What is the weather today?"])
+def test_other_turns_clear_the_previous_card_action(query):
+    update = classify_intent({"user_query": query})
+    assert update["intent"] != "card_action"
+    assert (update["action"], update["card_number"], update["parameters"]) == ("", "", {})
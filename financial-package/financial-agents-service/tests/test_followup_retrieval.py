@@ -0,0 +1,46 @@
+"""Retrieval of follow-up questions in a session (core/memory.py, core/knowledge.py)."""
+
+import pytest
+
+from core import knowledge
+from core.memory import followup_query, stands_alone
+from data import load_financial_products
+from vector_db.populate_vector_db import build_product_index
+
+HSA_TURN = {"user": "Tell me about the HSA", "assistant": "A Health Savings Account (HSA) is ...",
+            "intent": "knowledge"}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalog_index():
+    knowledge.set_knowledge_index(build_product_index(load_financial_products()["products"]))
+    yield
+    knowledge.set_knowledge_index(None)
+
+
+def retrieved_ids(query: str, history: list[dict]) -> list[str]:
+    state = {"query": query, "history": history, "deadline": None}
+    return [result["id"] for result in knowledge.retrieve_knowledge(state)["search_results"]]
+
+
+def test_elliptical_followup_retrieves_the_product_under_discussion():
+    assert retrieved_ids("Who is eligible?", [HSA_TURN])[0] == "HSA001"
+
+
+def test_question_naming_another_product_is_not_expanded():
+    query = "Is there a monthly fee on the prepaid card?"
+    assert followup_query(query, [HSA_TURN], names_subject=knowledge.names_catalog_product) == query
+    assert retrieved_ids(query, [HSA_TURN])[0] == "PREPAID001"
+
+
+def test_followup_is_searched_back_to_the_last_question_naming_a_product():
+    history = [{"user": "What is an FSA?", "assistant": "...", "intent": "knowledge"}, HSA_TURN,
+               {"user": "Who is eligible?", "assistant": "...", "intent": "knowledge"}]
+    assert (followup_query("What are the contribution limits?", history, names_subject=knowledge.names_catalog_product)
+            == "Tell me about the HSA Who is eligible? What are the contribution limits?")
+
+
+def test_without_a_subject_predicate_short_and_referring_questions_lean_back():
+    assert not stands_alone("Who is eligible?")
+    assert not stands_alone("What are the monthly fees on it for a family?")
+    assert stands_alone("What are the monthly fees on a general purpose prepaid card?")
@@ -0,0 +1,30 @@
+"""Usage statistics of the model router (core/model_router.py)."""
+
+from core.llm import FakeLLMBackend, use_backend
+from core.model_router import ModelRouter
+from core.prompts import GENERATE_RESPONSE
+
+MESSAGES = GENERATE_RESPONSE.render(conversation="", context="Result 1: An HSA ... (ID: HSA001)",
+                                    query="What is an HSA?")
+
+
+def fake_backend() -> FakeLLMBackend:
+    return FakeLLMBackend(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0)
+
+
+def test_calls_are_counted_per_node_and_tier():
+    router = ModelRouter()
+    with use_backend(fake_backend()):
+        router.complete("generate_response", MESSAGES)
+    metrics = router.metrics()
+    assert metrics["tiers"]["generate_response.fast"]["calls"] == 1
+    assert metrics["tokens"]["generate_response"]["prompt_tokens"] > 0
+    assert len(metrics["recent"]) == 1
+
+
+def test_calls_without_stats_recording_are_not_counted():
+    router = ModelRouter()
+    with use_backend(fake_backend(), record_stats=False):
+        completion, decision = router.complete("generate_response", MESSAGES)
+    assert completion is not None and decision["tier"] == "fast"
+    assert router.metrics() == {"tiers": {}, "tokens": {}, "escalations": {}, "recent": []}
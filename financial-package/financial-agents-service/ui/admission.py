@@ -0,0 +1,207 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+# --- Configuration ---
+ADMISSION_TOTAL_CONCURRENCY = int(os.getenv("ADMISSION_TOTAL_CONCURRENCY", "32"))
+ADMISSION_CARD_CONCURRENCY = int(os.getenv("ADMISSION_CARD_CONCURRENCY", "16"))
+ADMISSION_CARD_QUEUE = int(os.getenv("ADMISSION_CARD_QUEUE", "64"))
+ADMISSION_KNOWLEDGE_CONCURRENCY = int(os.getenv("ADMISSION_KNOWLEDGE_CONCURRENCY", "24"))
+ADMISSION_KNOWLEDGE_QUEUE = int(os.getenv("ADMISSION_KNOWLEDGE_QUEUE", "32"))
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "5"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; ``retry_after`` is a hint in whole seconds."""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int):
+        super().__init__(f"{request_class} admission rejected: {reason}")
+        self.request_class = request_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class ClassPolicy:
+    priority: int  # lower is served first
+    max_concurrency: int
+    max_queue: int
+
+
+@dataclass
+class _ClassState:
+    policy: ClassPolicy
+    in_flight: int = 0
+    overrunning: int = 0  # in flight, but the request already gave up on them
+    waiters: deque = field(default_factory=deque)
+    admitted: int = 0
+    rejected: int = 0
+    wait_times: deque = field(default_factory=lambda: deque(maxlen=1024))
+    service_times: deque = field(default_factory=lambda: deque(maxlen=256))
+
+
+@dataclass
+class AdmissionSlot:
+    """Handle yielded by ``admit``; ``hold_until(future)`` keeps the slot taken after the
+    block exits, until work the request stopped waiting for (a timed-out thread) finishes."""
+    request_class: str
+    held_by: asyncio.Future | None = None
+
+    def hold_until(self, future: asyncio.Future):
+        self.held_by = future
+
+
+class AdmissionController:
+    """Priority admission with bounded per-class queues and load shedding.
+
+    Every request holds one of ``total_concurrency`` slots while it runs, and at
+    most ``max_concurrency`` slots per class; keeping the knowledge limit below the
+    total reserves headroom for card actions. Freed slots go to the waiting class
+    with the best priority, so cheap card actions never queue behind knowledge
+    chat. A class whose queue is full, or whose waiter exceeds ``max_wait_s``, is
+    rejected immediately with a Retry-After hint instead of piling up latency.
+
+    A request that times out while its graph still runs in a worker thread keeps its
+    slot until that thread finishes (``AdmissionSlot.hold_until``), so the limits bound
+    the work actually running, not just the requests still waiting for it.
+
+    All methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, policies: dict[str, ClassPolicy], total_concurrency: int, max_wait_s: float):
+        self.classes = {name: _ClassState(policy) for name, policy in policies.items()}
+        self.total_concurrency = total_concurrency
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+
+    def _can_run(self, state: _ClassState) -> bool:
+        return self.in_flight < self.total_concurrency and state.in_flight < state.policy.max_concurrency
+
+    def _start(self, state: _ClassState, waited: float):
+        self.in_flight += 1
+        state.in_flight += 1
+        state.admitted += 1
+        state.wait_times.append(waited)
+
+    def _dispatch(self):
+        """Hands free slots to waiters, best priority first."""
+        for state in sorted(self.classes.values(), key=lambda s: s.policy.priority):
+            while state.waiters and self._can_run(state):
+                enqueued_at, future = state.waiters.popleft()
+                if future.done():
+                    continue
+                self._start(state, time.perf_counter() - enqueued_at)
+                future.set_result(None)
+
+    def _retry_after(self, state: _ClassState) -> int:
+        service = sum(state.service_times) / len(state.service_times) if state.service_times else 1.0
+        backlog = len(state.waiters) + state.in_flight
+        return max(1, math.ceil(service * backlog / max(1, state.policy.max_concurrency)))
+
+    async def acquire(self, request_class: str):
+        state = self.classes[request_class]
+        # Slots are handed out synchronously on release, so a runnable waiter never
+        # lingers; only this class's own queue needs to be respected (FIFO)
+        if self._can_run(state) and not state.waiters:
+            self._start(state, 0.0)
+            return
+        if len(state.waiters) >= state.policy.max_queue:
+            state.rejected += 1
+            raise AdmissionRejected(request_class, "queue full", self._retry_after(state))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (time.perf_counter(), future)
+        state.waiters.append(entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick we gave up; hand the slot back
+                self.release(request_class, 0.0)
+            else:
+                future.cancel()
+                try:
+                    state.waiters.remove(entry)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            state.rejected += 1
+            raise AdmissionRejected(request_class, "queue wait exceeded", self._retry_after(state))
+
+    def release(self, request_class: str, service_time: float):
+        state = self.classes[request_class]
+        self.in_flight -= 1
+        state.in_flight -= 1
+        state.service_times.append(service_time)
+        self._dispatch()
+
+    def _release_when_done(self, request_class: str, future: asyncio.Future, start: float):
+        state = self.classes[request_class]
+        state.overrunning += 1
+
+        def done(finished: asyncio.Future):
+            state.overrunning -= 1
+            if not finished.cancelled():
+                finished.exception()  # the request already answered; don't log it as never retrieved
+            self.release(request_class, time.perf_counter() - start)
+
+        future.add_done_callback(done)
+
+    @asynccontextmanager
+    async def admit(self, request_class: str):
+        """``async with controller.admit("card") as slot: ...`` runs the block inside a slot."""
+        await self.acquire(request_class)
+        start = time.perf_counter()
+        slot = AdmissionSlot(request_class)
+        try:
+            yield slot
+        finally:
+            if slot.held_by is not None and not slot.held_by.done():
+                self._release_when_done(request_class, slot.held_by, start)
+            else:
+                self.release(request_class, time.perf_counter() - start)
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight work and wait-time statistics per class."""
+        classes = {}
+        for name, state in self.classes.items():
+            waits = sorted(state.wait_times)
+            classes[name] = {
+                "priority": state.policy.priority,
+                "in_flight": state.in_flight,
+                "overrunning": state.overrunning,
+                "queue_depth": len(state.waiters),
+                "max_concurrency": state.policy.max_concurrency,
+                "max_queue": state.policy.max_queue,
+                "admitted": state.admitted,
+                "rejected": state.rejected,
+                "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                "wait_ms_max": round(1000 * waits[-1], 2) if waits else 0.0,
+            }
+        return {"in_flight": self.in_flight, "total_concurrency": self.total_concurrency, "classes": classes}
+
+
+def default_controller() -> AdmissionController:
+    return AdmissionController(
+        {
+            "card": ClassPolicy(priority=0, max_concurrency=ADMISSION_CARD_CONCURRENCY, max_queue=ADMISSION_CARD_QUEUE),
+            "knowledge": ClassPolicy(priority=1, max_concurrency=ADMISSION_KNOWLEDGE_CONCURRENCY,
+                                     max_queue=ADMISSION_KNOWLEDGE_QUEUE),
+        },
+        total_concurrency=ADMISSION_TOTAL_CONCURRENCY,
+        max_wait_s=ADMISSION_MAX_WAIT_S,
+    )
+
+
+_CARD_ACTION_WORDS = ("activate", "deactivate", "block", "lost", "stolen", "freeze")
+
+def request_class_for_query(query: str) -> str:
+    """Cheap pre-classification of a chat turn; the LLM classifier still decides the route."""
+    lowered = query.lower()
+    return "card" if any(word in lowered for word in _CARD_ACTION_WORDS) else "knowledge"
@@ -1,7 +1,8 @@
 import os
 import sys
+import asyncio
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional
 
 # Add the parent directory to the path to enable absolute imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,11 +11,21 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 # Direct import using absolute path - this avoids relative import issues
-from core.orchestrator import app as orchestrator_app
+from core.orchestrator import app as orchestrator_app, get_conversation_app
 from core.card import card_agent_app
+from core.llm import get_metrics as get_llm_metrics
+from core.model_router import router as model_router
+from core.knowledge import start_snapshot_watcher
+from core.memory import MEMORY_ENABLED, memory_stats, session_config
+from core.deadline import DEADLINE_GRACE_MS, REQUEST_DEADLINE_MS, deadline_after, remaining_s
+from ui.admission import AdmissionRejected, AdmissionSlot, default_controller, request_class_for_query
+from ui.warmup import Warmup
+from ui.profiling import RequestProfiler
 
-from fastapi import FastAPI, HTTPException, Request, Body
+from fastapi import FastAPI, HTTPException, Request, Response, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
@@ -30,9 +41,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admission control: card actions are served before knowledge chat, full queues are shed
+admission = default_controller()
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": f"Service busy ({exc.reason}), please retry."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+profiler = RequestProfiler()
+
+# Startup warm-up: loads the index, clients and caches before the worker reports ready
+warmup = Warmup()
+
+@app.on_event("startup")
+async def watch_knowledge_snapshots():
+    # Runs in every worker: watcher threads do not survive the pre-fork in ui/serve.py
+    await run_in_threadpool(start_snapshot_watcher)
+
+@app.on_event("startup")
+async def start_warmup():
+    # In the background, so /health answers while the worker warms up
+    warmup.start()
+
+def request_deadline(http_request: Request) -> float:
+    """Absolute deadline of a request: REQUEST_DEADLINE_MS after arrival, or sooner if the
+    client asks for it with X-Request-Timeout-Ms. Time spent queued in admission counts."""
+    budget_ms = REQUEST_DEADLINE_MS
+    try:
+        budget_ms = min(budget_ms, float(http_request.headers.get("X-Request-Timeout-Ms", budget_ms)))
+    except ValueError:
+        pass
+    return deadline_after(budget_ms)
+
+async def run_graph(invoke, *args, deadline: float, slot: AdmissionSlot | None = None, **kwargs):
+    """Runs a blocking graph call in the thread pool, waiting at most until the deadline plus
+    DEADLINE_GRACE_MS. The nodes stop on their own near the deadline; this is the safety net
+    that bounds what the client waits for. A call that overruns finishes in the background
+    and keeps the request's admission ``slot`` until it does."""
+    timeout = max(0.0, remaining_s(deadline)) + DEADLINE_GRACE_MS / 1000.0
+    call = asyncio.ensure_future(run_in_threadpool(invoke, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(asyncio.shield(call), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if slot is not None:
+            slot.hold_until(call)
+        raise
+
 # Request models
 class QueryRequest(BaseModel):
     query: str
+    # Knowledge answer mode; "extractive" answers from the retrieved passages without the LLM
+    answer_mode: Optional[Literal["auto", "llm", "extractive"]] = None
+    # Conversation to continue; without one every query is answered on its own
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=128)
 
 class CardRequest(BaseModel):
     operation: str
@@ -55,18 +121,90 @@ class CardOperationResponse(BaseModel):
 async def root():
     return {"status": "online"}
 
+@app.get("/health")
+async def health():
+    """Liveness: the worker is up and serving; reports the warm-up state."""
+    report = warmup.report()
+    return {"status": "alive", "warmup": report["status"], "pid": report["pid"], "uptime_s": report["uptime_s"]}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the warm-up has finished (503 while warming or if it failed)."""
+    report = warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    return admission.metrics()
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    return {**get_llm_metrics(), "routing": model_router.metrics()}
+
+@app.get("/metrics/memory")
+async def conversation_memory_metrics():
+    if not MEMORY_ENABLED:
+        return {"enabled": False}
+    return await run_in_threadpool(memory_stats)
+
+def _require_profile_endpoints():
+    # Same opt-in as the X-Profile header (PROFILE_HEADER_ENABLED)
+    if not profiler.header_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/profiles")
+async def list_profiles(limit: int = 20):
+    """Most recent request profiles written by this service (metadata and node timings)."""
+    _require_profile_endpoints()
+    return {"directory": profiler.directory, "profiles": profiler.list_profiles(limit)}
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Collapsed stacks of one profile, ready for flamegraph.pl or speedscope."""
+    _require_profile_endpoints()
+    path = profiler.collapsed_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.collapsed")
+
 @app.post("/api/chat", response_model=QueryResponse)
-async def chat(request: QueryRequest):
+async def chat(request: QueryRequest, http_request: Request, http_response: Response):
     try:
         # Invoke the orchestrator agent
-        inputs = {"user_query": request.query}
-        result = orchestrator_app.invoke(inputs)
+        deadline = request_deadline(http_request)
+        # Per-request keys are always written: a session's checkpoint would otherwise carry
+        # the previous turn's answer_mode into this one
+        inputs = {"user_query": request.query, "deadline": deadline, "answer_mode": request.answer_mode}
+        # A session continues on the checkpointed orchestrator, which keeps bounded memory
+        # between turns (core/memory.py); one checkpoint is written when the turn ends
+        graph, session = orchestrator_app, {}
+        if request.session_id and MEMORY_ENABLED:
+            graph = get_conversation_app()
+            session = {"config": session_config(request.session_id), "durability": "exit"}
+        async with admission.admit(request_class_for_query(request.query)) as slot:
+            # Graph execution is blocking; keep it off the event loop
+            if profiler.should_profile(http_request.headers.get("X-Profile")):
+                result, profile_id = await run_graph(profiler.invoke, graph, inputs, "chat",
+                                                     deadline=deadline, slot=slot, **session)
+                http_response.headers["X-Profile-Id"] = profile_id
+            else:
+                result = await run_graph(graph.invoke, inputs, deadline=deadline, slot=slot, **session)
         response = result.get('final_response', "Sorry, I could not process your request.")
+        # Lets the UI gateway cache knowledge answers (never card actions)
+        http_response.headers["X-Intent"] = str(result.get("intent") or "unknown")
         
         return {
             "response": response,
             "success": True
         }
+    except AdmissionRejected:
+        raise
+    except asyncio.TimeoutError:
+        return {
+            "response": "Sorry, your request took too long to process. Please try again.",
+            "success": False,
+            "error": "Request deadline exceeded"
+        }
     except Exception as e:
         return {
             "response": "An error occurred while processing your request.",
@@ -76,24 +214,32 @@ async def chat(request: QueryRequest):
 
 # Single card operation endpoint that works with the card agent
 @app.post("/api/cards/operation", response_model=CardOperationResponse)
-async def card_operation(request: CardRequest):
+async def card_operation(request: CardRequest, http_request: Request, http_response: Response):
     try:
         # Extract operation and parameters
         operation = request.operation
         payload = request.payload
         
         # Prepare state for card agent
+        deadline = request_deadline(http_request)
         state = {
             "action": operation,
             "card_number": payload.get("cardLastFour") or payload.get("cardNumber", ""),
             "parameters": payload,
             "api_response": None,
             "confirmation_message": "",
-            "error": None
+            "error": None,
+            "deadline": deadline
         }
         
         # Invoke card agent
-        result = card_agent_app.invoke(state)
+        async with admission.admit("card") as slot:
+            if profiler.should_profile(http_request.headers.get("X-Profile")):
+                result, profile_id = await run_graph(profiler.invoke, card_agent_app, state, "card_operation",
+                                                     deadline=deadline, slot=slot)
+                http_response.headers["X-Profile-Id"] = profile_id
+            else:
+                result = await run_graph(card_agent_app.invoke, state, deadline=deadline, slot=slot)
         
         # Format response
         card_number = state["card_number"]
@@ -106,6 +252,14 @@ async def card_operation(request: CardRequest):
             "cardNumber": card_number,
             "data": result.get("api_response")
         }
+    except AdmissionRejected:
+        raise
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "message": "The card operation did not complete in time; please check the card status before retrying.",
+            "cardNumber": "****"
+        }
     except Exception as e:
         return {
             "success": False,
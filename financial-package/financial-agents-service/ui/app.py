@@ -1,18 +1,35 @@
 import streamlit as st
 import time
 import os
-from core.orchestrator import app as orchestrator_app
+import uuid
+from core.orchestrator import app as orchestrator_app, get_conversation_app
+from core.memory import MEMORY_ENABLED, MEMORY_MAX_TURNS, session_config
 
 # --- Streamlit Page Configuration ---
 st.set_page_config(page_title="Financial Agent Chat", layout="wide")
 st.title("Financial Services Agent Chat")
 
+GREETING = {"role": "assistant", "content": "Hello! How can I help you with your financial card services today?"}
+
 # --- Session State Initialization ---
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-    st.session_state.messages.append({"role": "assistant", "content": "Hello! How can I help you with your financial card services today?"})
+# The conversation itself lives in the orchestrator's checkpointer (core/memory.py);
+# the page keeps only the messages it shows: the last MEMORY_MAX_TURNS turns
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.messages = [GREETING]
+    st.session_state.summary = None
+
+with st.sidebar:
+    if st.button("New conversation"):
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.messages = [GREETING]
+        st.session_state.summary = None
+        st.rerun()
 
 # --- Display Chat History ---
+if st.session_state.summary:
+    with st.expander("Earlier in this conversation"):
+        st.text(st.session_state.summary)
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
@@ -31,9 +48,13 @@ if prompt := st.chat_input("Ask about financial products or card actions..."):
 
     # Simulate thinking indicator
     with st.spinner("Thinking..."):
-        # Invoke the orchestrator agent
+        # Invoke the orchestrator agent, continuing this page's conversation
         inputs = {"user_query": prompt}
-        result = orchestrator_app.invoke(inputs)
+        if MEMORY_ENABLED:
+            result = get_conversation_app().invoke(inputs, session_config(st.session_state.session_id),
+                                                   durability="exit")
+        else:
+            result = orchestrator_app.invoke(inputs)
         assistant_response = result.get('final_response', "Sorry, I could not process your request.")
 
     # Simulate streaming effect for demonstration
@@ -43,5 +64,7 @@ if prompt := st.chat_input("Ask about financial products or card actions..."):
         message_placeholder.markdown(full_response + "▌") # Display intermediate response
     message_placeholder.markdown(full_response) # Display final response
 
-    # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": full_response}) 
\ No newline at end of file
+    # Add assistant response to chat history, keeping the same window as the graph's memory
+    st.session_state.messages.append({"role": "assistant", "content": full_response})
+    st.session_state.messages = st.session_state.messages[-2 * max(1, MEMORY_MAX_TURNS):]
+    st.session_state.summary = result.get("summary")
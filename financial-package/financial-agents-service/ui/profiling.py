@@ -0,0 +1,206 @@
+"""Opt-in per-request sampling profiler for the agent graphs.
+
+A request is profiled when it carries the ``X-Profile: 1`` header (only if
+PROFILE_HEADER_ENABLED, off by default, which also exposes the ``/profiles``
+endpoints) or is picked at random with probability PROFILE_SAMPLE_RATE. For a profiled request, a sampler thread records the stack of
+the thread running the graph every PROFILE_INTERVAL_MS, and a callback handler
+times every graph node (subgraph nodes included). The result is written to
+PROFILE_DIR as:
+
+- ``<id>.collapsed``: collapsed stacks (``root;frame;frame count``), the input of
+  flamegraph.pl, speedscope or inferno. The root frame is the request's intent
+- ``<id>.json``: intent, duration, sample count and the node timings
+
+Requests that are not profiled never touch this module beyond the
+``should_profile`` check, so the cost when disabled is zero.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --- Configuration ---
+# Fraction of requests profiled without the header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Honour the X-Profile request header and serve /profiles; off by default, since any
+# client could otherwise start a sampler thread and write files to disk
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                    "profiles"))
+# Profiles kept on disk; older ones are deleted
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+PROFILE_MAX_DEPTH = 128
+
+
+# --- Node timings ---
+class NodeTimer(BaseCallbackHandler):
+    """Times every graph node run; nested subgraph nodes are reported as ``parent/child``."""
+
+    def __init__(self):
+        self._parents = {}
+        self._nodes = {}
+        self._starts = {}
+        self.timings = []
+
+    def _node_path(self, run_id) -> str | None:
+        while run_id is not None:
+            if run_id in self._nodes:
+                return self._nodes[run_id]
+            run_id = self._parents.get(run_id)
+        return None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        # Node runs are tagged with their superstep; routing functions and the graph itself are not
+        if node and kwargs.get("name") == node and any(t.startswith("graph:step:") for t in tags or ()):
+            parent = self._node_path(parent_run_id)
+            self._nodes[run_id] = f"{parent}/{node}" if parent else node
+            self._starts[run_id] = time.perf_counter()
+
+    def _finish(self, run_id, error: bool):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.timings.append({"node": self._nodes[run_id], "ms": round((time.perf_counter() - start) * 1000, 3),
+                                 "error": error})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id, error=False)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+
+# --- Stack sampling ---
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples one thread's stack from a background thread and counts collapsed stacks.
+
+    Frames from ``root`` outwards (the thread pool and server plumbing) are left out.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float, root=None):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.root = root
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame is not self.root and len(labels) < PROFILE_MAX_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# --- Profiler ---
+class RequestProfiler:
+    """Decides which requests to profile, runs them under the sampler and stores the profiles."""
+
+    def __init__(self, directory: str = PROFILE_DIR, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 header_enabled: bool = PROFILE_HEADER_ENABLED, interval_ms: float = PROFILE_INTERVAL_MS,
+                 keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.interval_s = interval_ms / 1000
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def should_profile(self, header: str | None = None) -> bool:
+        if header is not None and self.header_enabled and header.lower() not in ("", "0", "false", "no"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def invoke(self, graph, inputs: dict, endpoint: str, config: dict | None = None, **kwargs) -> tuple[dict, str]:
+        """Runs ``graph.invoke`` (in the calling thread) under the profiler; returns the result and profile id.
+        ``config`` and ``kwargs`` are passed on to ``invoke``."""
+        timer = NodeTimer()
+        started_at = time.time()
+        start = time.perf_counter()
+        with StackSampler(threading.get_ident(), self.interval_s, sys._getframe()) as sampler:
+            result = graph.invoke(inputs, {**(config or {}), "callbacks": [timer]}, **kwargs)
+        duration_ms = (time.perf_counter() - start) * 1000
+        intent = result.get("intent") or result.get("action") or "unknown"
+        profile = {
+            "id": f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(started_at))}-{uuid.uuid4().hex[:8]}",
+            "endpoint": endpoint,
+            "intent": intent,
+            "created_at": started_at,
+            "duration_ms": round(duration_ms, 3),
+            "interval_ms": self.interval_s * 1000,
+            "samples": sum(sampler.stacks.values()),
+            "pid": os.getpid(),
+            "error": result.get("error"),
+            "nodes": timer.timings,
+        }
+        try:
+            self._write(profile, sampler.stacks)
+        except OSError as e:
+            print(f"Could not write profile {profile['id']}: {e}")
+        print(f"Profiled {endpoint} request ({intent}, {duration_ms:.1f} ms, {profile['samples']} samples): "
+              f"{profile['id']}")
+        return result, profile["id"]
+
+    def _write(self, profile: dict, stacks: Counter):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile["id"])
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{profile['intent']};{stack} {count}\n")
+        with open(base + ".json", "w") as f:
+            json.dump(profile, f, indent=2)
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            profiles = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+            for name in profiles[:max(0, len(profiles) - self.keep)]:
+                for suffix in (".json", ".collapsed"):
+                    try:
+                        os.remove(os.path.join(self.directory, name[:-5] + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    # --- Listing ---
+    def list_profiles(self, limit: int = 20) -> list[dict]:
+        """Most recent profiles first (metadata only)."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted((name for name in os.listdir(self.directory) if name.endswith(".json")), reverse=True)
+        profiles = []
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.directory, name), "r") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def collapsed_path(self, profile_id: str) -> str | None:
+        path = os.path.join(self.directory, os.path.basename(profile_id) + ".collapsed")
+        return path if os.path.isfile(path) else None
@@ -0,0 +1,128 @@
+"""Production entry point for the agents API.
+
+Loads the graphs and the knowledge index once in a parent process, then forks N
+uvicorn workers that share one listening socket:
+
+    python -m ui.serve --workers 4 --port 8000
+
+The index embeddings are memory-mapped read-only, and ``gc.freeze()`` moves every
+preloaded object out of the garbage collector's reach before forking, so workers
+share those pages copy-on-write instead of each holding a private copy. Unlike
+``uvicorn --reload`` (development) or ``uvicorn --workers`` (which re-imports the
+app in every worker), RSS grows far less than linearly with the worker count.
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+
+# Add the parent directory to the path to enable absolute imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import uvicorn
+
+# --- Configuration ---
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+def preload():
+    """Imports the app and loads shared resources in the parent process.
+
+    Nothing here may open network connections or threads: they do not survive
+    ``fork``. LLM clients and HTTP pools are created lazily inside each worker.
+    """
+    start = time.perf_counter()
+    from ui.api import app
+    from core.knowledge import load_knowledge_index
+
+    index = load_knowledge_index()
+    print(f"Preloaded app and knowledge index ({len(index)} documents, "
+          f"{index.nbytes / 1024:.1f} KiB vectors) in {time.perf_counter() - start:.2f}s")
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args) -> None:
+    """Runs one uvicorn server on the inherited socket (in the forked child)."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=args.log_level, access_log=args.access_log,
+                            timeout_keep_alive=args.keep_alive)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, sock, args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the agents API with preloaded, forked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Number of worker processes")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--access-log", action="store_true", help="Enable per-request access logs")
+    parser.add_argument("--keep-alive", type=int, default=5, help="Keep-alive timeout in seconds")
+    args = parser.parse_args()
+
+    app = preload()
+    sock = bind_socket(args.host, args.port)
+    workers = {spawn(app, sock, args) for _ in range(args.workers)}
+    print(f"Serving on {args.host}:{args.port} with {len(workers)} workers (parent pid {os.getpid()})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Supervise: restart workers that die unexpectedly, exit once all have stopped
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            workers.add(spawn(app, sock, args))
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
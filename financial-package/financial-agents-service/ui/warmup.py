@@ -0,0 +1,187 @@
+"""Startup warm-up for an API worker, and the state behind /health and /ready.
+
+Everything the first request would otherwise initialise lazily is done up front,
+once per worker process (after the fork in ui/serve.py):
+
+- load the knowledge index (and start shard workers or train quantization codes)
+- load the embedding backend, the FAQ answer store and create the LLM client
+- replay the top WARMUP_QUERIES canned questions through ``retrieve_knowledge``,
+  priming the embedder's feature cache and the index pages
+- invoke each agent graph once, with the LLM answered by the local fake backend; the
+  orchestrator gets a question the FAQ store does not answer, so classification and
+  the model router run, and the card graph gets an expired deadline, so it returns
+  before calling the card service; these calls are kept out of /metrics/llm
+- open the pooled card-service connection with a GET of its health endpoint, so
+  nothing downstream changes state
+
+Steps marked optional (LLM client, card service) do not block readiness when they
+fail; the worker is reported ready but degraded.
+"""
+
+import os
+import time
+import threading
+
+from data import load_warmup_queries
+
+# --- Configuration ---
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") != "0"
+# Number of canned questions (data/warmup_queries.json) replayed to prime caches
+WARMUP_QUERIES = int(os.getenv("WARMUP_QUERIES", "20"))
+# GET the card service's health endpoint to open the connection pool
+WARMUP_CARD_API = os.getenv("WARMUP_CARD_API", "1") != "0"
+
+
+# --- Steps ---
+def _load_index():
+    from core.knowledge import load_knowledge_index
+    index = load_knowledge_index()
+    if hasattr(index, "start"):
+        index.start()
+    return f"{type(index).__name__} {getattr(index, 'version', None)} ({len(index)} documents)"
+
+def _load_embedder():
+    from vector_db.embeddings import embed_texts, get_embedder
+    embed_texts(["warm-up"])
+    return get_embedder().embedding_id
+
+def _create_llm_client():
+    from core.llm import get_backend
+    return get_backend().name
+
+def _load_faq_store():
+    from core.faq import FAQ_ENABLED, get_faq_store
+    if not FAQ_ENABLED:
+        return "disabled"
+    store = get_faq_store()
+    if store is None:
+        raise RuntimeError("no FAQ store (run scripts/build_faq_store.py)")
+    return f"{len(store)} answers ({store.stale} stale or unvetted)"
+
+def _prime_caches():
+    from core.knowledge import retrieve_knowledge
+    queries = load_warmup_queries(WARMUP_QUERIES)
+    hits = 0
+    for query in queries:
+        result = retrieve_knowledge({"query": query, "search_results": [], "response": "", "error": None})
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        hits += len(result["search_results"])
+    return f"{len(queries)} queries, {hits} results"
+
+def _invoke_knowledge_agent():
+    from core.knowledge import knowledge_agent_app
+    from core.llm import FakeLLMBackend, use_backend
+    with use_backend(FakeLLMBackend(), record_stats=False):
+        result = knowledge_agent_app.invoke({"query": load_warmup_queries(1)[0]})
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    return f"{len(result['search_results'])} results"
+
+def _invoke_orchestrator():
+    from core.faq import lookup_faq
+    from core.orchestrator import app as orchestrator_app
+    from core.llm import FakeLLMBackend, use_backend
+    # The first canned question the FAQ store does not answer, so the turn reaches the classifier
+    query = next((q for q in load_warmup_queries() if lookup_faq(q) is None), None)
+    if query is None:
+        raise RuntimeError("every warm-up query is answered by the FAQ store")
+    with use_backend(FakeLLMBackend(), record_stats=False):
+        result = orchestrator_app.invoke({"user_query": query})
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    return f"intent {result.get('intent')}"
+
+def _invoke_card_agent():
+    from core.card import card_agent_app
+    from core.deadline import deadline_after
+    # An expired deadline: the node returns before calling the card service
+    state = {"action": "activate", "card_number": "0000", "parameters": {}, "api_response": None,
+             "confirmation_message": "", "error": None, "deadline": deadline_after(0)}
+    result = card_agent_app.invoke(state)
+    if result.get("api_response") is not None:
+        raise RuntimeError("the card graph called the card service during warm-up")
+    return "graph compiled and invoked"
+
+def _open_card_connection():
+    from core.card import CARD_API_HEALTH_URL, check_card_service
+    status = check_card_service(timeout=5.0)
+    if status >= 500:
+        raise RuntimeError(f"{CARD_API_HEALTH_URL} answered {status}")
+    return f"card service health answered {status}"
+
+
+class Warmup:
+    """Runs the warm-up steps once and reports their state and timings."""
+
+    def __init__(self, enabled: bool = WARMUP_ENABLED, card_api: bool = WARMUP_CARD_API):
+        self.enabled = enabled
+        # (name, function, required)
+        self.steps = [
+            ("knowledge_index", _load_index, True),
+            ("embedder", _load_embedder, True),
+            ("llm_client", _create_llm_client, False),
+            ("faq_store", _load_faq_store, False),
+            ("prime_caches", _prime_caches, True),
+            ("graph_knowledge", _invoke_knowledge_agent, True),
+            ("graph_orchestrator", _invoke_orchestrator, True),
+            ("graph_card", _invoke_card_agent, True),
+        ]
+        if card_api:
+            self.steps.append(("card_service", _open_card_connection, False))
+        self.status = "pending" if enabled else "disabled"
+        self.results = []
+        self.started_at = None
+        self.duration_ms = None
+        self._created = time.time()
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded", "disabled")
+
+    def run(self) -> dict:
+        """Runs every step (a failing step does not stop the others) and returns the report."""
+        with self._lock:
+            if not self.enabled or self.status != "pending":
+                return self.report()
+            self.status = "warming"
+            self.started_at = time.time()
+        start = time.perf_counter()
+        failed_required = failed_optional = False
+        for name, step, required in self.steps:
+            step_start = time.perf_counter()
+            try:
+                detail = step()
+                result = {"name": name, "ok": True, "detail": detail}
+            except Exception as e:
+                failed_required |= required
+                failed_optional |= not required
+                result = {"name": name, "ok": False, "required": required, "error": str(e)}
+            result["ms"] = round((time.perf_counter() - step_start) * 1000, 1)
+            with self._lock:
+                self.results.append(result)
+        with self._lock:
+            self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.status = "failed" if failed_required else "degraded" if failed_optional else "ready"
+        print(f"Warm-up {self.status} in {self.duration_ms:.0f} ms (pid {os.getpid()}): "
+              + ", ".join(f"{r['name']} {r['ms']:.0f} ms{'' if r['ok'] else ' FAILED'}" for r in self.results))
+        return self.report()
+
+    def start(self) -> threading.Thread:
+        """Runs the warm-up on a background thread, so /health answers while it runs."""
+        thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "ready": self.ready,
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - self._created, 1),
+                "started_at": self.started_at,
+                "duration_ms": self.duration_ms,
+                "steps": list(self.results),
+            }
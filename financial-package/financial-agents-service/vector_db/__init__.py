@@ -0,0 +1 @@
+"""Vector search resources for the Financial Agents package."""
@@ -0,0 +1,263 @@
+"""Pluggable CPU-friendly embedding backends.
+
+``EMBEDDING_BACKEND`` selects the process-wide embedder used by ``embed_texts``:
+
+- ``hashed`` (default): feature-hashed words, word bigrams and character trigrams in
+  NumPy; no model download, deterministic, thousands of texts per second on one core
+- ``sentence-transformers`` / ``onnx``: a local sentence-transformers model
+  (``EMBEDDING_MODEL``, default all-MiniLM-L6-v2) on CPU, optionally via ONNX Runtime
+- ``openai``: the OpenAI embeddings API, truncated to ``EMBEDDING_DIM`` dimensions
+
+Every backend embeds in batches, returns L2-normalised float32 rows and keeps
+throughput statistics. Run ``python -m vector_db.embeddings`` to compare them.
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import threading
+from functools import lru_cache
+import numpy as np
+
+# --- Configuration ---
+# Matches the dimension in create_index_mapping (all-MiniLM-L6-v2)
+EMBEDDING_DIM = 384
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashed")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it me my of on or tell the to what with you your".split()
+)
+
+def _tokens(text: str) -> list[str]:
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Embedder:
+    """Base class: batches ``embed`` calls into ``_embed_batch`` and records throughput."""
+
+    name = "base"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.dim = dim
+        self.batch_size = batch_size
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def embedding_id(self) -> str:
+        """Identifies the vector space; indexes built with a different id are not comparable."""
+        return f"{self.name}:{self.dim}"
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embeds ``texts`` in batches; returns an (n, dim) L2-normalised float32 matrix."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start:start + self.batch_size])
+            began = time.perf_counter()
+            out[start:start + len(batch)] = self._embed_batch(batch)
+            elapsed = time.perf_counter() - began
+            with self._stats_lock:
+                self._stats["texts"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["chars"] += sum(len(t) for t in batch)
+                self._stats["seconds"] += elapsed
+        return out
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {"texts": 0, "batches": 0, "chars": 0, "seconds": 0.0}
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        seconds = stats["seconds"] or float("nan")
+        return {
+            "backend": self.embedding_id,
+            **stats,
+            "texts_per_s": round(stats["texts"] / seconds, 1) if stats["texts"] else 0.0,
+            "chars_per_s": round(stats["chars"] / seconds, 1) if stats["texts"] else 0.0,
+        }
+
+
+class HashedEmbedder(Embedder):
+    """Feature hashing of word unigrams, word bigrams and character n-grams.
+
+    Character n-grams (weighted below whole words) let plan codes, plurals and
+    misspellings match partially. Feature hashes are deterministic across processes
+    (crc32 rather than the salted built-in ``hash``) and cached per word, so
+    throughput is dominated by tokenisation. Repeated features are sqrt-damped.
+    """
+
+    name = "hashed"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 char_ngrams: tuple[int, ...] = (3,), char_weight: float = 0.3):
+        super().__init__(dim, batch_size)
+        self.char_ngrams = tuple(char_ngrams)
+        self.char_weight = char_weight
+        self._word_features = lru_cache(maxsize=200_000)(self._compute_word_features)
+
+    @property
+    def embedding_id(self) -> str:
+        grams = "".join(str(n) for n in self.char_ngrams) or "0"
+        return f"{self.name}:{self.dim}:c{grams}w{self.char_weight:g}"
+
+    def _bucket(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self.dim
+
+    def _compute_word_features(self, word: str) -> tuple[tuple[int, ...], tuple[float, ...]]:
+        columns, weights = [self._bucket(word)], [1.0]
+        padded = f"<{word}>"
+        for n in self.char_ngrams:
+            for i in range(len(padded) - n + 1):
+                columns.append(self._bucket(padded[i:i + n]))
+                weights.append(self.char_weight)
+        return tuple(columns), tuple(weights)
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        flat, weights = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dim
+            words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+            for word in words:
+                columns, word_weights = self._word_features(word)
+                flat.extend(offset + c for c in columns)
+                weights.extend(word_weights)
+            for a, b in zip(words, words[1:]):
+                flat.append(offset + self._bucket(f"{a}_{b}"))
+                weights.append(1.0)
+        vectors = np.bincount(np.asarray(flat, dtype=np.int64), weights=np.asarray(weights, dtype=np.float64),
+                              minlength=len(texts) * self.dim).reshape(len(texts), self.dim).astype(np.float32)
+        np.sqrt(vectors, out=vectors)  # dampen repeated terms
+        return _normalise(vectors)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """A local sentence-transformers model on CPU; ``onnx=True`` runs it with ONNX Runtime."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", onnx: bool = False,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("The sentence-transformers backend requires sentence-transformers "
+                              "(pip install sentence-transformers, plus onnxruntime for ONNX)") from None
+        kwargs = {"backend": "onnx"} if onnx else {}
+        self.model_name = model_name
+        self.onnx = onnx
+        self._model = SentenceTransformer(model_name, device="cpu", **kwargs)
+        super().__init__(self._model.get_sentence_embedding_dimension(), batch_size)
+
+    @property
+    def embedding_id(self) -> str:
+        return f"{self.name}:{self.model_name}:{self.dim}"
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        return self._model.encode(texts, batch_size=len(texts), normalize_embeddings=True,
+                                  convert_to_numpy=True, show_progress_bar=False)
+
+
+class OpenAIEmbedder(Embedder):
+    """The OpenAI embeddings API; text-embedding-3 models are shortened to ``dim`` server-side."""
+
+    name = "openai"
+
+    def __init__(self, model_name: str = "text-embedding-3-small", dim: int = EMBEDDING_DIM,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        super().__init__(dim, batch_size)
+        self.model_name = model_name
+        self._client = None
+
+    @property
+    def embedding_id(self) -> str:
+        return f"{self.name}:{self.model_name}:{self.dim}"
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        response = self._client.embeddings.create(model=self.model_name, input=texts, dimensions=self.dim)
+        return _normalise([item.embedding for item in sorted(response.data, key=lambda d: d.index)])
+
+
+BACKENDS = {
+    "hashed": lambda: HashedEmbedder(),
+    "sentence-transformers": lambda: SentenceTransformerEmbedder(EMBEDDING_MODEL or "all-MiniLM-L6-v2"),
+    "onnx": lambda: SentenceTransformerEmbedder(EMBEDDING_MODEL or "all-MiniLM-L6-v2", onnx=True),
+    "openai": lambda: OpenAIEmbedder(EMBEDDING_MODEL or "text-embedding-3-small"),
+}
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder() -> Embedder:
+    """Returns the process-wide embedder selected by ``EMBEDDING_BACKEND``."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                if EMBEDDING_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown EMBEDDING_BACKEND {EMBEDDING_BACKEND!r} "
+                                     f"(expected one of {', '.join(BACKENDS)})")
+                _embedder = BACKENDS[EMBEDDING_BACKEND]()
+                print(f"Embedding backend: {_embedder.embedding_id}")
+    return _embedder
+
+def set_embedder(embedder: Embedder) -> None:
+    global _embedder
+    with _embedder_lock:
+        _embedder = embedder
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Embeds texts with the configured backend. Rows are L2-normalised float32, so a
+    dot product is the cosine similarity."""
+    return get_embedder().embed(texts)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure embedding throughput per backend.")
+    parser.add_argument("--backends", default="hashed", help=f"Comma-separated subset of {','.join(BACKENDS)}")
+    parser.add_argument("--count", type=int, default=5000, help="Number of synthetic passages to embed")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from scripts.generate_synthetic_data import generate_product, product_passages
+
+    passages = []
+    index = 0
+    while len(passages) < args.count:
+        passages.extend(p["text"] for p in product_passages(generate_product(index)))
+        index += 1
+    passages = passages[:args.count]
+
+    for name in args.backends.split(","):
+        try:
+            embedder = BACKENDS[name]()
+            embedder.embed(passages[:embedder.batch_size])  # warm up (model load, caches, connection)
+            embedder.reset_stats()
+            embedder.embed(passages)
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        stats = embedder.stats()
+        print(f"{stats['backend']}: {stats['texts_per_s']:,.0f} texts/s, {stats['chars_per_s'] / 1e6:.2f} M chars/s "
+              f"over {stats['texts']:,} texts in {stats['batches']} batches")
@@ -0,0 +1,58 @@
+import numpy as np
+from vector_db.index import VectorIndex
+
+try:
+    import hnswlib
+except ImportError:  # optional: poetry install --with ann
+    hnswlib = None
+
+
+class HNSWIndex:
+    """Approximate nearest-neighbour search over a :class:`VectorIndex` with an HNSW graph.
+
+    ``m`` (graph degree) and ``ef_construction`` trade build time and memory for
+    recall; ``ef_search`` trades query latency for recall and can be changed at any
+    time. Records are still served from the wrapped index.
+    """
+
+    def __init__(self, base: VectorIndex, m: int = 16, ef_construction: int = 200, ef_search: int = 64,
+                 num_threads: int = -1):
+        if hnswlib is None:
+            raise ImportError("HNSW search requires hnswlib (pip install hnswlib)")
+        self.base = base
+        self.m = m
+        self.ef_construction = ef_construction
+        self._graph = hnswlib.Index(space="ip", dim=base.dim)
+        self._graph.init_index(max_elements=max(1, len(base)), ef_construction=ef_construction, M=m)
+        if len(base):
+            self._graph.add_items(np.asarray(base.embeddings), np.arange(len(base)), num_threads=num_threads)
+        self._graph.set_num_threads(1)  # one query per request thread
+        self.ef_search = ef_search
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def ef_search(self) -> int:
+        return self._ef_search
+
+    @ef_search.setter
+    def ef_search(self, value: int):
+        self._ef_search = value
+        self._graph.set_ef(value)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate graph size (vectors plus level-0 links) on top of the wrapped index."""
+        per_element = self.base.dim * 4 + (2 * self.m + 1) * 4 + 8
+        return self.base.nbytes + len(self) * per_element
+
+    def top_indices(self, query_vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        # hnswlib searches with max(ef_search, k) candidates
+        labels, distances = self._graph.knn_query(np.asarray(query_vector, dtype=np.float32), k=min(k, len(self)))
+        return labels[0].astype(np.int64), 1.0 - distances[0]  # "ip" distance is 1 - dot product
+
+    def search(self, query_vector: np.ndarray, k: int = 3, query_text: str | None = None) -> list[dict]:
+        if len(self) == 0:
+            return []
+        return [self.base.record(i, score) for i, score in zip(*self.top_indices(query_vector, k))]
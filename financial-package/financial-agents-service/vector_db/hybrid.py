@@ -0,0 +1,95 @@
+import math
+from collections import Counter
+import numpy as np
+from vector_db.embeddings import _TOKEN_RE, _STOPWORDS
+
+
+def _terms(text: str) -> list[str]:
+    return [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as flat NumPy postings arrays."""
+
+    def __init__(self, texts: list[str], k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.vocabulary: dict[str, int] = {}
+        postings: list[list[tuple[int, int]]] = []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            terms = _terms(text)
+            lengths[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                term_id = self.vocabulary.setdefault(term, len(postings))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc, tf))
+
+        # CSR layout: postings for term t are docs[offsets[t]:offsets[t + 1]]
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(p) for p in postings])
+        self.docs = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(self.offsets[-1]))
+        tfs = np.fromiter((tf for p in postings for _, tf in p), dtype=np.float32, count=int(self.offsets[-1]))
+        # Precompute the BM25 term-frequency component per posting
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(1.0, float(lengths.mean()) if len(texts) else 1.0))
+        self.weights = tfs * (self.k1 + 1) / (tfs + norm[self.docs])
+        df = np.diff(self.offsets).astype(np.float64)
+        self.idf = np.log(1 + (len(texts) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.num_docs = len(texts)
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.docs.nbytes + self.weights.nbytes + self.idf.nbytes
+
+    def top_indices(self, query_text: str, k: int) -> tuple[np.ndarray, np.ndarray]:
+        term_ids = [self.vocabulary[t] for t in set(_terms(query_text)) if t in self.vocabulary]
+        if not term_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        docs = np.concatenate([self.docs[self.offsets[t]:self.offsets[t + 1]] for t in term_ids])
+        weights = np.concatenate([self.weights[self.offsets[t]:self.offsets[t + 1]] * self.idf[t] for t in term_ids])
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top].astype(np.int64), scores[top]
+
+
+class HybridIndex:
+    """Fuses a dense index (exact or HNSW) with BM25 using weighted reciprocal rank fusion.
+
+    ``alpha`` is the weight of the dense ranking (1.0 is dense only, 0.0 is BM25
+    only); each side contributes its top ``candidates`` documents.
+    """
+
+    RRF_K = 60
+
+    def __init__(self, dense, bm25: BM25Index, alpha: float = 0.5, candidates: int = 50):
+        self.dense = dense
+        self.bm25 = bm25
+        self.alpha = alpha
+        self.candidates = candidates
+        self.records = getattr(dense, "base", dense)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        return self.dense.nbytes + self.bm25.nbytes
+
+    def search(self, query_vector: np.ndarray, k: int = 3, query_text: str | None = None) -> list[dict]:
+        if len(self) == 0:
+            return []
+        fused: dict[int, float] = {}
+        rankings = [(self.alpha, self.dense.top_indices(query_vector, max(k, self.candidates))[0])]
+        if query_text:
+            rankings.append((1.0 - self.alpha, self.bm25.top_indices(query_text, max(k, self.candidates))[0]))
+        for weight, ranking in rankings:
+            for rank, i in enumerate(ranking.tolist()):
+                fused[i] = fused.get(i, 0.0) + weight / (self.RRF_K + rank + 1)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+        return [self.records.record(i, score) for i, score in best]
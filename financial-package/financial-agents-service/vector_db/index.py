@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class VectorIndex:
+    """Exact cosine-similarity index over an in-memory or memory-mapped matrix.
+
+    On disk an index is a versioned snapshot (vector_db/snapshot.py): a raw float32
+    ``vectors.f32`` matrix with aligned ids, texts and metadata files. The knowledge
+    agent opens it with ``load_snapshot`` (see core/knowledge.load_knowledge_index),
+    which memory-maps the matrix read-only, so every process that opens the same
+    snapshot (forked workers, other containers on the same volume) shares one copy of
+    the pages in the OS page cache.
+    """
+
+    def __init__(self, ids: list[str], texts: list[str], metadata: list[dict], embeddings: np.ndarray,
+                 version: str | None = None, embedding: str | None = None):
+        if len(ids) != embeddings.shape[0]:
+            raise ValueError(f"Index has {len(ids)} ids but {embeddings.shape[0]} embeddings")
+        self.ids = ids
+        self.texts = texts
+        self.metadata = metadata
+        self.embeddings = embeddings
+        self.version = version  # snapshot version, if loaded from one
+        self.embedding = embedding  # embedding_id of the backend that produced the vectors
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    @classmethod
+    def build(cls, records: list[dict], embed_fn, embedding: str | None = None) -> "VectorIndex":
+        """Builds an index from ``{"id", "text", "metadata"}`` records."""
+        texts = [r["text"] for r in records]
+        embeddings = np.ascontiguousarray(embed_fn(texts), dtype=np.float32)
+        return cls([r["id"] for r in records], texts, [r.get("metadata", {}) for r in records], embeddings,
+                   embedding=embedding)
+
+    @property
+    def nbytes(self) -> int:
+        return self.embeddings.nbytes
+
+    def record(self, i: int, score: float) -> dict:
+        return {"id": self.ids[i], "text": self.texts[i], "score": float(score), "metadata": self.metadata[i]}
+
+    def top_indices(self, query_vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the row indices and scores of the ``k`` most similar rows, best first."""
+        scores = self.embeddings @ np.asarray(query_vector, dtype=np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def search(self, query_vector: np.ndarray, k: int = 3, query_text: str | None = None) -> list[dict]:
+        """Returns the ``k`` most similar records, best first (``query_text`` is unused by exact search)."""
+        if len(self) == 0:
+            return []
+        return [self.record(i, score) for i, score in zip(*self.top_indices(query_vector, k))]
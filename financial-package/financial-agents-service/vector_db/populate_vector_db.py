@@ -1,15 +1,14 @@
 import json
+import argparse
 # import boto3 # Placeholder for AWS SDK
 # from opensearchpy import OpenSearch, RequestsHttpConnection # Placeholder for OpenSearch client
 # from requests_aws4auth import AWS4Auth # Placeholder for AWS authentication
-# from sentence_transformers import SentenceTransformer # Example embedding model library
 
 # --- Configuration (Replace with your actual values) ---
 # AWS_REGION = 'us-east-1'
 # OPENSEARCH_HOST = 'your-opensearch-domain-endpoint' # e.g., search-mydomain-xyz.us-east-1.es.amazonaws.com
 # INDEX_NAME_KNOWLEDGE = 'financial_knowledge_index'
 # INDEX_NAME_CARD = 'card_info_index' # Example if card agent needs its own index
-# EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2' # Example open-source model
 
 # --- AWS Credentials (Ensure they are configured securely, e.g., via IAM role or environment variables) ---
 # credentials = boto3.Session().get_credentials()
@@ -25,8 +24,9 @@ import json
 #     pool_maxsize=20
 # )
 
-# --- Initialize Embedding Model (Placeholder) ---
-# embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+# --- Embedding Model ---
+# Provided by vector_db.embeddings: EMBEDDING_BACKEND=hashed (default, no download),
+# sentence-transformers / onnx (EMBEDDING_MODEL, default all-MiniLM-L6-v2) or openai
 
 def load_data(filepath="src/data/financial_products.json"):
     """Loads data from the specified JSON file."""
@@ -97,22 +97,68 @@ def create_index_if_not_exists(client, index_name):
     #     print(f"Index '{index_name}' already exists.")
     pass # Remove pass when implementing
 
-def generate_embeddings(text, model):
-    """Generates embeddings for the given text using the provided model (Placeholder)."""
-    # Placeholder: Implement actual embedding generation
-    print(f"Placeholder: Generating embedding for text snippet starting with: '{text[:50]}...'" )
-    # return model.encode(text).tolist()
-    return [0.1] * 384 # Return dummy vector of correct dimension
+def generate_embeddings(texts, model=None):
+    """Embeds a batch of texts with ``model`` (an Embedder) or the configured backend (EMBEDDING_BACKEND)."""
+    from vector_db.embeddings import get_embedder
+
+    model = model or get_embedder()
+    return model.embed(texts).tolist()
+
+def product_text(product):
+    """Flattens a product record into the passage text that gets embedded and retrieved."""
+    lines = [f"Name: {product.get('name', '')}", f"Description: {product.get('description', '')}"]
+    if product.get("eligibility"):
+        lines.append(f"Eligibility: {product['eligibility']}")
+    for key, value in product.items():
+        if key.startswith("contribution_limit"):
+            label = key.replace("_", " ").capitalize()
+            lines.append(f"{label}: ${value:,}")
+    if product.get("features"):
+        lines.append(f"Features: {', '.join(product['features'])}")
+    if product.get("fees"):
+        lines.append(f"Fees: {', '.join(product['fees'])}")
+    if product.get("notes"):
+        lines.append(f"Notes: {product['notes']}")
+    return "\n".join(lines)
+
+def build_product_index(products):
+    """Builds an in-memory vector index with one passage per product."""
+    from vector_db.embeddings import get_embedder
+    from vector_db.index import VectorIndex
+
+    records = [
+        {"id": p.get("id"), "text": product_text(p), "metadata": {"id": p.get("id"), "name": p.get("name")}}
+        for p in products
+    ]
+    embedder = get_embedder()
+    return VectorIndex.build(records, embedder.embed, embedding=embedder.embedding_id)
+
+def build_local_index(products, path):
+    """Publishes a new snapshot of the index that the knowledge agent memory-maps.
+
+    Running API workers pick the new version up without a restart (see vector_db/snapshot.py).
+    """
+    from vector_db.snapshot import publish_snapshot
+
+    from vector_db.embeddings import get_embedder
+
+    index = build_product_index(products)
+    stats = get_embedder().stats()
+    print(f"Embedded {stats['texts']} passages with {stats['backend']} ({stats['texts_per_s']:,.0f} texts/s)")
+    publish_snapshot(index, path)
+    return index
 
 def index_data(client, index_name, data, embedding_model):
     """Indexes the data into the specified OpenSearch index (Placeholder)."""
     # Placeholder: Implement bulk indexing logic
     print(f"Placeholder: Indexing data into '{index_name}'...")
     bulk_data = []
+    # Embed all documents in batches rather than one request per document
+    texts_to_embed = [product_text(product) for product in data]
+    embeddings = generate_embeddings(texts_to_embed, embedding_model)
     for i, product in enumerate(data):
-        # Combine relevant text fields for embedding
-        text_to_embed = f"Name: {product.get('name', '')}\nDescription: {product.get('description', '')}\nFeatures: {', '.join(product.get('features', []))}"
-        embedding = generate_embeddings(text_to_embed, embedding_model)
+        text_to_embed = texts_to_embed[i]
+        embedding = embeddings[i]
 
         # Document structure for OpenSearch
         doc = {
@@ -149,17 +195,26 @@ def index_data(client, index_name, data, embedding_model):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate the vector database.")
+    parser.add_argument("--data", default="data/financial_products.json", help="Products JSON file")
+    parser.add_argument("--local-index", metavar="DIR", help="Publish a new snapshot of the local index in DIR and exit")
+    args = parser.parse_args()
+
+    if args.local_index:
+        build_local_index(load_data(args.data), args.local_index)
+        raise SystemExit(0)
+
     print("--- Starting Vector DB Population Script (Placeholder) ---")
 
     # 1. Load data
-    financial_data = load_data()
+    financial_data = load_data(args.data)
 
     if financial_data:
         # --- Initialize Clients (Placeholders) ---
         # Replace with actual client initialization using your credentials and endpoint
         mock_client = None
-        mock_embedding_model = None
-        print("Placeholder: Initialize OpenSearch client and embedding model here.")
+        mock_embedding_model = None  # generate_embeddings falls back to EMBEDDING_BACKEND
+        print("Placeholder: Initialize OpenSearch client here.")
 
         # 2. Create necessary indices (if they don't exist)
         # Assuming knowledge agent uses this data
@@ -0,0 +1,233 @@
+"""Compressed vector storage: int8 scalar quantization and product quantization (PQ).
+
+A :class:`QuantizedIndex` keeps only the codes in memory and scores every row on
+them; the best ``rerank`` candidates are then re-scored exactly against the
+full-precision matrix of the wrapped :class:`VectorIndex`, which for a snapshot is
+memory-mapped from disk, so only the candidate rows are ever paged in.
+
+Memory per 384-dim vector: float32 1536 B, int8 384 B, PQ with 48 sub-spaces 48 B.
+"""
+
+import os
+import shutil
+import numpy as np
+from vector_db.index import VectorIndex
+
+QUANTIZATION_KINDS = ("int8", "pq")
+CODES_FILE = "codes.npy"
+QUANTIZER_FILE = "quantizer.npz"
+
+# Rows decoded per block: small enough to stay in cache, and never a full float32 copy
+_BLOCK_ROWS = 4096
+
+
+class ScalarQuantizer:
+    """Per-dimension affine int8 quantization: ``x ~ offset + scale * (code + 128)``."""
+
+    kind = "int8"
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = offset.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        low = vectors.min(axis=0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        high = vectors.max(axis=0) if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        return cls(low, scale)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = (np.asarray(vectors[start:start + _BLOCK_ROWS], dtype=np.float32) - self.offset) / self.scale
+            codes[start:start + _BLOCK_ROWS] = np.clip(np.rint(block), 0, 255) - 128
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        weights = query * self.scale
+        bias = float(query @ (self.offset + 128.0 * self.scale))
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            out[start:start + _BLOCK_ROWS] = codes[start:start + _BLOCK_ROWS].astype(np.float32) @ weights
+        return out + bias
+
+    @property
+    def nbytes(self) -> int:
+        return self.offset.nbytes + self.scale.nbytes
+
+    def state(self) -> dict:
+        return {"kind": np.array(self.kind), "offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state) -> "ScalarQuantizer":
+        return cls(state["offset"], state["scale"])
+
+
+class ProductQuantizer:
+    """Splits vectors into ``m`` sub-vectors, each encoded as one of 256 k-means centroids.
+
+    Queries are scored with asymmetric distance computation: a (m x 256) table of
+    query/centroid dot products is summed over each row's codes. Codes are stored
+    column-major so each sub-space lookup is a contiguous ``take``.
+    """
+
+    kind = "pq"
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = centroids.astype(np.float32)  # (m, 256, dim // m)
+
+    @property
+    def m(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, m: int = 48, iterations: int = 12, sample: int = 20000,
+              seed: int = 0) -> "ProductQuantizer":
+        dim = vectors.shape[1]
+        if dim % m:
+            raise ValueError(f"PQ needs m to divide the dimension ({m} does not divide {dim})")
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False))
+        training = np.asarray(vectors[rows], dtype=np.float32)
+        dsub, ksub = dim // m, min(256, len(training))
+        centroids = np.zeros((m, 256, dsub), dtype=np.float32)
+        for j in range(m):
+            sub = training[:, j * dsub:(j + 1) * dsub]
+            centers = sub[rng.choice(len(sub), size=ksub, replace=False)].copy()
+            for _ in range(iterations):
+                assign = _nearest(sub, centers)
+                counts = np.bincount(assign, minlength=ksub)
+                sums = np.stack([np.bincount(assign, weights=sub[:, d], minlength=ksub) for d in range(dsub)], axis=1)
+                empty = counts == 0
+                centers[~empty] = sums[~empty] / counts[~empty, None]
+                if empty.any():  # re-seed empty clusters from random points
+                    centers[empty] = sub[rng.choice(len(sub), size=int(empty.sum()))]
+            centroids[j, :ksub] = centers
+            centroids[j, ksub:] = centers[0]
+        return cls(centroids)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        m, _, dsub = self.centroids.shape
+        codes = np.empty((len(vectors), m), dtype=np.uint8, order="F")
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + _BLOCK_ROWS], dtype=np.float32)
+            for j in range(m):
+                codes[start:start + _BLOCK_ROWS, j] = _nearest(block[:, j * dsub:(j + 1) * dsub], self.centroids[j])
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        m, _, dsub = self.centroids.shape
+        table = np.einsum("jkd,jd->jk", self.centroids, query.reshape(m, dsub))  # (m, 256)
+        out = np.zeros(len(codes), dtype=np.float32)
+        for j in range(m):
+            out += table[j].take(codes[:, j])
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes
+
+    def state(self) -> dict:
+        return {"kind": np.array(self.kind), "centroids": self.centroids}
+
+    @classmethod
+    def from_state(cls, state) -> "ProductQuantizer":
+        return cls(state["centroids"])
+
+
+def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Index of the nearest center (squared L2) for every point."""
+    distances = (centers * centers).sum(axis=1) - 2.0 * points @ centers.T
+    return distances.argmin(axis=1)
+
+_QUANTIZERS = {cls.kind: cls for cls in (ScalarQuantizer, ProductQuantizer)}
+
+
+class QuantizedIndex:
+    """Searches compressed codes, then re-ranks the top ``rerank`` candidates exactly.
+
+    ``rerank=0`` returns the code scores as-is. Records and full-precision vectors
+    come from ``base``; keep it memory-mapped (snapshot) to get the memory saving.
+    """
+
+    def __init__(self, base: VectorIndex, quantizer, codes: np.ndarray, rerank: int = 100):
+        if len(codes) != len(base):
+            raise ValueError(f"Index has {len(base)} vectors but {len(codes)} codes")
+        self.base = base
+        self.quantizer = quantizer
+        self.codes = codes
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, base: VectorIndex, kind: str = "int8", rerank: int = 100, **train_kwargs) -> "QuantizedIndex":
+        quantizer = _QUANTIZERS[kind].train(base.embeddings, **train_kwargs)
+        return cls(base, quantizer, quantizer.encode(base.embeddings), rerank)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def version(self):
+        return self.base.version
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size: codes and quantizer parameters (full vectors stay on disk)."""
+        return self.codes.nbytes + self.quantizer.nbytes
+
+    def top_indices(self, query_vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = self.quantizer.scores(self.codes, query)
+        n = min(max(k, self.rerank), len(scores))
+        candidates = np.argpartition(-scores, n - 1)[:n]
+        if self.rerank:
+            candidates = np.sort(candidates)  # sequential reads from the mmap
+            exact = np.asarray(self.base.embeddings[candidates], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            return candidates[order], exact[order]
+        order = np.argsort(-scores[candidates])[:k]
+        return candidates[order], scores[candidates[order]]
+
+    def search(self, query_vector: np.ndarray, k: int = 3, query_text: str | None = None) -> list[dict]:
+        if len(self) == 0:
+            return []
+        return [self.base.record(i, score) for i, score in zip(*self.top_indices(query_vector, k))]
+
+    def save(self, path: str):
+        """Writes codes and quantizer parameters to ``path`` (temporary directory, then rename)."""
+        path = path.rstrip(os.sep)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        try:
+            np.save(os.path.join(tmp_path, CODES_FILE), self.codes)
+            np.savez(os.path.join(tmp_path, QUANTIZER_FILE), **self.quantizer.state())
+            os.rename(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, base: VectorIndex, path: str, rerank: int = 100) -> "QuantizedIndex":
+        with np.load(os.path.join(path, QUANTIZER_FILE)) as state:
+            quantizer = _QUANTIZERS[str(state["kind"])].from_state(state)
+        codes = np.load(os.path.join(path, CODES_FILE), mmap_mode="r")
+        return cls(base, quantizer, codes, rerank)
+
+
+def open_quantized(base: VectorIndex, snapshot_path: str | None, kind: str, rerank: int = 100,
+                   **train_kwargs) -> QuantizedIndex:
+    """Loads the ``kind`` codes stored beside a snapshot, training and storing them on first use."""
+    if kind not in _QUANTIZERS:
+        raise ValueError(f"Unknown quantization {kind!r} (expected one of {', '.join(QUANTIZATION_KINDS)})")
+    path = os.path.join(snapshot_path, f"quantized-{kind}") if snapshot_path else None
+    if path and os.path.exists(os.path.join(path, CODES_FILE)):
+        return QuantizedIndex.load(base, path, rerank)
+    index = QuantizedIndex.build(base, kind, rerank, **train_kwargs)
+    if path:
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Could not store {kind} codes in {path} ({e}); keeping them in memory.")
+    return index
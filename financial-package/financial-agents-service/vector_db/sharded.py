@@ -0,0 +1,268 @@
+"""Scatter-gather retrieval over index shards served by local worker processes.
+
+The catalog is partitioned by a hash of the document id (even shards) or by product
+line (``metadata["category"]``, so one line never spans shards; every document must
+carry one, as the generated catalogs do). Each shard is
+published as its own snapshot root, so a shard worker only maps its own rows and
+the same layout can later be served by separate nodes.
+
+A query is embedded once, sent to every shard, and the per-shard top-k lists are
+merged. Shards that do not answer within ``timeout_s`` are skipped: the caller gets
+the partial result and the timeout is counted, instead of the slowest shard
+setting the latency of every request.
+"""
+
+import os
+import time
+import heapq
+import zlib
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import connection
+from concurrent.futures import Future, wait
+import numpy as np
+from vector_db.index import VectorIndex
+from vector_db.snapshot import has_snapshot, load_snapshot, publish_snapshot, snapshot_path
+
+PARTITION_STRATEGIES = ("hash", "category")
+
+
+def partition(index: VectorIndex, shards: int, by: str = "hash") -> list[np.ndarray]:
+    """Returns the row numbers of each shard."""
+    if by not in PARTITION_STRATEGIES:
+        raise ValueError(f"Unknown partition strategy {by!r} (expected one of {', '.join(PARTITION_STRATEGIES)})")
+    if by == "category":
+        missing = sum(1 for m in index.metadata if not m.get("category"))
+        if missing:
+            raise ValueError(f"Cannot partition by category: {missing} of {len(index)} documents have no "
+                             f"metadata category (use the hash strategy)")
+        keys = [str(m["category"]) for m in index.metadata]
+    else:
+        keys = index.ids
+    assignment = np.fromiter((zlib.crc32(str(k).encode("utf-8")) % shards for k in keys), dtype=np.int64,
+                             count=len(keys))
+    return [np.flatnonzero(assignment == shard) for shard in range(shards)]
+
+def shard_roots(root: str, version: str, shards: int, by: str) -> list[str]:
+    base = os.path.join(snapshot_path(root, version), f"shards-{by}-{shards}")
+    return [os.path.join(base, f"shard-{i:03d}") for i in range(shards)]
+
+def publish_shards(index: VectorIndex, root: str, shards: int, by: str = "hash") -> list[str]:
+    """Splits a snapshot into per-shard snapshots stored beside it; reuses them if present."""
+    roots = shard_roots(root, index.version, shards, by)
+    if all(has_snapshot(r) for r in roots):
+        return roots
+    for rows, shard_root in zip(partition(index, shards, by), roots):
+        if has_snapshot(shard_root):
+            continue
+        shard = VectorIndex([index.ids[i] for i in rows], [index.texts[i] for i in rows],
+                            [index.metadata[i] for i in rows], np.asarray(index.embeddings[rows], dtype=np.float32),
+                            embedding=index.embedding)
+        publish_snapshot(shard, shard_root, version=index.version)
+    return roots
+
+
+def _shard_worker(shard_id: int, root: str, quantization: str, rerank: int, conn):
+    """Shard process: loads its snapshot and answers (request id, vector, k, query text) messages."""
+    index = load_snapshot(root)
+    if quantization != "none" and len(index):
+        from vector_db.quantization import open_quantized
+        index = open_quantized(index, snapshot_path(root, index.version), quantization, rerank=rerank)
+    conn.send(("ready", len(index), None))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        request_id, vector, k, query_text = message
+        try:
+            conn.send((request_id, index.search(vector, k, query_text=query_text), None))
+        except Exception as e:
+            conn.send((request_id, [], repr(e)))
+
+
+class ShardedIndex:
+    """Coordinator for a pool of shard worker processes (one pool per API worker process).
+
+    Workers are spawned on first use, not at construction, because a pool created
+    before ``fork`` (ui/serve.py preloads the index) would be shared by every API
+    worker. Each shard has its own pipe; a dispatcher thread routes replies back to
+    the waiting requests. A shard with ``max_in_flight`` unanswered requests is
+    skipped until it catches up, so a stalled shard never blocks the sender.
+    A shard process that exits is restarted on the next query. Once ``close`` has
+    been called, ``search`` raises instead of starting a new pool.
+    """
+
+    def __init__(self, roots: list[str], timeout_s: float = 0.2, quantization: str = "none", rerank: int = 100,
+                 version: str | None = None, embedding: str | None = None, size: int | None = None,
+                 max_in_flight: int = 16):
+        self.roots = roots
+        self.timeout_s = timeout_s
+        self.quantization = quantization
+        self.rerank = rerank
+        self.version = version
+        self.embedding = embedding
+        self.max_in_flight = max_in_flight
+        self._size = size
+        self._pid = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[int, int], Future] = {}
+        self._request_ids = itertools.count()
+        self._counters = {"queries": 0, "partial": 0, "shard_timeouts": 0, "shard_errors": 0, "restarts": 0}
+
+    @classmethod
+    def from_snapshot(cls, index: VectorIndex, root: str, shards: int, by: str = "hash", **kwargs) -> "ShardedIndex":
+        roots = publish_shards(index, root, shards, by)
+        return cls(roots, version=index.version, embedding=index.embedding, size=len(index), **kwargs)
+
+    def __len__(self) -> int:
+        return self._size if self._size is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        return 0  # vectors live in the shard processes
+
+    # --- Worker pool ---
+    def _spawn(self, shard_id: int):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_shard_worker, name=f"knowledge-shard-{shard_id}", daemon=True,
+            args=(shard_id, self.roots[shard_id], self.quantization, self.rerank, child_conn),
+        )
+        process.start()
+        child_conn.close()
+        self._processes[shard_id] = process
+        self._conns[shard_id] = conn
+        self._send_locks[shard_id] = threading.Lock()
+        self._in_flight[shard_id] = 0
+        return conn
+
+    def start(self):
+        """Starts the shard processes for this process and waits until they have loaded."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Sharded index {self.version} is closed")
+            if self._pid == os.getpid():
+                return
+            self._context = multiprocessing.get_context("spawn")
+            count = len(self.roots)
+            self._processes, self._conns = [None] * count, [None] * count
+            self._send_locks, self._in_flight = [None] * count, [0] * count
+            sizes = 0
+            for shard_id, conn in [(i, self._spawn(i)) for i in range(count)]:
+                while not conn.poll(1.0):
+                    if self._processes[shard_id].exitcode is not None:
+                        for process in self._processes:
+                            process.terminate()
+                        raise RuntimeError(f"Knowledge shard worker {shard_id} exited during startup "
+                                           f"({self._processes[shard_id].exitcode})")
+                sizes += conn.recv()[1]
+            self._size = sizes
+            self._pid = os.getpid()
+            threading.Thread(target=self._dispatch, name="knowledge-shard-dispatcher", daemon=True).start()
+            print(f"Started {count} knowledge shard workers ({sizes} documents)")
+
+    def _dispatch(self):
+        pid = self._pid
+        while self._pid == pid:
+            conns = {conn: shard_id for shard_id, conn in enumerate(self._conns) if not conn.closed}
+            for conn in connection.wait(list(conns), timeout=0.05):
+                shard_id = conns[conn]
+                try:
+                    request_id, hits, error = conn.recv()
+                except (EOFError, OSError):
+                    conn.close()  # worker exited; restarted by the next search
+                    continue
+                if request_id == "ready":
+                    continue
+                with self._lock:
+                    self._in_flight[shard_id] -= 1
+                    future = self._pending.pop((request_id, shard_id), None)
+                if future is not None and not future.done():
+                    if error:
+                        future.set_exception(RuntimeError(f"shard {shard_id}: {error}"))
+                    else:
+                        future.set_result(hits)
+
+    def _restart_dead_workers(self):
+        with self._lock:
+            for shard_id, process in enumerate(self._processes):
+                if not process.is_alive():
+                    print(f"Knowledge shard {shard_id} exited ({process.exitcode}); restarting")
+                    self._counters["restarts"] += 1
+                    self._conns[shard_id].close()
+                    self._spawn(shard_id)
+
+    # --- Search ---
+    def search(self, query_vector: np.ndarray, k: int = 3, query_text: str | None = None) -> list[dict]:
+        if self._closed:
+            raise RuntimeError(f"Sharded index {self.version} is closed")
+        if self._pid != os.getpid():
+            self.start()
+        self._restart_dead_workers()
+        request_id = next(self._request_ids)
+        message = (request_id, np.asarray(query_vector, dtype=np.float32), k, query_text)
+        futures, skipped = {}, 0
+        for shard_id in range(len(self.roots)):
+            with self._lock:
+                if self._in_flight[shard_id] >= self.max_in_flight:
+                    skipped += 1
+                    continue
+                self._in_flight[shard_id] += 1
+                futures[shard_id] = self._pending[(request_id, shard_id)] = Future()
+                conn, send_lock = self._conns[shard_id], self._send_locks[shard_id]
+            try:
+                with send_lock:
+                    conn.send(message)
+            except (OSError, ValueError) as e:
+                futures[shard_id].set_exception(RuntimeError(f"shard {shard_id}: {e}"))
+
+        done, not_done = wait(futures.values(), timeout=self.timeout_s)
+        hits, timeouts, errors = [], skipped, 0
+        for shard_id, future in futures.items():
+            if future in not_done:
+                timeouts += 1
+            elif future.exception() is not None:
+                errors += 1
+                print(f"Knowledge shard error: {future.exception()}")
+            else:
+                hits.extend(future.result())
+        with self._lock:
+            for shard_id, future in futures.items():
+                if future in not_done:
+                    self._pending.pop((request_id, shard_id), None)
+            self._counters["queries"] += 1
+            self._counters["shard_timeouts"] += timeouts
+            self._counters["shard_errors"] += errors
+            if timeouts or errors:
+                self._counters["partial"] += 1
+        if timeouts:
+            print(f"Knowledge search returned partial results: {timeouts}/{len(self.roots)} shards timed out")
+        return heapq.nlargest(k, hits, key=lambda hit: hit["score"])
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"shards": len(self.roots), "timeout_ms": self.timeout_s * 1000, **self._counters}
+
+    def close(self):
+        """Stops the shard processes started by this process; later searches raise."""
+        self._closed = True
+        if self._pid != os.getpid():
+            return
+        self._pid = None
+        for conn, send_lock in zip(self._conns, self._send_locks):
+            try:
+                with send_lock:
+                    conn.send(None)
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + 5
+        for process, conn in zip(self._processes, self._conns):
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+            conn.close()
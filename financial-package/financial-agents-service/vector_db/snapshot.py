@@ -0,0 +1,255 @@
+"""Versioned on-disk snapshots of a VectorIndex with atomic publishing and hot swap.
+
+Layout under a snapshot root::
+
+    CURRENT                      name of the live version (replaced atomically)
+    snapshots/<version>/
+        manifest.json            format, count, dim, dtype, embedding id, file sizes and checksums
+        vectors.f32              raw row-major float32 matrix, count x dim
+        ids.txt                  one id per line, aligned with the matrix rows
+        texts.jsonl              one JSON string per line, aligned
+        metadata.jsonl           one JSON object per line, aligned
+
+A snapshot directory is fully written and fsynced under a temporary name, renamed
+into ``snapshots/``, and only then made live by replacing ``CURRENT``. Readers
+therefore see either the old or the new version, never a partial one. Superseded
+versions are pruned; processes that still map them keep their (unlinked) pages.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+from vector_db.index import VectorIndex
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+SNAPSHOTS_DIR = "snapshots"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.txt"
+TEXTS_FILE = "texts.jsonl"
+METADATA_FILE = "metadata.jsonl"
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is missing, incomplete or inconsistent with its manifest."""
+
+
+def _fsync_file(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_lines(path: str, lines):
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+
+
+def current_version(root: str) -> str | None:
+    """Returns the live version name, or None if nothing has been published."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def has_snapshot(root: str) -> bool:
+    return current_version(root) is not None
+
+def snapshot_path(root: str, version: str) -> str:
+    return os.path.join(root, SNAPSHOTS_DIR, version)
+
+def list_versions(root: str) -> list[str]:
+    path = os.path.join(root, SNAPSHOTS_DIR)
+    if not os.path.isdir(path):
+        return []
+    return sorted(v for v in os.listdir(path) if not v.startswith("."))
+
+
+def publish_snapshot(index: VectorIndex, root: str, version: str | None = None, keep: int = 3) -> str:
+    """Writes ``index`` as a new snapshot under ``root`` and makes it the live version.
+
+    Returns the version name. At most ``keep`` versions (including the new one) are kept.
+    """
+    version = version or time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.getpid()}-{time.time_ns() % 10**6:06d}"
+    snapshots = os.path.join(root, SNAPSHOTS_DIR)
+    os.makedirs(snapshots, exist_ok=True)
+    tmp_dir = os.path.join(snapshots, f".tmp-{version}")
+    final_dir = os.path.join(snapshots, version)
+    if os.path.exists(final_dir):
+        raise SnapshotError(f"Snapshot version {version} already exists in {root}")
+
+    os.makedirs(tmp_dir)
+    try:
+        vectors = np.ascontiguousarray(index.embeddings, dtype=np.float32)
+        vectors.tofile(os.path.join(tmp_dir, VECTORS_FILE))
+        _write_lines(os.path.join(tmp_dir, IDS_FILE), (str(i) for i in index.ids))
+        _write_lines(os.path.join(tmp_dir, TEXTS_FILE), (json.dumps(t) for t in index.texts))
+        _write_lines(os.path.join(tmp_dir, METADATA_FILE), (json.dumps(m, separators=(",", ":")) for m in index.metadata))
+
+        files = {}
+        for name in (VECTORS_FILE, IDS_FILE, TEXTS_FILE, METADATA_FILE):
+            path = os.path.join(tmp_dir, name)
+            _fsync_file(path)
+            files[name] = {"bytes": os.path.getsize(path), "sha256": _sha256(path)}
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version,
+            "count": len(index),
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "dtype": "float32",
+            "embedding": index.embedding,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "files": files,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Flip the pointer: write CURRENT beside the old one, then replace it atomically
+    tmp_current = os.path.join(root, f".{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(tmp_current, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_current, os.path.join(root, CURRENT_FILE))
+    print(f"Published snapshot {version} ({len(index)} vectors) to {root}")
+
+    for old in list_versions(root)[:-keep] if keep else []:
+        if old != version:
+            shutil.rmtree(os.path.join(snapshots, old), ignore_errors=True)
+    return version
+
+
+def load_snapshot(root: str, version: str | None = None, mmap: bool = True, verify: bool = False) -> VectorIndex:
+    """Loads a snapshot (the live one by default), memory-mapping the vectors read-only.
+
+    File sizes and row counts are always checked against the manifest; ``verify``
+    also checks the SHA-256 of every file (reads the whole snapshot).
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise SnapshotError(f"No snapshot has been published in {root}")
+    path = snapshot_path(root, version)
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"Snapshot {version} in {root} has no manifest") from None
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')} in {path}")
+
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != expected["bytes"]:
+            raise SnapshotError(f"Snapshot file {file_path} is missing or truncated")
+        if verify and _sha256(file_path) != expected["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for {file_path}")
+
+    count, dim = manifest["count"], manifest["dim"]
+    vectors_path = os.path.join(path, VECTORS_FILE)
+    if count == 0:
+        embeddings = np.zeros((0, dim), dtype=np.float32)
+    elif mmap:
+        embeddings = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+    else:
+        embeddings = np.fromfile(vectors_path, dtype=np.float32).reshape(count, dim)
+
+    with open(os.path.join(path, IDS_FILE), "r") as f:
+        ids = f.read().splitlines()
+    with open(os.path.join(path, TEXTS_FILE), "r") as f:
+        texts = [json.loads(line) for line in f]
+    with open(os.path.join(path, METADATA_FILE), "r") as f:
+        metadata = [json.loads(line) for line in f]
+    if not len(ids) == len(texts) == len(metadata) == count:
+        raise SnapshotError(f"Snapshot {version} is misaligned: {len(ids)} ids, {len(texts)} texts, "
+                            f"{len(metadata)} metadata rows for {count} vectors")
+
+    return VectorIndex(ids, texts, metadata, embeddings, version=version, embedding=manifest.get("embedding"))
+
+
+class SnapshotWatcher:
+    """Polls ``CURRENT`` and hands each newly published snapshot, fully loaded, to ``on_swap``.
+
+    The new index is loaded and validated on the watcher thread before ``on_swap``
+    replaces the live reference, so requests only ever see a complete index. A
+    snapshot that fails to load is logged and not retried; one whose ``on_swap``
+    raises is logged and retried at the next poll. Either way the current index
+    keeps serving.
+    Threads do not survive ``fork``, so start one per worker process.
+    """
+
+    def __init__(self, root: str, on_swap, interval: float = 5.0, version: str | None = None):
+        self.root = root
+        self.on_swap = on_swap
+        self.interval = interval
+        self.version = version
+        self.swaps = 0
+        self.failures = 0
+        self._rejected = None  # last version that failed to load; not retried
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """Loads and swaps in a new live version if one was published; returns True on swap."""
+        version = current_version(self.root)
+        if version is None or version in (self.version, self._rejected):
+            return False
+        try:
+            start = time.perf_counter()
+            index = load_snapshot(self.root, version)
+            self.on_swap(index)
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            self._rejected = version
+            print(f"Could not load snapshot {version} from {self.root} ({e}); keeping {self.version}")
+            return False
+        except Exception as e:
+            # Preparing the index failed (e.g. shard workers could not be spawned); retried next poll
+            self.failures += 1
+            print(f"Could not swap in snapshot {version} from {self.root} ({type(e).__name__}: {e}); "
+                  f"keeping {self.version}")
+            return False
+        print(f"Swapped knowledge index {self.version} -> {version} ({len(index)} documents, "
+              f"loaded in {(time.perf_counter() - start) * 1000:.1f} ms)")
+        self.version = version
+        self.swaps += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Never let the watcher die: hot swaps would stop for the life of the process
+                self.failures += 1
+                print(f"Snapshot watcher check failed ({type(e).__name__}: {e}); keeping {self.version}")
+
+    def start(self) -> "SnapshotWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
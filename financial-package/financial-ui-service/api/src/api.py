@@ -1,23 +1,104 @@
+"""Thin async gateway from the UI tier to the agents API.
+
+The UI service no longer runs the agents in-process: every ``/api/*`` request is
+forwarded to AGENTS_API_URL over one pooled keep-alive ``httpx.AsyncClient`` per
+worker, and the upstream body is streamed back as it arrives instead of being
+buffered. Successful knowledge answers (the agents API marks them with
+``X-Intent: knowledge``) are kept in a short-TTL cache keyed by the normalized
+query, so identical questions within GATEWAY_CACHE_TTL_S are answered without a
+round trip. Card actions, turns of a conversation (``session_id``) and requests
+that ask for profiling or a shorter deadline (``X-Profile``, ``X-Request-Timeout-Ms``)
+are never cached or answered from the cache.
+"""
+
 import os
-from fastapi import FastAPI, HTTPException
+import re
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 
-# Import the orchestrator agent from the financial_agents package
-try:
-    from financial_agents.orchestrator_agent import app as orchestrator_app
-    orchestrator_available = True
-except ImportError as e:
-    print(f"Failed to import orchestrator agent: {e}")
-    print("Make sure the financial-agents package is installed")
-    orchestrator_available = False
-except Exception as e:
-    print(f"An unexpected error occurred during agent import: {e}")
-    orchestrator_available = False
+# --- Configuration ---
+AGENTS_API_URL = os.getenv("AGENTS_API_URL", "http://agents-api:8000").rstrip("/")
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+GATEWAY_MAX_KEEPALIVE = int(os.getenv("GATEWAY_MAX_KEEPALIVE", "20"))
+GATEWAY_CONNECT_TIMEOUT_S = float(os.getenv("GATEWAY_CONNECT_TIMEOUT_S", "5"))
+# Upper bound for one upstream request; the agents API enforces its own request deadline
+GATEWAY_TIMEOUT_S = float(os.getenv("GATEWAY_TIMEOUT_S", "30"))
+# Knowledge answers cached per normalized query (0 disables the cache)
+GATEWAY_CACHE_TTL_S = float(os.getenv("GATEWAY_CACHE_TTL_S", "30"))
+GATEWAY_CACHE_MAX_ENTRIES = int(os.getenv("GATEWAY_CACHE_MAX_ENTRIES", "1024"))
+# Largest response body that is buffered for the cache while it streams through
+GATEWAY_CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", "65536"))
+
+# Request headers that change what the agents API does with a query; such requests bypass the cache
+CACHE_BYPASS_HEADERS = ("x-profile", "x-request-timeout-ms")
+
+# Hop-by-hop headers are not forwarded (RFC 7230 section 6.1), nor are the ones httpx sets itself
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+              "transfer-encoding", "upgrade", "host", "content-length"}
+
+
+# --- Response cache ---
+class TTLCache:
+    """LRU cache whose entries expire ``ttl_s`` after they were stored."""
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        if self.ttl_s <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "ttl_s": self.ttl_s, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+def cache_key(body: bytes, headers=None) -> Optional[tuple]:
+    """Normalized query (and answer mode) of a chat request; None when it cannot be cached."""
+    if headers is not None and any(name in headers for name in CACHE_BYPASS_HEADERS):
+        return None  # the caller asked for a profile or a deadline, which a cached answer ignores
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("query"), str):
+        return None
+    if payload.get("session_id"):
+        return None  # the answer depends on the conversation so far
+    query = " ".join(re.findall(r"[a-z0-9]+", payload["query"].lower()))
+    return (query, payload.get("answer_mode"))
+
 
 # Create FastAPI app
-app = FastAPI(title="Financial Agent API")
+app = FastAPI(title="Financial Agent API Gateway")
 
 # Add CORS middleware to allow requests from the React frontend
 app.add_middleware(
@@ -28,43 +109,125 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request model
-class QueryRequest(BaseModel):
-    query: str
+client: Optional[httpx.AsyncClient] = None
+cache = TTLCache(GATEWAY_CACHE_TTL_S, GATEWAY_CACHE_MAX_ENTRIES)
 
-# Response model
-class QueryResponse(BaseModel):
-    response: str
-    success: bool
-    error: str = None
+@app.on_event("startup")
+async def open_client():
+    # One pooled client per worker process, created inside its event loop
+    global client
+    client = httpx.AsyncClient(
+        base_url=AGENTS_API_URL,
+        limits=httpx.Limits(max_connections=GATEWAY_MAX_CONNECTIONS, max_keepalive_connections=GATEWAY_MAX_KEEPALIVE),
+        timeout=httpx.Timeout(GATEWAY_TIMEOUT_S, connect=GATEWAY_CONNECT_TIMEOUT_S),
+    )
 
+@app.on_event("shutdown")
+async def close_client():
+    if client is not None:
+        await client.aclose()
+
+
+# --- Forwarding ---
+def _forward_headers(headers) -> dict:
+    return {name: value for name, value in headers.items() if name.lower() not in HOP_BY_HOP}
+
+def _unavailable(path: str, error: Exception) -> JSONResponse:
+    print(f"Agents API request {path} failed: {error!r}")
+    status = 504 if isinstance(error, httpx.TimeoutException) else 503
+    if path == "chat":
+        content = {"response": "The assistant is currently unavailable. Please try again shortly.",
+                   "success": False, "error": f"Agents API unavailable ({type(error).__name__})"}
+    else:
+        content = {"success": False, "error": f"Agents API unavailable ({type(error).__name__})"}
+    return JSONResponse(status_code=status, content=content)
+
+async def forward(request: Request, upstream_path: str, body: bytes, key: Optional[tuple] = None) -> Response:
+    """Streams the upstream response back; buffers a cacheable knowledge answer on the way."""
+    upstream = client.build_request(request.method, upstream_path, params=request.query_params,
+                                    headers=_forward_headers(request.headers), content=body)
+    try:
+        response = await client.send(upstream, stream=True)
+    except httpx.HTTPError as e:
+        return _unavailable(upstream_path.rsplit("/", 1)[-1], e)
+
+    headers = _forward_headers(response.headers)
+    cacheable = (key is not None and response.status_code == 200
+                 and response.headers.get("x-intent") == "knowledge")
+    if cacheable:
+        headers["X-Cache"] = "MISS"
+
+    async def body_chunks():
+        buffered, size = [], 0
+        try:
+            async for chunk in response.aiter_raw():
+                if cacheable and size <= GATEWAY_CACHE_MAX_BYTES:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                yield chunk
+        finally:
+            await response.aclose()
+        if cacheable and size <= GATEWAY_CACHE_MAX_BYTES and response.headers.get("content-encoding") is None:
+            content = b"".join(buffered)
+            try:
+                succeeded = json.loads(content).get("success")
+            except ValueError:
+                succeeded = False
+            if succeeded:
+                cache.put(key, (content, response.headers.get("content-type", "application/json")))
+
+    return StreamingResponse(body_chunks(), status_code=response.status_code, headers=headers)
+
+
+# API endpoints
 @app.get("/")
 async def root():
-    return {"status": "online", "orchestrator_available": orchestrator_available}
+    return {"status": "online", "agents_api": AGENTS_API_URL}
 
-@app.post("/api/chat", response_model=QueryResponse)
-async def chat(request: QueryRequest):
-    if not orchestrator_available:
-        raise HTTPException(status_code=503, detail="Orchestrator agent is not available")
-    
+@app.get("/health")
+async def health():
+    """Liveness of the gateway itself."""
+    return {"status": "alive", "pid": os.getpid()}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: the agents API answers its own /ready."""
+    try:
+        response = await client.get("/ready", timeout=GATEWAY_CONNECT_TIMEOUT_S)
+    except httpx.HTTPError as e:
+        return _unavailable("ready", e)
     try:
-        # Invoke the orchestrator agent
-        inputs = {"user_query": request.query}
-        result = orchestrator_app.invoke(inputs)
-        response = result.get('final_response', "Sorry, I could not process your request.")
-        
-        return {
-            "response": response,
-            "success": True
-        }
-    except Exception as e:
-        return {
-            "response": "An error occurred while processing your request.",
-            "success": False,
-            "error": str(e)
-        }
+        content = response.json()
+    except ValueError:
+        # e.g. an HTML 502/503 page from a proxy in front of the agents API
+        content = {"status": "unavailable", "upstream_status": response.status_code, "detail": response.text[:500]}
+    return JSONResponse(status_code=response.status_code, content=content)
+
+@app.get("/metrics/gateway")
+async def gateway_metrics():
+    return {
+        "agents_api": AGENTS_API_URL,
+        "max_connections": GATEWAY_MAX_CONNECTIONS,
+        "max_keepalive": GATEWAY_MAX_KEEPALIVE,
+        "cache": cache.metrics(),
+    }
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.body()
+    key = cache_key(body, request.headers)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            content, media_type = cached
+            return Response(content=content, media_type=media_type, headers={"X-Cache": "HIT"})
+    return await forward(request, "/api/chat", body, key)
+
+@app.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def proxy(path: str, request: Request):
+    return await forward(request, f"/api/{path}", await request.body())
 
 # Run the API server if this file is executed directly
 if __name__ == "__main__":
     # Run the API server on port 8000
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
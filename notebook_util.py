@@ -7,15 +7,22 @@ and fixing any compatibility issues.
 
 Usage:
     python notebook_util.py [--input merged_agents.py] [--output notebooks/merged_financial_agents.ipynb]
+    python notebook_util.py --input-dir core --output-dir notebooks [--jobs 4] [--force]
+    python notebook_util.py --benchmark-splitter [--input merged_agents.py]
 """
 
 import os
 import re
 import sys
 import json
+import io
+import time
+import hashlib
+import tokenize
 import logging
 import argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import nbformat as nbf
 
 # Set up logging
@@ -50,7 +57,11 @@ def extract_docstring(content):
     return None, content
 
 def find_section_headers(content):
-    """Find section headers in the Python file."""
+    """Find section headers in the Python file (legacy multi-pass regex version).
+
+    Kept for benchmarking against split_sections; the header regexes backtrack
+    quadratically on long comment lines full of whitespace.
+    """
     # Match section headers like "# --- Section Name ---" or "#################################################"
     section_patterns = [
         r'#\s*---\s*(.*?)\s*---\s*#*', 
@@ -79,6 +90,83 @@ def find_section_headers(content):
     sections.sort(key=lambda x: x[0])
     return sections
 
+def _header_title(comment):
+    """Returns (title, kind) if a column-0 comment is a section header, else (None, None)."""
+    body = comment.lstrip('#').strip()
+    if body.startswith('---'):
+        title = body.strip('-#').strip()
+        return (title, "header") if title else (None, None)
+    if body.endswith('#') and comment.startswith('#'):
+        title = body.rstrip('#').strip()
+        return (title, "banner") if title and not title.startswith('---') else (None, None)
+    return None, None
+
+def _split_sections_by_lines(content):
+    """Line-based fallback for sources the tokenizer rejects (still a single pass)."""
+    sections = []
+    offset = 0
+    seen_import = False
+    for line in content.splitlines(keepends=True):
+        if line.startswith('#'):
+            title, kind = _header_title(line.rstrip('\r\n'))
+            if title:
+                sections.append((offset, title, kind))
+        elif not seen_import and (line.startswith('import ') or line.startswith('from ')):
+            sections.append((offset, "Imports and Configuration", "imports"))
+            seen_import = True
+        elif line.startswith('if __name__') and '__main__' in line:
+            sections.append((offset, "Example Usage", "main"))
+        offset += len(line)
+    return sections
+
+def split_sections(content):
+    """
+    Split Python source into sections in a single tokenizer pass.
+
+    Only top-level (column 0) constructs start a section: header comments
+    ("# --- Title ---" or "### Title ###"), the first import statement and the
+    ``if __name__ == "__main__":`` block. Because comments come from the
+    tokenizer, header-like text inside strings is never mistaken for a header.
+
+    Returns:
+        List of (offset, title, kind) tuples sorted by offset, where kind is one of
+        "header", "banner", "imports" or "main"
+    """
+    line_starts = [0]
+    for line in content.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+
+    sections = []
+    seen_import = False
+    expect_main = None  # tokens still to match for `if __name__ == "__main__":`
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(content).readline):
+            row, col = tok.start
+            if tok.type == tokenize.COMMENT and col == 0:
+                title, kind = _header_title(tok.string)
+                if title:
+                    sections.append((line_starts[row - 1], title, kind))
+            elif tok.type == tokenize.NAME and col == 0:
+                if tok.string in ('import', 'from') and not seen_import:
+                    sections.append((line_starts[row - 1], "Imports and Configuration", "imports"))
+                    seen_import = True
+                elif tok.string == 'if':
+                    expect_main = (row, ['__name__', '==', '__main__'])
+            elif expect_main and tok.start[0] == expect_main[0] and tok.type in (tokenize.NAME, tokenize.OP, tokenize.STRING):
+                want = expect_main[1]
+                value = tok.string.strip('\'"') if tok.type == tokenize.STRING else tok.string
+                if value == want[0]:
+                    want.pop(0)
+                    if not want:
+                        sections.append((line_starts[row - 1], "Example Usage", "main"))
+                        expect_main = None
+                else:
+                    expect_main = None
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        logger.warning("Tokenizer could not parse the source; falling back to line-based splitting")
+        return _split_sections_by_lines(content)
+    return sections
+
 def create_notebook(py_file_path, output_notebook_path=None):
     """
     Convert Python file to Jupyter notebook
@@ -115,42 +203,29 @@ def create_notebook(py_file_path, output_notebook_path=None):
         cells.append(title_cell)
     
     # Find section headers
-    sections = find_section_headers(content)
+    sections = split_sections(content)
     
     # Add cells for each section
     if sections:
-        start_pos = 0
-        
-        for i, (pos, title) in enumerate(sections):
-            # Add the code before this section (if any)
-            if pos > start_pos:
-                code_chunk = content[start_pos:pos].strip()
-                if code_chunk:
-                    cells.append(nbf.v4.new_code_cell(code_chunk))
-            
+        # Code before the first section
+        preamble = content[:sections[0][0]].strip()
+        if preamble:
+            cells.append(nbf.v4.new_code_cell(preamble))
+
+        for i, (pos, title, kind) in enumerate(sections):
             # Add a markdown cell for the section header
             cells.append(nbf.v4.new_markdown_cell(f"## {title}"))
-            
-            # Update start position for next chunk
-            start_pos = pos
-            
-            # Find where this section ends
-            if i < len(sections) - 1:
-                next_pos = sections[i+1][0]
-                
-                # Find the first line break after the header
-                header_end = content.find('\n', pos) + 1
-                if header_end > 0:
-                    code_chunk = content[header_end:next_pos].strip()
-                    if code_chunk:
-                        cells.append(nbf.v4.new_code_cell(code_chunk))
-            else:
-                # This is the last section
-                header_end = content.find('\n', pos) + 1
-                if header_end > 0:
-                    code_chunk = content[header_end:].strip()
-                    if code_chunk:
-                        cells.append(nbf.v4.new_code_cell(code_chunk))
+
+            # Header comments are replaced by the markdown cell; imports and the
+            # main block keep their first line
+            body_start = pos
+            if kind in ("header", "banner"):
+                line_end = content.find('\n', pos)
+                body_start = len(content) if line_end == -1 else line_end + 1
+            body_end = sections[i + 1][0] if i < len(sections) - 1 else len(content)
+            code_chunk = content[body_start:body_end].strip()
+            if code_chunk:
+                cells.append(nbf.v4.new_code_cell(code_chunk))
     else:
         # No sections found, just add the whole content as a code cell
         cells.append(nbf.v4.new_code_cell(content))
@@ -166,7 +241,7 @@ def create_notebook(py_file_path, output_notebook_path=None):
         output_notebook_path = os.path.join(output_dir, f"{base_name}.ipynb")
     
     # Make sure the output directory exists
-    os.makedirs(os.path.dirname(output_notebook_path), exist_ok=True)
+    os.makedirs(os.path.dirname(output_notebook_path) or '.', exist_ok=True)
     
     with open(output_notebook_path, 'w') as f:
         nbf.write(notebook, f)
@@ -255,14 +330,178 @@ def fix_notebook(notebook_path):
     logger.info(f"Fixed imports, configuration, and set kernel in {notebook_path}")
     return notebook_path
 
+MANIFEST_NAME = ".notebook_manifest.json"
+
+def file_sha256(path):
+    """Hash of a file's contents, used to detect real changes behind an mtime bump."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest_path, manifest):
+    """Writes the manifest atomically so an interrupted run never leaves it half written."""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def _convert_and_fix(py_file_path, output_notebook_path):
+    """Worker entry point: converts and fixes one file, returning its elapsed time."""
+    start = time.perf_counter()
+    create_notebook(py_file_path, output_notebook_path)
+    fix_notebook(output_notebook_path)
+    return time.perf_counter() - start
+
+def convert_directory(input_dir, output_dir, jobs=None, force=False, manifest_path=None):
+    """
+    Convert every Python file under input_dir to a notebook under output_dir.
+
+    Files whose mtime and size are unchanged since the last run are skipped without
+    being read. Files whose mtime changed but whose content hash did not are also
+    skipped. The rest are converted in parallel on a process pool.
+
+    Args:
+        input_dir: Directory tree containing the Python sources
+        output_dir: Directory tree that mirrors input_dir with .ipynb files
+        jobs: Number of worker processes (defaults to the CPU count)
+        force: Convert every file regardless of the manifest
+        manifest_path: Where the manifest is stored (defaults to output_dir/.notebook_manifest.json)
+
+    Returns:
+        Dict mapping each source path to {"status": ..., "seconds": ...}
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = manifest_path or str(output_dir / MANIFEST_NAME)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    results = {}
+    pending = {}
+    sources = sorted(p for p in input_dir.rglob('*.py') if p.name != '__init__.py' and '__pycache__' not in p.parts)
+    for source in sources:
+        rel = str(source.relative_to(input_dir))
+        output = output_dir / Path(rel).with_suffix('.ipynb')
+        stat = source.stat()
+        entry = manifest.get(rel)
+        if entry and output.exists():
+            if entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+                results[rel] = {"status": "skipped", "seconds": 0.0}
+                continue
+            sha = file_sha256(source)
+            if entry.get('sha256') == sha:
+                entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+                results[rel] = {"status": "skipped", "seconds": 0.0}
+                continue
+        else:
+            sha = file_sha256(source)
+        pending[rel] = (source, output, {"sha256": sha, "mtime": stat.st_mtime, "size": stat.st_size,
+                                         "output": str(output.relative_to(output_dir))})
+
+    start = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_convert_and_fix, str(src), str(out)): rel for rel, (src, out, _) in pending.items()}
+            for future in as_completed(futures):
+                rel = futures[future]
+                try:
+                    seconds = future.result()
+                    manifest[rel] = pending[rel][2]
+                    results[rel] = {"status": "converted", "seconds": round(seconds, 4)}
+                except Exception as e:
+                    logger.error(f"Failed to convert {rel}: {e}")
+                    manifest.pop(rel, None)
+                    results[rel] = {"status": "failed", "seconds": 0.0, "error": str(e)}
+
+    # Forget sources that no longer exist
+    for rel in list(manifest):
+        if not (input_dir / rel).exists():
+            del manifest[rel]
+    save_manifest(manifest_path, manifest)
+
+    for rel, result in sorted(results.items()):
+        logger.info(f"{result['status']:>9} {result['seconds']:8.3f}s  {rel}")
+    counts = {status: sum(1 for r in results.values() if r['status'] == status)
+              for status in ("converted", "skipped", "failed")}
+    logger.info(f"Converted {counts['converted']}, skipped {counts['skipped']}, failed {counts['failed']} "
+                f"in {time.perf_counter() - start:.2f}s wall time")
+    return results
+
+def _synthetic_source(sections, comment_width):
+    """Builds a large merged_agents.py-style file with wide, space-padded comments."""
+    parts = ['"""Synthetic merged agents module."""\n', "import os\nimport json\n\n"]
+    for i in range(sections):
+        parts.append(f"# --- Section {i} ---\n")
+        parts.append(f"def function_{i}(state):\n    # {'=' * 20} step {i} #\n"
+                     f"    text = \"# --- not a header --- #\"\n    return {{**state, 'step': {i}}}\n\n")
+        # Space-padded (aligned) comments make `#\s*(.*?)\s*#+` backtrack polynomially
+        parts.append("STEP_" + str(i) + " = " + str(i) + "  #" + " " * comment_width + "aligned note\n"
+                     f"LIMIT_{i} = STEP_{i} * 2\n\n")
+    parts.append('if __name__ == "__main__":\n    print(function_0({}))\n')
+    return "".join(parts)
+
+def benchmark_splitter(input_path=None, sections=200, comment_width=120, repeat=3):
+    """Times the legacy regex splitter against split_sections on the same source."""
+    if input_path and os.path.exists(input_path):
+        with open(input_path, 'r') as f:
+            content = f.read()
+        source = input_path
+    else:
+        content = _synthetic_source(sections, comment_width)
+        source = f"synthetic ({sections} sections, {comment_width}-char comments)"
+    _, content = extract_docstring(content)
+
+    results = {}
+    for name, fn in (("find_section_headers", find_section_headers), ("split_sections", split_sections)):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = fn(content)
+            best = min(best, time.perf_counter() - start)
+        results[name] = (best, len(found))
+
+    print(f"Source: {source}, {len(content) / 1024:.1f} KiB")
+    for name, (seconds, count) in results.items():
+        print(f"  {name:22s} {seconds * 1000:10.1f} ms  {count:6d} sections")
+    legacy, single_pass = results["find_section_headers"][0], results["split_sections"][0]
+    print(f"  speedup: {legacy / single_pass:.1f}x")
+    return results
+
 def main():
     """Main function to convert and fix a Python file to notebook."""
     parser = argparse.ArgumentParser(description="Convert Python file to Jupyter notebook and fix imports.")
     parser.add_argument('--input', type=str, default='merged_agents.py', help='Input Python file')
     parser.add_argument('--output', type=str, default='notebooks/merged_financial_agents.ipynb', help='Output notebook file')
     parser.add_argument('--fix-existing', action='store_true', help='Only fix an existing notebook without converting')
+    parser.add_argument('--input-dir', type=str, help='Convert every Python file under this directory')
+    parser.add_argument('--output-dir', type=str, default='notebooks', help='Output directory for --input-dir')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes for --input-dir (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='With --input-dir, reconvert unchanged files too')
+    parser.add_argument('--benchmark-splitter', action='store_true',
+                        help='Time the legacy regex splitter against split_sections (uses --input if it exists, '
+                             'otherwise a generated file)')
+    parser.add_argument('--sections', type=int, default=200, help='Sections in the generated benchmark file')
+    parser.add_argument('--comment-width', type=int, default=120, help='Width of padded comments in the generated file')
     args = parser.parse_args()
+
+    if args.benchmark_splitter:
+        input_path = args.input if args.input != 'merged_agents.py' or os.path.exists(args.input) else None
+        benchmark_splitter(input_path, sections=args.sections, comment_width=args.comment_width)
+        return 0
     
+    if args.input_dir:
+        results = convert_directory(args.input_dir, args.output_dir, jobs=args.jobs, force=args.force)
+        return 1 if any(r['status'] == 'failed' for r in results.values()) else 0
+
     if args.fix_existing:
         # Just fix the existing notebook
         if not os.path.exists(args.output):